@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+
+"""
+
+Throughput of reading Gaussian output files through gaussianutility.utilities.open_file,
+uncompressed and compressed with gzip, bzip2, xz, and zstd (if the zstandard package is installed).
+A large log is made by repeating a test output file.
+
+Usage: python benchmarks/bench_compressed.py [repeats]
+
+"""
+
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import time
+import tempfile
+from gaussianutility.utilities import open_file, readoutput
+from gaussianutility.optHistory import read_history
+
+test_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test', 'printE_aluminosilicate.out')
+
+def compressors():
+    yield '', None
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=6)
+    yield '.bz2', bz2.compress
+    yield '.xz', lzma.compress
+    try:
+        import zstandard
+        yield '.zst', zstandard.ZstdCompressor().compress
+    except ImportError:
+        print("zstandard is not installed; zstd is skipped")
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+def stream_lines(file_name):
+    with open_file(file_name) as inputfile:
+        for line in inputfile:
+            pass
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with open(test_file, 'rb') as inputfile:
+        data = inputfile.read() * repeats
+    size = len(data) / 1e6
+
+    print(f"Log of {size:.1f} MB ({repeats} x {os.path.basename(test_file)})")
+    print(f"{'format':8s} {'file MB':>8s} {'lines MB/s':>11s} {'readoutput s':>13s} {'read_history s':>15s}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for ext, compress in compressors():
+            file_name = os.path.join(directory, 'job.out' + ext)
+            with open(file_name, 'wb') as output:
+                output.write(data if compress is None else compress(data))
+
+            t_lines = timed(lambda: stream_lines(file_name))
+            t_out = timed(lambda: readoutput(file_name))
+            t_history = timed(lambda: read_history(file_name))
+            print(f"{ext or 'plain':8s} {os.path.getsize(file_name) / 1e6:8.1f} {size / t_lines:11.1f} "
+                  f"{t_out:13.2f} {t_history:15.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+"""
+
+Time of parsing many Gaussian output files one after another (as printE does), with and
+without reading ahead by gaussianutility.prefetch. The gain is seen for files that are not
+in the page cache, e.g., on NFS or Lustre; give two sets of files, or drop the caches
+between the runs, so that the second run does not read from the cache of the first.
+
+Usage: python benchmarks/bench_prefetch.py 'set1/*.out' ['set2/*.out']
+
+"""
+
+import sys
+import time
+from gaussianutility.utilities import expand_files, open_file
+from gaussianutility.printE import read_E, split_jobs
+from gaussianutility.prefetch import prefetched
+
+def parse_all(file_names, ahead):
+    for file_name in prefetched(file_names, ahead=ahead):
+        with open_file(file_name) as inputfile:
+            lines = inputfile.readlines()
+        if lines:
+            for calc in split_jobs(lines)[0]:
+                read_E(calc)
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    sets = [expand_files([pattern]) for pattern in sys.argv[1:3]]
+    if len(sets) == 1:
+        sets.append(sets[0])
+
+    for file_names, ahead in zip(sets, (0, 4)):
+        start = time.perf_counter()
+        parse_all(file_names, ahead)
+        elapsed = time.perf_counter() - start
+        print(f"read ahead {ahead}: {len(file_names)} files in {elapsed:.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+"""
+
+Overhead of the phase profiling of gaussianutility.profiling: readoutput and read_E
+without instrumentation, with profiling disabled (default), and with profiling enabled.
+
+Usage: python benchmarks/bench_profiling.py [repeats]
+
+"""
+
+import os
+import sys
+import time
+from gaussianutility import profiling
+from gaussianutility.utilities import readoutput, open_file
+from gaussianutility.printE import read_E
+
+test_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'test', 'printE_aluminosilicate.out')
+
+def best(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    with open_file(test_file) as inputfile:
+        lines = inputfile.readlines()
+
+    # __wrapped__ is the function without the profiling decorator
+    cases = {'readoutput': (lambda: readoutput(test_file), lambda: readoutput.__wrapped__(test_file)),
+             'read_E': (lambda: read_E(lines), lambda: read_E.__wrapped__(lines))}
+
+    print(f"{'function':12s} {'bare ms':>9s} {'disabled ms':>12s} {'enabled ms':>11s}")
+    for name, (profiled_call, bare_call) in cases.items():
+        profiling.enable(None)
+        t_bare = best(bare_call, repeats)
+        t_disabled = best(profiled_call, repeats)
+        profiling.enable(os.devnull)
+        t_enabled = best(profiled_call, repeats)
+        profiling.enable(None)
+        print(f"{name:12s} {t_bare * 1e3:9.2f} {t_disabled * 1e3:12.2f} {t_enabled * 1e3:11.2f}")
+
+if __name__ == "__main__":
+    main()
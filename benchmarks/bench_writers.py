@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""
+
+Compare the geometry writers in gaussianutility.writers with the pandas text formatting
+(DataFrame.to_csv / to_string) used before, on a random structure.
+
+Usage: python benchmarks/bench_writers.py [n_atoms]
+
+"""
+
+import io
+import sys
+import time
+import numpy as np
+import pandas as pd
+from gaussianutility.writers import format_geometry, write_xyz
+
+def timed(func, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def main():
+    n_atoms = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rng = np.random.default_rng(0)
+
+    # Strings as returned by readinput
+    coords = np.char.mod('%.8f', rng.uniform(-50, 50, (n_atoms, 3)))
+    df_geom = pd.DataFrame({'Atom': rng.choice(['Si', 'O', 'Al', 'H'], n_atoms),
+                            'Index': np.where(rng.random(n_atoms) < 0.5, '0', '-1'),
+                            'x': coords[:,0], 'y': coords[:,1], 'z': coords[:,2],
+                            'ONIOM_layer': rng.choice(['H', 'M', 'L'], n_atoms)})
+
+    def pandas_com():
+        return df_geom.to_csv(header=False, index=False, sep='\t')
+
+    def pandas_xyz():
+        return df_geom[['Atom','x','y','z']].to_string(index=False, header=False) + '\n'
+
+    def writers_xyz():
+        output = io.StringIO()
+        write_xyz(output, df_geom['Atom'].to_numpy(), df_geom[['x','y','z']].to_numpy(), '')
+        return output.getvalue().split('\n', 2)[2]
+
+    print(f"{n_atoms} atoms")
+    for label, reference, new in [('Gaussian input', pandas_com, lambda: format_geometry(df_geom)),
+                                  ('XYZ', pandas_xyz, writers_xyz)]:
+        t_ref, text_ref = timed(reference)
+        t_new, text_new = timed(new)
+        print(f"{label:15s} pandas: {t_ref:.3f} s  writers: {t_new:.3f} s  "
+              f"speedup: {t_ref/t_new:.1f}x  identical: {text_ref == text_new}")
+
+if __name__ == "__main__":
+    main()
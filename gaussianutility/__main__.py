@@ -0,0 +1,4 @@
+from gaussianutility.cli import main
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import math as m
+import numpy as np
+from typing import NamedTuple, Optional, Tuple
+from gaussianutility.utilities import open_file, split_lattice
+from gaussianutility.printE import read_E, split_jobs
+from gaussianutility.gibbsTemp import thermochemistry, gibbs_energy
+from gaussianutility.formats import read_structure
+
+"""
+
+Python interface of the results printed by the scripts, for workflows that run in the same process.
+The functions return immutable records (named tuples) and numpy arrays instead of printing, and
+keep no state between calls, so they can be called from many threads at once.
+printE and gibbsTemp print the same results with their own formatting; printE keeps the numbers
+as written in the output files, and the records have them as floats (nan if not computed).
+
+Example:
+    from gaussianutility import api
+    G = api.read_energies('job.out').last.G
+    curve = api.gibbs_curve('job.out', [298.15, 373.15])
+    coords = api.read_geometry('job.out').coords
+
+"""
+
+class JobEnergy(NamedTuple):
+    """Energies (Hartree) of a linked job; EZPE, H, G, and imaginary are for frequency jobs only"""
+    job_type: str  # 'single-point', 'optimization', or 'frequency'
+    E: float
+    EZPE: float = m.nan
+    H: float = m.nan
+    G: float = m.nan
+    imaginary: int = 0  # number of imaginary frequencies
+
+class Energies(NamedTuple):
+    """Energies of every linked job of an output file, as printE"""
+    file: str
+    stoichiometry: str
+    normal: bool  # normally terminated; only the first job is read otherwise
+    jobs: Tuple[JobEnergy, ...]
+
+    @property
+    def last(self):
+        return self.jobs[-1]
+
+class Geometry(NamedTuple):
+    """Structure of a file: atoms, coordinates (Angstrom), and lattice vectors (None if not periodic)"""
+    atoms: np.ndarray  # element symbols, (n_atoms,)
+    coords: np.ndarray  # (n_atoms, 3)
+    charge: int
+    multiplicity: int
+    lattice: Optional[np.ndarray]  # (n_vectors, 3)
+    route: str
+    title: Optional[str]
+
+def _float(value):
+    return float(value) if value else m.nan
+
+def _job_energy(result):
+    if result['job type'] != 'frequency':
+        return JobEnergy(result['job type'], _float(result['E']))
+    return JobEnergy(result['job type'], _float(result['E']), _float(result['EZPE']), _float(result['H']),
+                     _float(result['G']), int(result['imagf']))
+
+def read_energies(path):
+    """
+    Energies of every linked job of a Gaussian output file (see printE).
+    Return an Energies record; energies.last is the last job.
+    """
+    with open_file(path) as inputfile:
+        lines = inputfile.readlines()
+    if not lines:
+        raise ValueError("{} is an empty file".format(path))
+
+    calc_lines, normal = split_jobs(lines)
+    results = [read_E(calc) for calc in calc_lines]
+    return Energies(str(path), results[0]['stoich'], normal, tuple(_job_energy(result) for result in results))
+
+def gibbs_curve(path, temperatures, symmetry=1, isotopes=None):
+    """
+    Gibbs free energies (Hartree) at the temperatures (K) from the frequency calculation of
+    a Gaussian output file or a formatted checkpoint file (see gibbsTemp; symmetry and isotopes
+    are for .fchk files). Return an array of the shape of temperatures.
+    """
+    temperatures = np.asarray(temperatures, dtype=float)
+    gibbs = gibbs_energy(temperatures.ravel(), *thermochemistry(path, symmetry, isotopes))
+    return np.asarray(gibbs).reshape(temperatures.shape)
+
+def read_geometry(path, step=None):
+    """
+    Structure of any supported file (see gaussianutility.formats); step is the optimization step
+    of an output file (-1 for the last, default) or the frame of a trajectory.
+    Return a Geometry record.
+    """
+    structure = read_structure(path, step)
+    df_atoms, lattice = split_lattice(structure['geom'])
+    charge_mult = structure['charge_mult'].split()
+    return Geometry(df_atoms['Atom'].to_numpy(dtype=str), np.array(df_atoms[['x', 'y', 'z']], dtype=float),
+                    int(charge_mult[0]), int(charge_mult[1]),
+                    None if lattice is None else np.array(lattice, dtype=float),
+                    structure['route'], structure['title'])
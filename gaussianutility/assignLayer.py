@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+
+import sys
+import numpy as np
+import argparse
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import readinput, split_lattice, write_atomic
+from gaussianutility.connectivity import read_connectivity, perceive_bonds, adjacency, bond_hops
+from gaussianutility.neighbors import distance_to_points
+from gaussianutility.writers import format_geometry
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Assign ONIOM layers (H, M, L) in a Gaussian input file (.com or .gjf)\n"
+                     "by the number of bonds or the distance from seed atoms of an active site\n"
+                     "Bonds are read from the connectivity section (geom=connectivity),\n"
+                     "or perceived from covalent radii if the input does not have it\n"
+                     "Bonds with an order higher than 1 (double, aromatic, ...) are not cut between layers:\n"
+                     "the outer atom of such a bond at a layer boundary is moved to the inner layer\n"
+                     "(only the direct partner, not the atoms bonded to it), with a caution\n\n"
+                     "Return file_name.com: Input structure with the assigned ONIOM layers",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument("file_name", help='Gaussian input file (.com or .gjf) in ONIOM scheme')
+    parser.add_argument('-s', '--seeds', nargs='+', type=int, required=True, \
+    help="Seed atom number(s), starting from 1, in the high layer")
+    parser.add_argument('-H', '--high', type=float, required=True, \
+    help="Atoms within this number of bonds (or distance in Angstrom with -d)\n"+\
+         "from the seeds are in the high layer")
+    parser.add_argument('-M', '--medium', type=float, \
+    help="Atoms within this number of bonds (or distance with -d) are in the medium layer\n"+\
+         "Without -M, a two-layer model (H and L) is built")
+    parser.add_argument('-d', '--distance', action='store_true', \
+    help="Use distances (in Angstrom) from the seeds instead of the number of bonds")
+    parser.add_argument('--cut-multiple', action='store_true', \
+    help="Allow bonds with an order higher than 1 to be cut between layers\n"+\
+         "(e.g., Si-O bonds written with order 2 by GaussView)")
+    args = parser.parse_args()
+    return args
+
+def assign_layers(df_geom, seeds, high, medium=None, bonds=None, orders=None,
+                  distance=False, cut_multiple=False):
+    """
+    Write ONIOM layers into the ONIOM_layer column of a geometry from readinput.
+    Seeds are 0-based atom indices. Atoms within high (and medium) bonds, or Angstrom
+    if distance is True, from any seed are assigned to H (and M); the others to L.
+    Without bonds, the bonds are perceived from covalent radii.
+    Unless cut_multiple is True, the outer atom of a bond of order > 1 across a layer boundary
+    is moved to the layer of its partner; a caution with the number of moved atoms is printed.
+    """
+    df_atoms, lattice = split_lattice(df_geom)
+    n_atoms = len(df_atoms)
+
+    seeds = np.array(seeds, dtype=int)
+    if np.any(seeds < 0) or np.any(seeds >= n_atoms):
+        raise ValueError("Seed atom numbers must be between 1 and {}".format(n_atoms))
+    if medium is not None and medium < high:
+        raise ValueError("The medium layer threshold must not be smaller than the high layer one")
+
+    coords = np.array(df_atoms[['x','y','z']], dtype=float)
+    if bonds is None:
+        bonds, orders = perceive_bonds(df_atoms['Atom'], coords, lattice)
+
+    # Bonds to lattice vectors (Tv) are not meaningful for layers
+    inside = np.all(bonds < n_atoms, axis=1)
+    bonds, orders = bonds[inside], orders[inside]
+
+    if distance:
+        measure = distance_to_points(coords, coords[seeds], max(high, medium or 0), lattice)
+    else:
+        indptr, indices, _ = adjacency(bonds, n_atoms)
+        measure = bond_hops(indptr, indices, seeds).astype(float)
+        measure[measure < 0] = np.inf
+
+    # 0: H, 1: M, 2: L
+    rank = np.full(n_atoms, 2)
+    if medium is not None:
+        rank[measure <= medium] = 1
+    rank[measure <= high] = 0
+
+    # The outer atom of a multiple bond across a boundary takes the layer of its partner;
+    # only the direct partners are moved, so that the layers do not spread along multiple bonds
+    if not cut_multiple:
+        multiple = bonds[orders > 1]
+        inner_rank = rank.copy()
+        np.minimum.at(inner_rank, multiple[:, 0], rank[multiple[:, 1]])
+        np.minimum.at(inner_rank, multiple[:, 1], rank[multiple[:, 0]])
+        moved = int((inner_rank < rank).sum())
+        if moved:
+            print("!!!Caution: {} atoms are moved beyond the thresholds to an inner layer to keep bonds of order > 1; "
+                  "use --cut-multiple to cut them".format(moved), file=sys.stderr)
+        rank = inner_rank
+
+    layers = np.array(['H', 'M', 'L'])[rank]
+    if "ONIOM_layer" not in df_geom.columns:
+        df_geom["ONIOM_layer"] = None
+    df_geom.loc[df_atoms.index, "ONIOM_layer"] = layers
+
+    return df_geom
+
+def assign_layer(file_name, seeds, high, medium=None, distance=False, cut_multiple=False):
+    # Read a Gaussian input file
+    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
+
+    if "oniom" not in route.lower():
+        raise TypeError("Input structure must be in ONIOM scheme; set the oniom method in the route section")
+
+    if not distance and (high != int(high) or (medium is not None and medium != int(medium))):
+        raise ValueError("Number of bonds must be an integer; use -d for distances")
+
+    if connectivity:
+        bonds, orders = read_connectivity(connectivity)
+    else:
+        bonds, orders = None, None
+
+    df_geom = assign_layers(df_geom, np.array(seeds) - 1, high, medium, bonds, orders,
+                            distance, cut_multiple)
+
+    # Write Gaussian input file
+    text = [f"{route}\n", f"{title}\n", charge_mult]
+    text.append(format_geometry(df_geom))
+    text.append('\n\n')
+    text += connectivity
+    text.append('\n')
+    write_atomic(file_name, ''.join(text))
+
+    layers, counts = np.unique(df_geom.loc[df_geom['Atom'] != 'Tv', "ONIOM_layer"], return_counts=True)
+    print(", ".join(f"{layer}: {count}" for layer, count in zip(layers, counts)))
+
+def main():
+    args = parse_args()
+    assign_layer(args.file_name, args.seeds, args.high, args.medium, args.distance, args.cut_multiple)
+
+if __name__ == "__main__":
+    main()
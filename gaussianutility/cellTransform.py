@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+
+import sys
+import numpy as np
+import pandas as pd
+import argparse
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import readinput, split_lattice, inner_name
+from gaussianutility.connectivity import read_connectivity, write_connectivity
+from gaussianutility.neighbors import complete_basis
+from gaussianutility.writers import open_output, write_geometry
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Build a supercell, transform the cell, or wrap atoms into the cell\n"
+                     "of a periodic Gaussian input file (.com or .gjf) with lattice vectors (Tv)\n"
+                     "Freezing indices, ONIOM layers, and connectivity are kept for every copy of an atom\n"
+                     "The operations are applied in the order of -t, -s, and -w\n"
+                     "The charges are multiplied by the number of cells, and the unpaired electrons\n"
+                     "of every cell are kept (high spin) in the multiplicities\n\n"
+                     "Return file_name_cell.com: Transformed input structure",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument("file_name", help='Gaussian input file (.com or .gjf) with Tv')
+    parser.add_argument('-t', '--transform', nargs='+', type=int, \
+    help="Integer transformation matrix (row by row) giving the new lattice vectors\n"+\
+         "as combinations of the old ones, e.g., '1 1 0 -1 1 0 0 0 1'\n"+\
+         "The matrix is n x n for n lattice vectors")
+    parser.add_argument('-s', '--supercell', nargs='+', type=int, \
+    help="Number of repetitions along each lattice vector, e.g., '2 2 1'")
+    parser.add_argument('-w', '--wrap', action='store_true', \
+    help="Wrap atoms into the cell")
+    parser.add_argument('-n', '--name', nargs=1, required=False, \
+    help='Provide name of the generated Gaussian input file including extension')
+    args = parser.parse_args()
+    return args
+
+def _fractional(df_geom):
+    # Atoms, fractional coordinates on a completed basis, the basis, and the periodic axes
+    df_atoms, lattice = split_lattice(df_geom)
+    if lattice is None:
+        raise ValueError('The provided Gaussian input file does not contain lattice information')
+
+    basis, periodic = complete_basis(lattice)
+    frac = np.array(df_atoms[['x','y','z']], dtype=float) @ np.linalg.inv(basis)
+
+    return df_atoms, df_geom.loc[df_geom['Atom'] == 'Tv'], frac, basis, periodic
+
+def _full_matrix(matrix, periodic):
+    # Embed an n x n matrix for n lattice vectors into 3 x 3
+    n_periodic = periodic.sum()
+    matrix = np.array(matrix, dtype=int)
+    if matrix.size != n_periodic**2:
+        raise ValueError("The transformation needs {} x {} integers for {} lattice vectors"
+                         .format(n_periodic, n_periodic, n_periodic))
+
+    full = np.eye(3, dtype=int)
+    full[:n_periodic, :n_periodic] = matrix.reshape(n_periodic, n_periodic)
+    if round(abs(np.linalg.det(full))) < 1:
+        raise ValueError("The transformation matrix must not be singular")
+
+    return full
+
+def _bond_shifts(frac, bonds, periodic):
+    # Lattice shift of the partner atom of every bond by the minimum-image convention
+    diff = frac[bonds[:,1]] - frac[bonds[:,0]]
+    return np.where(periodic, -np.round(diff), 0).astype(int)
+
+def _assemble(df_atoms, df_tv, origin, cart, new_lattice):
+    # Copy all the other columns (atom symbol, index, ONIOM layer) of the origin atoms
+    df_new = df_atoms.iloc[origin].reset_index(drop=True)
+    coords = np.char.mod('%.8f', cart)
+    df_new['x'], df_new['y'], df_new['z'] = coords[:,0], coords[:,1], coords[:,2]
+
+    df_tv = df_tv.reset_index(drop=True)
+    lattice = np.char.mod('%.8f', new_lattice)
+    df_tv['x'], df_tv['y'], df_tv['z'] = lattice[:,0], lattice[:,1], lattice[:,2]
+
+    return pd.concat([df_new, df_tv], ignore_index=True)
+
+def _lookup(keys_table, keys):
+    sort = np.argsort(keys_table)
+    pos = np.searchsorted(keys_table, keys, sorter=sort)
+    found = sort[np.minimum(pos, len(sort) - 1)]
+    if not np.array_equal(keys_table[found], keys):
+        raise ValueError("Connectivity cannot be mapped onto the new cell")
+    return found
+
+def _encode(atom, shift, low, size):
+    # Unique integer key of (atom, lattice shift) pairs
+    shift = shift - low
+    if np.any(shift < 0) or np.any(shift >= size):
+        raise ValueError("Connectivity cannot be mapped onto the new cell")
+    return ((atom * size[0] + shift[:,0]) * size[1] + shift[:,1]) * size[2] + shift[:,2]
+
+def make_supercell(df_geom, repeats, bonds=None, orders=None):
+    """
+    Tile a geometry from readinput n1 x n2 x n3 times along its lattice vectors (Tv).
+    Atoms are copied as they are (not wrapped), so molecules stay whole.
+    Return the new geometry, and bonds and orders mapped to the copies if bonds are given.
+    """
+    df_atoms, df_tv, frac, basis, periodic = _fractional(df_geom)
+    n_periodic = periodic.sum()
+    repeats = np.array(repeats, dtype=int)
+    if len(repeats) != n_periodic or np.any(repeats < 1):
+        raise ValueError("{} positive repetitions are needed for {} lattice vectors".format(n_periodic, n_periodic))
+
+    size = np.ones(3, dtype=int)
+    size[:n_periodic] = repeats
+    shifts = np.stack(np.meshgrid(*[np.arange(n) for n in size], indexing='ij'), axis=-1).reshape(-1, 3)
+
+    # Cell copies by broadcasting; copy k of atom i becomes atom k * n_atoms + i
+    n_atoms = len(frac)
+    cart = (frac[None,:,:] + shifts[:,None,:]).reshape(-1, 3) @ basis
+    origin = np.tile(np.arange(n_atoms), len(shifts))
+    new_lattice = basis[:n_periodic] * repeats[:,None]
+
+    df_new = _assemble(df_atoms, df_tv, origin, cart, new_lattice)
+    if bonds is None:
+        return df_new, None, None
+
+    inside = np.all(bonds < n_atoms, axis=1)
+    bonds, orders = bonds[inside], orders[inside]
+    bond_shift = _bond_shifts(frac, bonds, periodic)
+
+    copy = np.arange(len(shifts))
+    partner_shift = (shifts[copy][:,None,:] + bond_shift[None,:,:]) % size
+    partner_copy = np.ravel_multi_index(partner_shift.reshape(-1, 3).T, size)
+
+    new_bonds = np.stack([np.repeat(copy, len(bonds)) * n_atoms + np.tile(bonds[:,0], len(copy)),
+                          partner_copy * n_atoms + np.tile(bonds[:,1], len(copy))], axis=1)
+
+    return df_new, new_bonds, np.tile(orders, len(copy))
+
+def transform_cell(df_geom, matrix, bonds=None, orders=None):
+    """
+    Change the cell of a geometry from readinput to new lattice vectors given as
+    integer combinations of the old ones (new = matrix @ old).
+    Atoms are wrapped into the new cell, which holds |det(matrix)| times the atoms.
+    Return the new geometry, and bonds and orders mapped to the new atoms if bonds are given.
+    """
+    df_atoms, df_tv, frac, basis, periodic = _fractional(df_geom)
+    full = _full_matrix(matrix, periodic)
+    full_inv = np.linalg.inv(full)
+    n_atoms = len(frac)
+
+    # Wrap the atoms into the old cell and collect its images overlapping the new cell
+    frac = frac - np.where(periodic, np.floor(frac), 0)
+    corners = np.stack(np.meshgrid([0, 1], [0, 1], [0, 1], indexing='ij'), axis=-1).reshape(-1, 3) @ full
+    low, high = corners.min(axis=0), corners.max(axis=0)
+    shifts = np.stack(np.meshgrid(*[np.arange(a, b) for a, b in zip(low, high)], indexing='ij'),
+                      axis=-1).reshape(-1, 3)
+
+    new_frac = (frac[None,:,:] + shifts[:,None,:]) @ full_inv
+    inside = np.all((new_frac >= -1e-8) & (new_frac < 1 - 1e-8) | ~periodic, axis=2)
+    copy, origin = np.nonzero(inside)
+
+    expected = n_atoms * round(abs(np.linalg.det(full)))
+    if len(origin) != expected:
+        raise ValueError("{} atoms are found in the new cell instead of {}; check the atoms on the cell boundaries"
+                         .format(len(origin), expected))
+
+    cart = (frac[origin] + shifts[copy]) @ basis
+    new_lattice = (full @ basis)[:periodic.sum()]
+
+    df_new = _assemble(df_atoms, df_tv, origin, cart, new_lattice)
+    if bonds is None:
+        return df_new, None, None
+
+    valid = np.all(bonds < n_atoms, axis=1)
+    bonds, orders = bonds[valid], orders[valid]
+    bond_shift = _bond_shifts(frac, bonds, periodic)
+
+    # Bonds of every new atom, taken from the bonds of its origin atom
+    counts = np.bincount(bonds[:,0], minlength=n_atoms)
+    bond_sort = np.argsort(bonds[:,0], kind='stable')
+    bond_start = np.cumsum(counts) - counts
+    n_bonds = counts[origin]
+    atom_pos = np.repeat(np.arange(len(origin)), n_bonds)
+    within = np.arange(n_bonds.sum()) - np.repeat(np.cumsum(n_bonds) - n_bonds, n_bonds)
+    bond_idx = bond_sort[np.repeat(bond_start[origin], n_bonds) + within]
+
+    # Partner atoms, brought back into the new cell
+    partner = bonds[bond_idx,1]
+    partner_shift = shifts[copy[atom_pos]] + bond_shift[bond_idx]
+    partner_cell = np.floor((frac[partner] + partner_shift) @ full_inv + 1e-8).astype(int)
+    partner_shift = partner_shift - np.where(periodic, partner_cell, 0) @ full
+
+    size = high - low
+    table = _encode(origin, shifts[copy], low, size)
+    new_bonds = np.stack([atom_pos, _lookup(table, _encode(partner, partner_shift, low, size))], axis=1)
+
+    return df_new, new_bonds, orders[bond_idx]
+
+def scale_charge_mult(charge_mult, n_atoms, new_n_atoms):
+    """
+    Charge and multiplicity (one pair per ONIOM system) of a cell of n_atoms made into
+    a cell of new_n_atoms: the charges are multiplied by the number of cells, and the unpaired
+    electrons of every cell are kept (high spin), so that each multiplicity is consistent
+    with the number of electrons. A caution is printed if a multiplicity is changed.
+    """
+    if new_n_atoms == n_atoms:
+        return charge_mult
+    cells = new_n_atoms // n_atoms
+    if cells * n_atoms != new_n_atoms:
+        raise ValueError("The new cell of {} atoms is not a multiple of the cell of {} atoms".format(new_n_atoms, n_atoms))
+
+    values = [int(value) for value in charge_mult.split()]
+    charges, multiplicities = np.array(values[0::2]), np.array(values[1::2])
+    new_multiplicities = (multiplicities - 1) * cells + 1
+    if np.any(new_multiplicities != multiplicities):
+        print("!!!Caution: The multiplicity of the {} cells is set to {} (unpaired electrons of every cell kept); "
+              "change it for other spin states".format(cells, new_multiplicities[0]), file=sys.stderr)
+
+    pairs = ["{} {}".format(charge, multiplicity) for charge, multiplicity in zip(charges * cells, new_multiplicities)]
+    return " ".join(pairs) + charge_mult[len(charge_mult.rstrip()):]
+
+def _n_atoms(df_geom):
+    return int((df_geom['Atom'] != 'Tv').sum())
+
+def wrap_atoms(df_geom):
+    """
+    Wrap the atoms of a geometry from readinput into the cell of its lattice vectors (Tv).
+    """
+    df_atoms, df_tv, frac, basis, periodic = _fractional(df_geom)
+    frac = frac - np.where(periodic, np.floor(frac), 0)
+
+    return _assemble(df_atoms, df_tv, np.arange(len(frac)), frac @ basis, basis[:periodic.sum()])
+
+def cell_transform(file_name, matrix=None, repeats=None, wrap=False, out_file=None):
+    if matrix is None and repeats is None and not wrap:
+        raise ValueError("At least one of the transformation (-t), supercell (-s), or wrapping (-w) must be given")
+
+    # Read a Gaussian input file
+    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
+
+    if connectivity:
+        bonds, orders = read_connectivity(connectivity)
+    else:
+        bonds, orders = None, None
+    n_atoms = _n_atoms(df_geom)
+
+    if matrix is not None:
+        df_geom, bonds, orders = transform_cell(df_geom, matrix, bonds, orders)
+    if repeats is not None:
+        df_geom, bonds, orders = make_supercell(df_geom, repeats, bonds, orders)
+    if wrap:
+        df_geom = wrap_atoms(df_geom)
+    charge_mult = scale_charge_mult(charge_mult, n_atoms, _n_atoms(df_geom))
+
+    # Write Gaussian input file
+    if out_file is None:
+        out_file = inner_name(file_name).rsplit(".", 1)[0] + "_cell.com"
+
+    with open_output(out_file) as output:
+        output.write(f"{route}\n")
+        output.write(f"{title}\n")
+        output.write(charge_mult)
+        write_geometry(output, df_geom)
+        output.write('\n')
+        if bonds is not None:
+            output.writelines(write_connectivity(bonds, orders, len(df_geom)))
+            output.write('\n')
+        output.write('\n')
+
+def main():
+    args = parse_args()
+    out_file = args.name[0] if args.name is not None else None
+    cell_transform(args.file_name, args.transform, args.supercell, args.wrap, out_file)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+
+import io
+import sys
+import csv
+import json
+import shlex
+import argparse
+import importlib
+import contextlib
+from argparse import RawTextHelpFormatter
+from gaussianutility import daemon
+
+"""
+
+Single entry point of all the commands, and batch execution of manifests.
+
+    gaussianutility printE *.out
+    gaussianutility run manifest.json -j 8
+
+A manifest lists the steps (command lines without the file name) to apply to every file, e.g.,
+{"files": ["logs/*.out"], "steps": ["out2com", "freezeLayer -i L", "com2vasp"]}.
+The steps of a file run in order in one process: a structure command (out2com, freezeLayer,
+sortInput, cellTransform, com2vasp, com2xyz) works on the structure parsed by the previous
+step instead of reading the file again, and writes the same file as the command would.
+Other commands are run with their main function on the current file, which is
+given as the first argument or in place of {file}, e.g., "spectrum ir {file}".
+
+"""
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        prog='gaussianutility',
+        description= "Run any of the gaussianutility commands, or a manifest of commands x files\n\n"
+                     "Commands:\n  " + "\n  ".join(sorted(daemon.commands, key=str.lower)) + "\n"
+                     "  daemon       (utilityDaemon)\n"
+                     "  run          Run a manifest (gaussianutility run -h)\n\n"
+                     "Examples:\n"
+                     "  gaussianutility printE *.out\n"
+                     "  gaussianutility run manifest.json -j 8",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('command', nargs='?', help='Command to run')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Arguments of the command')
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        sys.exit(1)
+    return args
+
+def parse_run_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='gaussianutility run',
+        description= "Run the steps of a manifest on every file within one process per file\n"
+                     "JSON manifest: {\"files\": [...], \"steps\": [...]} or a list of such items\n"
+                     "  e.g., {\"files\": [\"*.out\"], \"steps\": [\"out2com\", \"freezeLayer -i L\", \"com2vasp\"]}\n"
+                     "CSV manifest: columns file and step, one row per step; the steps of a file are\n"
+                     "  applied in the order of the rows\n"
+                     "A step is a command line without the file name, which is given as the first\n"
+                     "argument, or where {file} is, e.g., \"spectrum ir {file}\"\n"
+                     "After out2com and cellTransform, the following steps work on the new input file",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('manifest', help='Manifest file (.json or .csv)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes for the files; 0 uses all CPUs")
+    return parser.parse_args(argv)
+
+def read_manifest(file_name):
+    """
+    Read a manifest (.json or .csv) as a dictionary of the files (glob patterns expanded)
+    and their list of steps, in the order of the manifest
+    """
+    from gaussianutility.utilities import expand_files
+
+    if file_name.lower().endswith('.csv'):
+        with open(file_name, newline='') as inputfile:
+            rows = list(csv.DictReader(inputfile))
+        if rows and not {'file', 'step'} <= set(rows[0]):
+            raise ValueError("A CSV manifest needs the columns file and step")
+        items = [{'files': [row['file']], 'steps': [row['step']]} for row in rows]
+    else:
+        with open(file_name) as inputfile:
+            items = json.load(inputfile)
+        if isinstance(items, dict):
+            items = [items]
+
+    manifest = {}
+    for item in items:
+        files = item.get('files', item.get('file'))
+        files = [files] if isinstance(files, str) else files
+        steps = [item['steps']] if isinstance(item['steps'], str) else item['steps']
+        for step in steps:
+            command = shlex.split(step)[0]
+            if command not in daemon.commands:
+                raise ValueError("Unknown command '{}' in the manifest".format(command))
+        for path in expand_files(files):
+            manifest.setdefault(path, []).extend(steps)
+
+    return manifest
+
+def _step_argv(step, file_name):
+    # Command and its arguments with the file name in place of {file}, or first
+    tokens = shlex.split(step)
+    command, args = tokens[0], tokens[1:]
+    if '{file}' in step:
+        args = [token.replace('{file}', file_name) for token in args]
+    else:
+        args.insert(0, file_name)
+    return command, args
+
+def _parse_step(command, args):
+    # Parse the arguments with the command's own parser
+    module = importlib.import_module(daemon.commands[command])
+    argv = sys.argv
+    sys.argv = [command] + args
+    try:
+        return module.parse_args()
+    except SystemExit:
+        raise ValueError("Invalid arguments of {}: {}".format(command, " ".join(args))) from None
+    finally:
+        sys.argv = argv
+
+def _base_name(file_name):
+    from gaussianutility.utilities import inner_name
+    return ".".join(inner_name(file_name).rsplit(".", 1)[0:-1])
+
+class _Item:
+    # File of a manifest item and the structure of its current input, if already parsed
+    def __init__(self, file_name):
+        self.file = file_name
+        self.structure = None
+
+    def load(self):
+        from gaussianutility.formats import read_structure
+        if self.structure is None:
+            self.structure = read_structure(self.file)
+        return self.structure
+
+    def write(self, file_name, fmt=None, **options):
+        from gaussianutility.formats import write_structure
+        write_structure(self.structure, file_name, fmt, **options)
+
+def _out2com(item, args):
+    from gaussianutility.formats import read_structure, file_format
+    from gaussianutility.pipeline import apply_transforms
+    source_format = 'fchk' if file_format(args.file_name) == 'fchk' else 'out'
+    structure = read_structure(args.file_name, args.index, source_format)
+    item.structure = apply_transforms(structure, [('connectivity', args.connectivity)])
+
+    item.file = args.name[0] if args.name is not None else _base_name(args.file_name) + "_geom.com"
+    item.write(item.file, 'com')
+
+def _check_input(item):
+    # Steps that modify the input in place, as the commands themselves, take Gaussian input files only
+    from gaussianutility.formats import file_format
+    if file_format(item.file) != 'com':
+        raise TypeError('The input file format must be .com or .gjf')
+
+def _freezeLayer(item, args):
+    from gaussianutility.pipeline import apply_transforms
+    _check_input(item)
+    if args.radius is not None:
+        operation = ('freeze_radius', {'radius': args.radius, 'atoms': args.atoms, 'point': args.point})
+    else:
+        operation = ('freeze', args.index)
+    item.structure = apply_transforms(item.load(), [operation])
+    item.write(item.file, 'com')
+
+def _sortInput(item, args):
+    from gaussianutility.pipeline import apply_transforms
+    _check_input(item)
+    item.structure = apply_transforms(item.load(), [('sort', {'index': args.sort, 'order': args.order})])
+    item.write(item.file, 'com')
+
+def _cellTransform(item, args):
+    from gaussianutility.pipeline import apply_transforms
+    if args.transform is None and args.supercell is None and not args.wrap:
+        raise ValueError("At least one of the transformation (-t), supercell (-s), or wrapping (-w) must be given")
+    item.structure = apply_transforms(item.load(), [('transform', args.transform),
+                                                    ('supercell', args.supercell), ('wrap', args.wrap)])
+
+    item.file = args.name[0] if args.name is not None else _base_name(item.file) + "_cell.com"
+    item.write(item.file, 'com')
+
+def _com2vasp(item, args):
+    item.load()
+    item.write(_base_name(item.file) + ".vasp", 'vasp', ctype=args.ctype)
+
+def _com2xyz(item, args):
+    item.load()
+    item.write(_base_name(item.file) + ".xyz", 'xyz')
+
+# Commands run on the structure of the item; the others run with their main function
+structure_steps = {'out2com': _out2com, 'freezeLayer': _freezeLayer, 'sortInput': _sortInput,
+                   'cellTransform': _cellTransform, 'com2vasp': _com2vasp, 'com2xyz': _com2xyz}
+
+def _uses_structure(command, args):
+    # Dry runs and multiple files are left to the command itself
+    if command not in structure_steps:
+        return False
+    if getattr(args, 'dry_run', False):
+        return False
+    return not isinstance(args.file_name, list) or len(args.file_name) == 1
+
+def _run_main(command, args):
+    module = importlib.import_module(daemon.commands[command])
+    argv = sys.argv
+    sys.argv = [command] + args
+    try:
+        module.main()
+    except SystemExit as error:
+        if error.code not in (None, 0):
+            raise RuntimeError("{} {} exited with {}".format(command, " ".join(args), error.code))
+    finally:
+        sys.argv = argv
+
+def run_steps(file_name, steps):
+    """
+    Run the steps of a manifest on a file in order.
+    Return the standard output of the steps.
+    """
+    item = _Item(file_name)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        for step in steps:
+            command, args = _step_argv(step, item.file)
+            parsed = _parse_step(command, args)
+            if _uses_structure(command, parsed):
+                if isinstance(parsed.file_name, list):
+                    parsed.file_name = parsed.file_name[0]
+                structure_steps[command](item, parsed)
+            else:
+                _run_main(command, args)
+                # The command may have changed the file
+                item.structure = None
+
+    return output.getvalue()
+
+def _run_manifest(file_name, manifest):
+    return run_steps(file_name, manifest[file_name])
+
+def run(manifest_file, jobs=1):
+    """
+    Run a manifest, the files in parallel with jobs > 1 (jobs=0 uses all CPUs)
+    """
+    from gaussianutility.utilities import run_batch
+    manifest = read_manifest(manifest_file)
+    if not manifest:
+        raise ValueError("No file is found for the manifest " + manifest_file)
+    run_batch(_run_manifest, list(manifest), (manifest,), jobs)
+
+def main():
+    args = parse_args()
+    command = args.command
+
+    if command == 'run':
+        run_args = parse_run_args(args.args)
+        run(run_args.manifest, run_args.jobs)
+    elif command == 'daemon':
+        sys.argv = ['utilityDaemon'] + args.args
+        daemon.main()
+    elif command in daemon.commands:
+        sys.argv = [command] + args.args
+        return daemon.client(command)
+    else:
+        sys.exit("Unknown command '{}'; run gaussianutility -h for the commands".format(command))
+
+if __name__ == "__main__":
+    main()
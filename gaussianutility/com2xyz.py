@@ -1,10 +1,9 @@
 #!/usr/bin/env python3
 
-import numpy as np
-import pandas as pd
 import argparse
 from argparse import RawTextHelpFormatter
-from gaussianutility.utilities import readinput
+from gaussianutility.utilities import inner_name
+from gaussianutility.pipeline import convert
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -16,21 +15,9 @@ def parse_args():
     return parser.parse_args()
     
 def com_2_xyz(file_name):
-    # Read geometry from a Gaussian input file
-    _, _, _, df_geom, _ = readinput(file_name)
-    df_geom = df_geom[['Atom', 'x', 'y', 'z']]
-    df_geom['Atom'] = np.array([i.rsplit("-",1)[0] for i in list(df_geom['Atom'])])
-    
-    df_geom = df_geom.loc[df_geom['Atom'] != 'Tv'] 
-    elem_len = str(len(df_geom))
-
-    # Write xyz file
-    name = ".".join(file_name.rsplit(".",1)[0:-1])
-    out_file = name + ".xyz"
-    with open(out_file, 'w') as output:
-        output.write(elem_len + '\n')
-        output.write(out_file + '\n')
-        output.write(df_geom.to_string(index=False, header=False) + '\n')
+    # Read geometry from a Gaussian input file and write xyz file
+    name = ".".join(inner_name(file_name).rsplit(".",1)[0:-1])
+    convert(file_name, name + ".xyz", source_format='com')
 
 def main():
     args = parse_args() 
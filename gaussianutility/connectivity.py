@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from periodictable import elements
+from gaussianutility.neighbors import neighbor_list
+
+"""
+
+Bond graph utilities for the Gaussian connectivity section (geom=connectivity).
+Bonds are kept as an (n_bonds, 2) array of 0-based atom indices with a bond order array,
+and can be turned into a sparse (CSR) adjacency structure for graph traversal.
+When no connectivity is available, bonds are perceived from covalent radii.
+
+"""
+
+# Added to the sum of covalent radii when perceiving bonds (Angstrom)
+bond_tolerance = 0.45
+
+def read_connectivity(connectivity):
+    """
+    Parse the connectivity lines returned by readinput, e.g. '1 2 1.0 3 1.5'.
+    Return bonds as an (n_bonds, 2) array of 0-based atom indices and their bond orders.
+    """
+    bonds = []
+    orders = []
+    for line in connectivity:
+        vals = line.split()
+        if not vals:
+            continue
+
+        atom = int(vals[0]) - 1
+        for neighbor, order in zip(vals[1::2], vals[2::2]):
+            bonds.append((atom, int(neighbor) - 1))
+            orders.append(float(order))
+
+    bonds = np.array(bonds, dtype=int).reshape(-1, 2)
+    orders = np.array(orders, dtype=float)
+
+    return bonds, orders
+
+
+def write_connectivity(bonds, orders, n_atoms):
+    """
+    Format bonds as Gaussian connectivity lines, one line per atom.
+    Every bond is listed once, on the line of its lower-numbered atom.
+    """
+    bonds = np.sort(np.asarray(bonds, dtype=int).reshape(-1, 2), axis=1)
+    orders = np.asarray(orders, dtype=float)
+    if n_atoms == 0:
+        return []
+
+    sort = np.lexsort((bonds[:,1], bonds[:,0]))
+    bonds, orders = bonds[sort], orders[sort]
+
+    # Atom numbers and their neighbors interleaved in one array and joined at once
+    counts = np.bincount(bonds[:,0], minlength=n_atoms)
+    atom_pos = np.arange(n_atoms) + np.cumsum(counts) - counts
+    tokens = np.empty(n_atoms + len(bonds), dtype=object)
+    tokens[atom_pos] = np.char.mod('\n%d', np.arange(1, n_atoms + 1))
+    bond_pos = np.ones(len(tokens), dtype=bool)
+    bond_pos[atom_pos] = False
+    tokens[bond_pos] = np.char.add(np.char.mod(' %d', bonds[:,1] + 1), np.char.mod(' %.1f', orders))
+
+    text = ''.join(tokens.tolist())[1:] + '\n'
+
+    return text.splitlines(keepends=True)
+
+
+def adjacency(bonds, n_atoms, orders=None):
+    """
+    Build a symmetric sparse adjacency structure in CSR form.
+    Neighbors of atom i are indices[indptr[i]:indptr[i+1]] with bond orders
+    in the same slice of the returned orders.
+    """
+    bonds = np.asarray(bonds, dtype=int).reshape(-1, 2)
+    if orders is None:
+        orders = np.ones(len(bonds))
+
+    source = np.concatenate([bonds[:,0], bonds[:,1]])
+    target = np.concatenate([bonds[:,1], bonds[:,0]])
+    orders = np.concatenate([orders, orders])
+
+    sort = np.lexsort((target, source))
+    counts = np.bincount(source, minlength=n_atoms)
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+
+    return indptr, target[sort], orders[sort]
+
+
+def covalent_radii(atoms):
+    """
+    Covalent radii (Angstrom) of the given atom symbols from the periodictable package.
+    """
+    symbols, inverse = np.unique(np.asarray(atoms), return_inverse=True)
+
+    radii = []
+    for symbol in symbols:
+        try:
+            radius = elements.symbol(symbol).covalent_radius
+        except ValueError:
+            raise ValueError("Unrecognized atom symbol: {}".format(symbol))
+        if radius is None:
+            raise ValueError("Covalent radius is not available for {}".format(symbol))
+        radii.append(radius)
+
+    return np.array(radii, dtype=float)[inverse.reshape(-1)]
+
+
+def perceive_bonds(atoms, coords, lattice=None, tolerance=bond_tolerance):
+    """
+    Infer bonds from interatomic distances; two atoms are bonded when their distance
+    is below the sum of covalent radii plus tolerance.
+    With lattice (Tv vectors), bonds across the periodic boundaries are found as well.
+    Return bonds and bond orders (all 1.0) in the format of read_connectivity.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    radii = covalent_radii(atoms)
+    if len(radii) == 0:
+        return np.zeros((0, 2), dtype=int), np.zeros(0)
+
+    cutoff = 2 * radii.max() + tolerance
+    i, j, dist, _ = neighbor_list(coords, cutoff, lattice)
+
+    bonded = (i != j) & (dist <= radii[i] + radii[j] + tolerance)
+    bonds = np.unique(np.stack([i[bonded], j[bonded]], axis=1), axis=0).reshape(-1, 2)
+
+    return bonds, np.ones(len(bonds))
+
+
+def bond_hops(indptr, indices, seeds):
+    """
+    Breadth-first search over a CSR adjacency from the seed atoms (0-based).
+    Return the number of bonds between every atom and its nearest seed;
+    atoms not connected to any seed get -1.
+    """
+    n_atoms = len(indptr) - 1
+    hops = np.full(n_atoms, -1, dtype=int)
+    frontier = np.unique(np.asarray(seeds, dtype=int))
+    hops[frontier] = 0
+
+    level = 0
+    while len(frontier):
+        starts = indptr[frontier]
+        counts = indptr[frontier + 1] - starts
+        within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        neighbors = indices[np.repeat(starts, counts) + within]
+
+        level += 1
+        frontier = np.unique(neighbors[hops[neighbors] < 0])
+        hops[frontier] = level
+
+    return hops
+
+
+def connected_components(bonds, n_atoms):
+    """
+    Label the connected components of the bond graph by vectorized union-find.
+    Return an array with the smallest atom index of the component of every atom.
+    """
+    bonds = np.asarray(bonds, dtype=int).reshape(-1, 2)
+    labels = np.arange(n_atoms)
+
+    while True:
+        # Hook the larger root to the smaller one, then compress the paths
+        root_a, root_b = labels[bonds[:,0]], labels[bonds[:,1]]
+        if np.array_equal(root_a, root_b):
+            break
+        np.minimum.at(labels, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+
+        while True:
+            compressed = labels[labels]
+            if np.array_equal(compressed, labels):
+                break
+            labels = compressed
+
+    return labels
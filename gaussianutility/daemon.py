@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import select
+import socket
+import stat
+import threading
+import struct
+import argparse
+import importlib
+import traceback
+import functools
+from argparse import RawTextHelpFormatter
+
+"""
+
+Optional warm worker for the console scripts.
+The daemon imports the modules of all the commands once and listens on a Unix domain socket;
+every request (command, arguments, working directory, environment) is run in a fork of the
+daemon, so numpy, pandas, matplotlib, etc. are never imported again, and the standard output
+and error are streamed back to the client.
+The console scripts are thin clients: they run in the daemon when one is listening and
+in their own process otherwise. GAUSSIANUTILITY_DAEMON=0 disables the daemon for a client.
+A request runs in its own process group, which is terminated when the client goes away
+(e.g., Ctrl-C of watchLog -f) or the daemon stops.
+This module only imports the standard library so that the clients start quickly.
+
+"""
+
+# Console scripts and their modules (run with module.main())
+commands = {
+    'com2vasp': 'gaussianutility.com2vasp',
+    'com2xyz': 'gaussianutility.com2xyz',
+    'vasp2com': 'gaussianutility.vasp2com',
+    'xyz2com': 'gaussianutility.xyz2com',
+    'out2com': 'gaussianutility.out2com',
+    'spectrum': 'gaussianutility.spectrum',
+    'gibbsTemp': 'gaussianutility.gibbsTemp',
+    'printE': 'gaussianutility.printE',
+    'freezeLayer': 'gaussianutility.freezeLayer',
+    'sortInput': 'gaussianutility.sortInput',
+    'assignLayer': 'gaussianutility.assignLayer',
+    'cellTransform': 'gaussianutility.cellTransform',
+    'watchLog': 'gaussianutility.watchLog',
+    'optHistory': 'gaussianutility.optHistory',
+    'ingest': 'gaussianutility.ingest',
+    'displaceMode': 'gaussianutility.displaceMode',
+    'scanPath': 'gaussianutility.scanPath',
+    'dedupConformer': 'gaussianutility.dedupConformer',
+    'geomInfo': 'gaussianutility.geomInfo',
+    'isotopeFreq': 'gaussianutility.isotopeFreq',
+    'profileReport': 'gaussianutility.profiling',
+}
+
+env_socket = 'GAUSSIANUTILITY_SOCKET'
+env_daemon = 'GAUSSIANUTILITY_DAEMON'
+
+# Frames sent to the client: channel (stdout, stderr, exit code) and data length
+_header = struct.Struct('!cI')
+STDOUT, STDERR, EXIT = b'1', b'2', b'x'
+
+def socket_path():
+    """
+    Socket of the daemon of the user: GAUSSIANUTILITY_SOCKET, or a file in XDG_RUNTIME_DIR
+    or in a directory of the user in /tmp
+    """
+    if os.environ.get(env_socket):
+        return os.environ[env_socket]
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'gaussianutility-{}.sock'.format(os.getuid()))
+    return os.path.join('/tmp', 'gaussianutility-{}'.format(os.getuid()), 'daemon.sock')
+
+def _untrusted_directory(directory):
+    # The directory of the socket must belong to the user and not be writable by others,
+    # so that no other user can replace the socket
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or info.st_mode & 0o022:
+        return "The directory {} of the socket must belong to the user and not be writable by others".format(directory)
+    return None
+
+def _untrusted(path, sock):
+    """
+    Reason not to trust the socket and the daemon connected to it with the environment of the user,
+    or None if the socket, its directory, and the daemon belong to the user
+    """
+    reason = _untrusted_directory(os.path.dirname(os.path.abspath(path)))
+    if reason:
+        return reason
+    if os.lstat(path).st_uid != os.getuid():
+        return "The socket {} does not belong to the user".format(path)
+    if hasattr(socket, 'SO_PEERCRED'):
+        credentials = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+        if struct.unpack('3i', credentials)[1] != os.getuid():
+            return "The daemon listening on {} does not belong to the user".format(path)
+    return None
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("The daemon closed the connection")
+        data += chunk
+    return data
+
+class _FrameWriter(io.RawIOBase):
+    # Binary stream writing frames of one channel to the socket
+    def __init__(self, sock, channel):
+        self.sock, self.channel = sock, channel
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.sock.sendall(_header.pack(self.channel, len(data)) + bytes(data))
+        return len(data)
+
+def _stream(sock, channel):
+    return io.TextIOWrapper(io.BufferedWriter(_FrameWriter(sock, channel), 1 << 16),
+                            encoding='utf-8', errors='replace')
+
+def _call(command):
+    module = importlib.import_module(commands[command])
+    return module.main()
+
+def _exit_code(error):
+    # Exit status of SystemExit as the interpreter sets it
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    print(error.code, file=sys.stderr)
+    return 1
+
+def _watch_client(sock):
+    # The client sends nothing after the request: any event is its exit (or a closed socket),
+    # and the process group of the request is terminated
+    poller = select.poll()
+    poller.register(sock, select.POLLIN | select.POLLHUP | select.POLLERR)
+    while not poller.poll():
+        pass
+    os.killpg(os.getpgid(0), signal.SIGTERM)
+
+def _serve_request(sock, path):
+    # Run one request in this (forked) process with its output sent to the client
+    request = json.loads(sock.makefile('rb').readline())
+    stdout, stderr = _stream(sock, STDOUT), _stream(sock, STDERR)
+    sys.stdout, sys.stderr = stdout, stderr
+
+    command = request['command']
+    try:
+        if command == '_status':
+            print("gaussianutility daemon running (pid {}, socket {})".format(os.getppid(), path))
+            code = 0
+        elif command == '_stop':
+            os.kill(os.getppid(), signal.SIGTERM)
+            print("gaussianutility daemon stopped")
+            code = 0
+        elif command not in commands:
+            print("Unknown command: " + command, file=sys.stderr)
+            code = 2
+        else:
+            # Own process group with the processes it starts, ended with the client
+            os.setpgid(0, 0)
+            threading.Thread(target=_watch_client, args=(sock,), daemon=True).start()
+
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+            from gaussianutility import profiling
+            profiling.enable(os.environ.get(profiling.env_var))
+
+            sys.argv = [command] + request['args']
+            try:
+                code = _exit_code(SystemExit(_call(command)))
+            except SystemExit as error:
+                code = _exit_code(error)
+    except Exception:
+        traceback.print_exc()
+        code = 1
+
+    for stream in (stdout, stderr):
+        try:
+            stream.flush()
+        except (OSError, ValueError):
+            pass
+    sock.sendall(_header.pack(EXIT, 4) + struct.pack('!i', code))
+
+def _preload():
+    # Import the modules of all the commands (and their dependencies) once
+    for module in commands.values():
+        importlib.import_module(module)
+
+def _socket_directory(path):
+    # Create the directory of the socket (only accessible to the user) or check the existing one
+    directory = os.path.dirname(os.path.abspath(path))
+    if not os.path.lexists(directory):
+        os.makedirs(directory, mode=0o700)
+    reason = _untrusted_directory(directory)
+    if reason:
+        raise RuntimeError(reason)
+
+def serve(path=None):
+    """
+    Run the daemon in this process until it is stopped (SIGTERM or the stop command)
+    """
+    path = path or socket_path()
+    if running(path):
+        raise RuntimeError("A daemon is already listening on " + path)
+    _socket_directory(path)
+    if os.path.lexists(path):
+        os.remove(path)
+
+    _preload()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)  # the socket is only accessible to the user
+    try:
+        server.bind(path)
+    finally:
+        os.umask(umask)
+    server.listen(64)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # forked workers are reaped automatically
+    workers = set()
+
+    try:
+        while True:
+            try:
+                connection, _ = server.accept()
+            except InterruptedError:
+                continue
+
+            # Workers that have exited
+            for pid in list(workers):
+                try:
+                    os.kill(pid, 0)
+                except OSError:
+                    workers.discard(pid)
+
+            pid = os.fork()
+            if pid == 0:
+                server.close()
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                try:
+                    _serve_request(connection, path)
+                except BaseException:
+                    pass
+                finally:
+                    os._exit(0)
+            workers.add(pid)
+            connection.close()
+    finally:
+        server.close()
+        # Requests still running, with the processes they started
+        for pid in workers:
+            try:
+                os.killpg(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        if os.path.exists(path):
+            os.remove(path)
+
+def _daemonize():
+    # Detach from the terminal (double fork); return True in the daemon process
+    if os.fork() > 0:
+        return False
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+    os.chdir('/')
+    return True
+
+def _connect(path=None):
+    path = path or socket_path()
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        reason = _untrusted(path, sock)
+    except OSError:
+        sock.close()
+        return None
+    if reason:
+        print("!!!" + reason + "; running without the daemon", file=sys.stderr)
+        sock.close()
+        return None
+    return sock
+
+def running(path=None):
+    sock = _connect(path)
+    if sock is None:
+        return False
+    sock.close()
+    return True
+
+def request(command, args=(), path=None):
+    """
+    Run a command in the daemon, writing its output to this process's stdout and stderr.
+    Return the exit code, or None if no daemon is listening.
+    """
+    sock = _connect(path)
+    if sock is None:
+        return None
+
+    with sock:
+        message = {'command': command, 'args': list(args), 'cwd': os.getcwd(), 'env': dict(os.environ)}
+        try:
+            sock.sendall(json.dumps(message).encode() + b'\n')
+            return _receive(sock)
+        except KeyboardInterrupt:
+            # Closing the connection ends the request in the daemon
+            sock.shutdown(socket.SHUT_RDWR)
+            return 130
+
+def _receive(sock):
+    # Write the output frames of a request until its exit code
+    outputs = {STDOUT: sys.stdout, STDERR: sys.stderr}
+    while True:
+        try:
+            channel, size = _header.unpack(_recv_exact(sock, _header.size))
+            data = _recv_exact(sock, size)
+        except ConnectionError as error:
+            print("!!!" + str(error), file=sys.stderr)
+            return 1
+
+        if channel == EXIT:
+            return struct.unpack('!i', data)[0]
+
+        output = outputs[channel]
+        output.flush()
+        output.buffer.write(data)
+        output.buffer.flush()
+
+def client(command):
+    """
+    Console script of a command: run in the daemon if one is listening, otherwise in this process
+    """
+    if os.environ.get(env_daemon, '1') not in ('0', 'no', 'off', 'false'):
+        code = request(command, sys.argv[1:])
+        if code is not None:
+            return code
+    return _call(command)
+
+def __getattr__(name):
+    # Entry points of the console scripts, e.g., gaussianutility.daemon:printE
+    if name in commands:
+        return functools.partial(client, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Start, stop, or check the gaussianutility daemon\n"
+                     "The daemon keeps the modules of all the commands imported and runs the console scripts\n"
+                     "(printE, out2com, freezeLayer, ...) without the startup time of Python and its packages\n"
+                     "The commands run in the daemon only when it is listening, and in their own process otherwise\n"
+                     "Restart the daemon after updating the package",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('action', choices=['start', 'stop', 'status'], help="Start, stop, or check the daemon")
+    parser.add_argument('-s', '--socket', \
+    help="Unix domain socket (default: $GAUSSIANUTILITY_SOCKET, $XDG_RUNTIME_DIR/gaussianutility-uid.sock,\n"
+         "or /tmp/gaussianutility-uid/daemon.sock)\n"
+         "The socket and its directory must belong to the user, and the directory must not be writable by others")
+    parser.add_argument('-f', '--foreground', action='store_true', \
+    help="Run the daemon in the foreground (with start)")
+    args = parser.parse_args()
+    return args
+
+def main():
+    args = parse_args()
+    path = args.socket or socket_path()
+
+    if args.action == 'start':
+        if running(path):
+            sys.exit("A daemon is already listening on " + path)
+        try:
+            _socket_directory(path)
+        except RuntimeError as error:
+            sys.exit(str(error))
+
+        if args.foreground:
+            try:
+                serve(path)
+            except KeyboardInterrupt:
+                pass
+        elif _daemonize():
+            try:
+                serve(path)
+            finally:
+                os._exit(0)
+        else:
+            # Wait until the daemon is listening
+            for _ in range(600):
+                if running(path):
+                    print("gaussianutility daemon listening on " + path)
+                    return
+                time.sleep(0.1)
+            sys.exit("The daemon did not start")
+
+    else:
+        code = request('_' + args.action, path=path)
+        if code is None:
+            print("No daemon is listening on " + path)
+            if args.action == 'status':
+                sys.exit(1)
+
+if __name__ == "__main__":
+    main()
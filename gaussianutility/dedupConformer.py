@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+
+import os
+import numpy as np
+import argparse
+from argparse import RawTextHelpFormatter
+from concurrent.futures import ProcessPoolExecutor
+from gaussianutility.utilities import expand_files, open_file, parse_output, inner_name
+from gaussianutility.printE import read_E, split_jobs
+from gaussianutility.formats import make_structure, write_structure
+from gaussianutility.prefetch import prefetched
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Find the unique conformers among Gaussian output files, e.g., of a conformer search\n"
+                     "The last geometry and the energy (as printE) are read from every file at once;\n"
+                     "conformers above the energy window from the lowest one are dropped, and the others\n"
+                     "are clustered from the lowest energy: a conformer is a duplicate when its RMSD\n"
+                     "(after the optimal superposition) to a unique conformer is below the threshold\n"
+                     "Only conformers with the same atoms in the same order are compared\n\n"
+                     "Examples of command line usage are:\n"
+                     "    dedupConformer '*.out'\n"
+                     "    dedupConformer '*.out' -e G -w 3 -r 0.25 --heavy --permute -f xyz\n\n"
+                     "Return file_name_geom.com (or file_name.xyz): Unique conformers",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', nargs='+', help='Gaussian output files (.out or .log) or glob patterns')
+    parser.add_argument('-e', '--energy', choices=['E', 'EZPE', 'H', 'G'], default='E', \
+    help="Energy to compare; EZPE, H, and G need frequency calculations (default: E)")
+    parser.add_argument('-w', '--window', type=float, default=5.0, \
+    help="Energy window above the lowest conformer in kcal/mol (default: 5)")
+    parser.add_argument('-r', '--rmsd', type=float, default=0.125, \
+    help="RMSD threshold of duplicates in Angstrom (default: 0.125)")
+    parser.add_argument('--heavy', action='store_true', \
+    help="Compare the heavy atoms only")
+    parser.add_argument('--permute', action='store_true', \
+    help="Match the atoms of the same element between conformers, e.g., the hydrogens of a methyl group")
+    parser.add_argument('-f', '--format', choices=['com', 'xyz', 'none'], default='com', \
+    help="Format of the unique conformers written (default: com)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes to read the files; 0 uses all CPUs")
+    args = parser.parse_args()
+    return args
+
+Hartree2kcal = 627.5095
+
+def read_conformer(file_name, energy='E'):
+    """
+    Read the last geometry and the energy of the last linked job from the same lines.
+    Return route, charge and multiplicity, geometry (dataframe), and energy (Hartree).
+    """
+    with open_file(file_name) as inputfile:
+        lines = inputfile.readlines()
+    if not lines:
+        raise ValueError("Empty file")
+
+    calc_lines, normal = split_jobs(lines)
+    value = read_E(calc_lines[-1]).get(energy)
+    if not value:
+        raise ValueError("No {} energy is found".format(energy))
+
+    routeStr, charge_mult, df_geom = parse_output(lines)
+    return routeStr, charge_mult, df_geom, float(value)
+
+def _read(file_name, energy):
+    try:
+        return file_name, read_conformer(file_name, energy), None
+    except Exception as error:
+        return file_name, None, "{}: {}".format(type(error).__name__, error)
+
+def _read_all(file_names, energy, jobs=1):
+    # Read the files in a process pool when jobs > 1 (jobs=0 uses all CPUs)
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or len(file_names) < 2:
+        yield from (_read(file_name, energy) for file_name in prefetched(file_names))
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(file_names))) as executor:
+        yield from executor.map(_read, file_names, [energy] * len(file_names), chunksize=8)
+
+def rmsd_matrix(coords, chunk=1 << 15):
+    """
+    RMSD of every pair of geometries, coords (n_conformers, n_atoms, 3), after the optimal
+    superposition (Kabsch). The SVDs of the 3x3 covariance matrices of all pairs are computed
+    in batches, and the RMSD follows from the singular values without rotating the geometries.
+    Return an array of shape (n_conformers, n_conformers).
+    """
+    coords = np.asarray(coords, dtype=float)
+    n, n_atoms = coords.shape[:2]
+    centered = coords - coords.mean(axis=1, keepdims=True)
+    squares = np.einsum('nij,nij->n', centered, centered)
+
+    first, second = np.triu_indices(n, 1)
+    rmsd = np.zeros((n, n))
+    for start in range(0, len(first), chunk):
+        i, j = first[start:start + chunk], second[start:start + chunk]
+        covariance = np.einsum('pki,pkj->pij', centered[i], centered[j])
+        u, singular, vt = np.linalg.svd(covariance)
+        # Reflections are not allowed: the smallest singular value takes the sign of the rotation
+        singular[:, 2] *= np.sign(np.linalg.det(u) * np.linalg.det(vt))
+        residual = squares[i] + squares[j] - 2 * singular.sum(axis=1)
+        rmsd[i, j] = rmsd[j, i] = np.sqrt(np.maximum(residual, 0) / n_atoms)
+
+    return rmsd
+
+def _superpose(reference, coords):
+    # coords rotated onto reference (both centered)
+    u, _, vt = np.linalg.svd(coords.T @ reference)
+    d = np.sign(np.linalg.det(u @ vt))
+    return coords @ (u * [1, 1, d]) @ vt
+
+def _rmsd(reference, coords):
+    return np.sqrt(((reference - _superpose(reference, coords)) ** 2).sum() / len(reference))
+
+def permuted_rmsd(reference, coords, groups, iterations=5):
+    """
+    RMSD of two geometries, allowing the atoms of each group (indices of atoms of the same element)
+    to be exchanged: the atoms are matched to the nearest ones after superposition, and the
+    superposition is repeated with the new matching. Return the lowest RMSD.
+    """
+    reference = reference - reference.mean(axis=0)
+    coords = coords - coords.mean(axis=0)
+    order = np.arange(len(coords))
+    best = _rmsd(reference, coords)
+
+    for _ in range(iterations):
+        fitted = _superpose(reference, coords[order])
+        new_order = order.copy()
+        for group in groups:
+            distance = np.linalg.norm(reference[group][:, None] - fitted[group][None], axis=-1)
+            # Greedy matching from the shortest distance
+            matched = np.full(len(group), -1)
+            used = np.zeros(len(group), dtype=bool)
+            for flat in np.argsort(distance, axis=None):
+                row, column = divmod(flat, len(group))
+                if matched[row] < 0 and not used[column]:
+                    matched[row], used[column] = column, True
+            new_order[group] = order[group][matched]
+
+        if (new_order == order).all():
+            break
+        order = new_order
+        best = min(best, _rmsd(reference, coords[order]))
+
+    return best
+
+def cluster(coords, energies, threshold, groups=None):
+    """
+    Cluster the conformers from the lowest energy; a conformer is a duplicate of the first unique
+    conformer within the RMSD threshold. groups allows permutations (see permuted_rmsd).
+    Return the index of the unique conformer of every conformer, and its RMSD to it.
+    """
+    order = np.argsort(energies, kind='stable')
+    rmsd = rmsd_matrix(coords)
+    representative = np.full(len(order), -1)
+    distance = np.zeros(len(order))
+
+    unique = []
+    for idx in order:
+        if unique:
+            to_unique = rmsd[idx, unique]
+            nearest = int(np.argmin(to_unique))
+            if to_unique[nearest] >= threshold and groups:
+                # Permutations only for the conformers not already matched, nearest first
+                for candidate in np.argsort(to_unique):
+                    value = permuted_rmsd(coords[unique[candidate]], coords[idx], groups)
+                    if value < to_unique[nearest]:
+                        nearest = candidate
+                        to_unique[candidate] = value
+                    if value < threshold:
+                        break
+            if to_unique[nearest] < threshold:
+                representative[idx], distance[idx] = unique[nearest], to_unique[nearest]
+                continue
+        unique.append(idx)
+        representative[idx] = idx
+
+    return representative, distance
+
+def dedup_conformers(file_names, energy='E', window=5.0, threshold=0.125, heavy=False,
+                     permute=False, out_format='com', jobs=1):
+    """
+    Read the conformers, drop those above the energy window (kcal/mol), cluster the others,
+    and write the unique conformers. Return a table (list of dictionaries) of the conformers.
+    """
+    conformers = []
+    for file_name, result, error in _read_all(file_names, energy, jobs):
+        if error:
+            print("!!!Error in " + file_name + ": " + error)
+        else:
+            conformers.append((file_name,) + result)
+    if not conformers:
+        raise ValueError("No conformer is read")
+
+    energies = np.array([conformer[4] for conformer in conformers])
+    relative = (energies - energies.min()) * Hartree2kcal
+    table = [{'file': conformer[0], 'dE': dE, 'unique': None, 'rmsd': np.nan}
+             for conformer, dE in zip(conformers, relative)]
+
+    # Conformers with the same atoms in the same order are compared
+    sets = {}
+    for idx, conformer in enumerate(conformers):
+        if relative[idx] <= window:
+            sets.setdefault(tuple(conformer[3]['Atom']), []).append(idx)
+
+    for atoms, members in sets.items():
+        atoms = np.array(atoms)
+        selected = atoms != 'H' if heavy else np.ones(len(atoms), dtype=bool)
+        atoms = atoms[selected]
+        coords = np.array([np.array(conformers[idx][3][['x','y','z']], dtype=float)[selected]
+                           for idx in members])
+
+        groups = None
+        if permute:
+            groups = [np.flatnonzero(atoms == element) for element in np.unique(atoms)]
+            groups = [group for group in groups if len(group) > 1]
+
+        representative, distance = cluster(coords, energies[members], threshold, groups)
+        for member, rep, value in zip(members, representative, distance):
+            table[member]['unique'] = conformers[members[rep]][0]
+            table[member]['rmsd'] = value
+
+    # Write the unique conformers
+    for row, conformer in zip(table, conformers):
+        if out_format == 'none' or row['unique'] != row['file']:
+            continue
+        file_name, routeStr, charge_mult, df_geom, _ = conformer
+        name = inner_name(file_name).rsplit(".", 1)[0]
+        structure = make_structure(routeStr, None, charge_mult, df_geom)
+        if out_format == 'com':
+            write_structure(structure, name + "_geom.com", 'com')
+        else:
+            write_structure(structure, name + ".xyz", 'xyz')
+
+    return table
+
+def print_table(table, window):
+    print("{:40s} {:>12s} {:>8s}  {}".format('Conformer', 'dE(kcal/mol)', 'RMSD', 'Unique conformer'))
+    for row in sorted(table, key=lambda row: row['dE']):
+        if row['unique'] is None:
+            unique, rmsd = 'outside the window', ''
+        elif row['unique'] == row['file']:
+            unique, rmsd = '*', ''
+        else:
+            unique, rmsd = row['unique'], "{:.3f}".format(row['rmsd'])
+        print("{:40s} {:12.2f} {:>8s}  {}".format(row['file'], row['dE'], rmsd, unique))
+
+    n_unique = sum(row['unique'] == row['file'] for row in table)
+    n_outside = sum(row['unique'] is None for row in table)
+    print("{} unique conformers of {} ({} above {} kcal/mol)".format(n_unique, len(table), n_outside, window))
+
+def main():
+    args = parse_args()
+    file_names = expand_files(args.file_name)
+    table = dedup_conformers(file_names, args.energy, args.window, args.rmsd, args.heavy,
+                             args.permute, args.format, args.jobs)
+    print_table(table, args.window)
+
+if __name__ == "__main__":
+    main()
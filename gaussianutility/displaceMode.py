@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import argparse
+import numpy as np
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import inner_name
+from gaussianutility.formats import read_structure, write_structure
+from gaussianutility.modes import read_modes, displace
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Displace the geometry of a Gaussian frequency calculation (.out)\n"
+                     "along its normal modes, e.g., to follow an imaginary mode away from a saddle point\n"
+                     "The last geometry is displaced by +step and -step (Angstrom) along the normalized\n"
+                     "displacements of each mode; freq=hpmodes outputs are read in high precision\n\n"
+                     "Examples of command line usage are:\n"
+                     "    displaceMode file_name.out\n"
+                     "    displaceMode file_name.out -m 1 2 -s 0.1 0.3\n\n"
+                     "Return file_name_mode1_p0.10.com, file_name_mode1_m0.10.com, ...: Gaussian input files",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', help='Gaussian output file (.out) of a frequency calculation')
+    parser.add_argument('-m', '--mode', nargs='+', type=int, \
+    help='Mode numbers (1 for the lowest frequency); default: the imaginary modes')
+    parser.add_argument('-s', '--step', nargs='+', type=float, default=[0.1], \
+    help='Displacements in Angstrom; each is applied in + and - directions (default: 0.1)')
+    parser.add_argument('-l', '--list', action='store_true', \
+    help='Print the frequencies, reduced masses, and force constants of the modes, and exit')
+    args = parser.parse_args()
+    return args
+
+def print_modes(modes):
+    print("{:>5s} {:>12s} {:>12s} {:>12s}".format('Mode', 'Freq (cm-1)', 'Red. mass', 'Frc const'))
+    for idx, (freq, mass, const) in enumerate(zip(modes['frequencies'], modes['reduced_masses'],
+                                                  modes['force_constants']), 1):
+        print("{:5d} {:12.4f} {:12.4f} {:12.4f}".format(idx, freq, mass, const))
+
+def displace_modes(file_name, mode_numbers=None, steps=(0.1,)):
+    """
+    Write Gaussian input files of the last geometry of an output displaced by +/- steps along the modes.
+    Return the names of the written files.
+    """
+    modes = read_modes(file_name)
+    n_modes = len(modes['frequencies'])
+    if mode_numbers is None:
+        mode_numbers = list(np.flatnonzero(modes['frequencies'] < 0) + 1)
+        if not mode_numbers:
+            raise ValueError("{} has no imaginary mode; select modes with -m".format(file_name))
+    for number in mode_numbers:
+        if not 1 <= number <= n_modes:
+            raise ValueError("Mode {} is out of range (1-{})".format(number, n_modes))
+
+    structure = read_structure(file_name, fmt='out')
+    df_geom = structure['geom'].astype({'x': float, 'y': float, 'z': float})
+    atoms = np.array(df_geom['Atom'] != 'Tv')
+    coords = np.array(df_geom.loc[atoms, ['x','y','z']], dtype=float)
+
+    # Displaced coordinates of every step (+ and -) and mode at once
+    steps = np.concatenate([np.abs(steps), -np.abs(steps)])
+    selected = modes['modes'][np.array(mode_numbers) - 1]
+    displaced = np.round(displace(coords, selected, steps, modes['atoms']), 6)
+
+    name = inner_name(file_name).rsplit(".", 1)[0]
+    out_files = []
+    for step_idx, step in enumerate(steps):
+        for mode_idx, number in enumerate(mode_numbers):
+            out_file = "{}_mode{}_{}{:.2f}.com".format(name, number, 'p' if step > 0 else 'm', abs(step))
+            df_new = df_geom.copy()
+            df_new.loc[atoms, ['x','y','z']] = displaced[step_idx, mode_idx]
+
+            title = "{} displaced along mode {} ({:.2f} cm-1) by {:+.2f} A".format(
+                    inner_name(file_name), number, modes['frequencies'][number - 1], step)
+            write_structure(dict(structure, geom=df_new, title=title), out_file, 'com')
+            out_files.append(out_file)
+
+    return out_files
+
+def main():
+    args = parse_args()
+    if args.list:
+        print_modes(read_modes(args.file_name))
+        return
+
+    for out_file in displace_modes(args.file_name, args.mode, args.step):
+        print(out_file)
+
+if __name__ == "__main__":
+    main()
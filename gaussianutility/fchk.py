@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+import re
+import numpy as np
+from periodictable import elements
+from gaussianutility.utilities import open_file, inner_name
+from gaussianutility import profiling
+
+"""
+
+Reader of Gaussian formatted checkpoint files (.fchk).
+The file is read at once and the sections are located by their header lines
+(name, type I/R/C/H/L, and a value or N= the number of values). The arrays are
+converted in bulk: the fixed-width fields (5E16.8 for reals, 6I12 for integers)
+of a section are cut from its text by NumPy and converted as a whole, instead of
+tokenizing every line. Only the sections that are asked for are converted.
+
+"""
+
+Bohr2Angstrom = 0.529177210903
+
+_header = re.compile(r"^(?P<name>\S.{39})   (?P<type>[IRCHL])   (?P<array>N=)?\s*(?P<value>\S+)[ \t]*$",
+                     re.MULTILINE)
+
+# Width of the fields of the arrays of each type
+_widths = {'I': 12, 'R': 16, 'C': 12, 'H': 12}
+
+def _array(text, kind, count):
+    # Values of an array section from its text
+    if kind in 'CH':
+        return "".join(line[:60] for line in text.splitlines()).strip()
+    if kind == 'L':
+        return np.array([value == 'T' for value in text.split()], dtype=bool)
+
+    dtype = int if kind == 'I' else float
+    width = _widths[kind]
+    compact = text.replace('\n', '').encode('ascii')
+    if len(compact) == width * count:
+        # Fields of a fixed width, converted at once
+        values = np.frombuffer(compact, dtype='S{}'.format(width)).astype(dtype)
+    else:
+        values = np.array(text.split(), dtype=dtype)
+    if len(values) != count:
+        raise ValueError("{} values are expected but {} are found".format(count, len(values)))
+    return values
+
+def _scalar(value, kind):
+    if kind == 'I':
+        return int(value)
+    if kind == 'R':
+        return float(value)
+    if kind == 'L':
+        return value == 'T'
+    return value
+
+@profiling.profiled('read_fchk')
+def read_fchk(file_name, names=None):
+    """
+    This reads the sections of a formatted checkpoint file.
+    names limits the sections converted (all by default).
+    Return a dictionary of the sections by name: int, float, str, or bool for single values,
+    and numpy arrays (str for character arrays) for N= sections, with title, job_type,
+    method, and basis from the first two lines.
+    """
+    name, informat = inner_name(file_name).rsplit(".", 1)
+    if informat.lower() not in ['fchk', 'fch']:
+        raise TypeError('The input file format must be .fchk')
+
+    with open_file(file_name) as inputfile:
+        text = inputfile.read()
+    profiling.checkpoint('read', text)
+
+    first, second = (text.split('\n', 2) + ['', ''])[:2]
+    job = second.split()
+    sections = {'title': first.strip(), 'job_type': job[0] if job else '',
+                'method': job[1] if len(job) > 1 else '', 'basis': job[2] if len(job) > 2 else ''}
+
+    headers = list(_header.finditer(text))
+    for idx, match in enumerate(headers):
+        key = match.group('name').strip()
+        if names is not None and key not in names:
+            continue
+
+        kind = match.group('type')
+        if match.group('array'):
+            end = headers[idx + 1].start() if idx + 1 < len(headers) else len(text)
+            sections[key] = _array(text[match.end() + 1:end], kind, int(match.group('value')))
+        else:
+            sections[key] = _scalar(match.group('value'), kind)
+    profiling.checkpoint('parse', nbytes=len(text))
+
+    return sections
+
+def structure(sections):
+    """
+    Atoms (symbols), coordinates (Angstrom, (n_atoms, 3)), charge, and multiplicity of the sections
+    """
+    numbers = np.asarray(sections['Atomic numbers'], dtype=int)
+    atoms = [elements[number].symbol for number in numbers]
+    coords = np.asarray(sections['Current cartesian coordinates'], dtype=float).reshape(-1, 3) * Bohr2Angstrom
+    return atoms, coords, sections.get('Charge', 0), sections.get('Multiplicity', 1)
+
+def hessian(sections):
+    """
+    Cartesian force constants (Hartree/Bohr^2) as a symmetric (3n, 3n) array, from the lower triangle
+    """
+    values = np.asarray(sections['Cartesian Force Constants'], dtype=float)
+    n = int(round((np.sqrt(8 * len(values) + 1) - 1) / 2))
+    matrix = np.zeros((n, n))
+    matrix[np.tril_indices(n)] = values
+    return matrix + np.tril(matrix, -1).T
+
+def dipole_derivatives(sections):
+    """
+    Derivatives of the dipole moment (x, y, z) along every Cartesian coordinate, as a (3n, 3) array
+    """
+    return np.asarray(sections['Dipole Derivatives'], dtype=float).reshape(-1, 3)
+
+def vibrations(sections):
+    """
+    Frequencies (cm-1), reduced masses (AMU), force constants (mDyne/A), IR intensities (KM/Mole),
+    and Raman activities (A^4/AMU; zeros without freq=raman) of the Vib-E2 section, and the
+    normal modes (n_modes, n_atoms, 3) of the Vib-Modes section, as a dictionary.
+    """
+    if 'Vib-E2' not in sections:
+        raise TypeError('The formatted checkpoint file does not look like containing frequency calculations')
+
+    n_modes = sections.get('Number of Normal Modes', len(sections['Vib-E2']) // 14)
+    values = np.asarray(sections['Vib-E2'], dtype=float)
+    blocks = values[:5 * n_modes].reshape(-1, n_modes)
+    modes = {'frequencies': blocks[0], 'reduced_masses': blocks[1], 'force_constants': blocks[2],
+             'ir_intensities': blocks[3],
+             'raman_activities': blocks[4] if len(blocks) > 4 else np.zeros(n_modes)}
+    if 'Vib-Modes' in sections:
+        modes['modes'] = np.asarray(sections['Vib-Modes'], dtype=float).reshape(n_modes, -1, 3)
+    return modes
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+
+import os
+import itertools
+import functools
+import collections
+import numpy as np
+import pandas as pd
+import mendeleev as md
+from gaussianutility.utilities import readinput, readoutput, split_lattice, open_file, inner_name
+from gaussianutility.writers import open_output, write_geometry, format_column, write_xyz, write_poscar
+
+"""
+
+Readers and writers of structure files, registered by format name:
+'com' (.com, .gjf), 'out' (.out, .log), 'fchk' (.fchk, .fch; read only), 'xyz' (.xyz),
+and 'vasp' (.vasp, POSCAR, CONTCAR, XDATCAR).
+
+Every reader returns a structure, a dictionary with the sections of a Gaussian input:
+route, title, and charge_mult (strings without the newline; title is None if the
+file does not have one), geom (a dataframe of strings as returned by readinput,
+with Tv rows for lattice vectors), and connectivity (lines as returned by readinput).
+
+"""
+
+readers = {}
+writers = {}
+
+# File extensions and VASP file names of every format
+extensions = {'com': 'com', 'gjf': 'com', 'out': 'out', 'log': 'out', 'fchk': 'fchk', 'fch': 'fchk',
+              'xyz': 'xyz', 'vasp': 'vasp'}
+vasp_names = ('POSCAR', 'CONTCAR', 'XDATCAR')
+
+def register_reader(fmt):
+    def register(func):
+        readers[fmt] = func
+        return func
+    return register
+
+def register_writer(fmt):
+    def register(func):
+        writers[fmt] = func
+        return func
+    return register
+
+def file_format(file_name):
+    """
+    Format name of a file from its extension, or its name for VASP files
+    """
+    base = os.path.basename(inner_name(file_name))
+    ext = os.path.splitext(base)[1][1:].lower()
+    if ext in extensions:
+        return extensions[ext]
+    if base.upper().startswith(vasp_names):
+        return 'vasp'
+
+    raise ValueError("Unrecognized file format of {}; supported extensions are {}, or {} files"
+                     .format(file_name, ", ".join(extensions), ", ".join(vasp_names)))
+
+def make_structure(route, title, charge_mult, df_geom, connectivity=None):
+    return {'route': route, 'title': title, 'charge_mult': charge_mult,
+            'geom': df_geom, 'connectivity': list(connectivity or [])}
+
+def read_structure(file_name, step=None, fmt=None):
+    """
+    Read one structure from a file with the reader of its format.
+    step selects a geometry of an output file or a frame of a trajectory.
+    """
+    fmt = fmt or file_format(file_name)
+    if fmt not in readers:
+        raise ValueError("No reader for the {} format; available formats are {}".format(fmt, ", ".join(readers)))
+
+    return readers[fmt](file_name, step)
+
+def write_structure(structure, file_name, fmt=None, **options):
+    """
+    Write a structure to a file with the writer of its format.
+    """
+    fmt = fmt or file_format(file_name)
+    if fmt not in writers:
+        raise ValueError("No writer for the {} format; available formats are {}".format(fmt, ", ".join(writers)))
+
+    writers[fmt](structure, file_name, **options)
+
+def _select(frames, step, file_name):
+    # Frame of a trajectory by its index (0 for the first one, negative from the end)
+    step = 0 if step is None else int(step)
+    if step >= 0:
+        frame = next(itertools.islice(frames, step, None), None)
+    else:
+        last = collections.deque(frames, maxlen=-step)
+        frame = last[0] if len(last) == -step else None
+
+    if frame is None:
+        raise ValueError("Step {} is not found in {}".format(step, file_name))
+    return frame
+
+@functools.lru_cache(maxsize=None)
+def _electrons(symbol):
+    return md.element(symbol).electrons
+
+def multiplicity(atoms):
+    """
+    Multiplicity of a neutral structure, 1 for an even and 2 for an odd number of electrons
+    """
+    elemt_type, inverse = np.unique(np.asarray(atoms), return_inverse=True)
+    elemt_electrons = np.array([_electrons(elemt) for elemt in elemt_type], dtype=int)
+    total_electrons = elemt_electrons[inverse.reshape(-1)].sum()
+
+    return 1 if total_electrons % 2 == 0 else 2
+
+# Gaussian input
+
+@register_reader('com')
+def read_com(file_name, step=None):
+    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
+    return make_structure(route.rstrip('\n'), title.rstrip('\n'), charge_mult.rstrip('\n'), df_geom, connectivity)
+
+def write_input(output, structure, title=None):
+    """
+    Write a structure as a Gaussian input to an open file
+    """
+    output.write(f"{structure['route']}\n\n")
+    output.write(f"{title or structure['title']}\n\n")
+    output.write(f"{structure['charge_mult']}\n")
+    write_geometry(output, structure['geom'])
+    output.write("\n")
+    if structure['connectivity']:
+        output.writelines(structure['connectivity'])
+        output.write("\n")
+    output.write("\n")
+
+@register_writer('com')
+def write_com(structure, file_name, title=None):
+    # Files without a title, e.g., output files, are titled with the name of the new file
+    with open_output(file_name) as output:
+        write_input(output, structure, title or structure['title'] or file_name)
+
+# Gaussian output
+
+@register_reader('out')
+def read_out(file_name, step=None):
+    """
+    Geometry of an optimization step; 0 for input, -1 (default) for the last geometry,
+    and L for the lowest energy geometry
+    """
+    routeStr, charge_mult, df_geom = readoutput(file_name, -1 if step is None else step)
+    return make_structure(routeStr, None, charge_mult, df_geom)
+
+# Gaussian formatted checkpoint
+
+@register_reader('fchk')
+def read_fchk_structure(file_name, step=None):
+    """
+    Current geometry of a formatted checkpoint file; step is ignored.
+    The route has the method and basis of the file only.
+    """
+    from gaussianutility.fchk import read_fchk, structure
+    sections = read_fchk(file_name, ['Atomic numbers', 'Current cartesian coordinates', 'Charge', 'Multiplicity'])
+    atoms, coords, charge, mult = structure(sections)
+    coords = np.char.mod('%.8f', coords)
+    df_geom = pd.DataFrame({'Atom': atoms, 'x': coords[:,0], 'y': coords[:,1], 'z': coords[:,2]})
+    route = "# {}/{}".format(sections['method'], sections['basis']).rstrip('/')
+    return make_structure(route, sections['title'] or None, f'{charge} {mult}', df_geom)
+
+# XYZ
+
+def _ext_columns(comment):
+    # Columns of the species and positions from the Properties key of extended XYZ
+    for token in comment.split():
+        if token.lower().startswith('properties='):
+            fields = token.split('=', 1)[1].split(':')
+            columns = {}
+            col = 0
+            for name, count in zip(fields[0::3], fields[2::3]):
+                columns[name.lower()] = col
+                col += int(count)
+            if 'species' in columns and 'pos' in columns:
+                return columns['species'], columns['pos']
+    return 0, 1
+
+def read_xyz_frames(file_name, stride=1):
+    """
+    Stream frames from an XYZ or extended XYZ file, using the number of atoms in the
+    first line of every frame. Only every stride-th frame is parsed and kept in memory.
+    Yield the frame number (from 1), the comment line, and the atom symbols and
+    x, y, z coordinates as arrays of the strings in the file.
+    """
+    if stride < 1:
+        raise ValueError('Stride must be a positive integer')
+
+    with open_file(file_name) as inputfile:
+        lines = iter(inputfile)
+        number = 0
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                n_atoms = int(line.split()[0])
+            except ValueError:
+                raise ValueError('Number of atoms is expected at the start of frame {} in {}'
+                                 .format(number + 1, file_name))
+
+            number += 1
+            comment = next(lines, '').strip()
+            block = list(itertools.islice(lines, n_atoms))
+            if len(block) < n_atoms:
+                raise ValueError('Frame {} in {} has fewer than {} atoms'.format(number, file_name, n_atoms))
+
+            if (number - 1) % stride:
+                continue
+
+            species, pos = _ext_columns(comment)
+            tokens = [line.split() for line in block]
+            if any(len(token) < max(species + 1, pos + 3) for token in tokens):
+                raise ValueError('Atom lines of frame {} in {} need a symbol and x, y, z'.format(number, file_name))
+
+            atoms = np.array([token[species] for token in tokens])
+            coords = np.array([token[pos:pos + 3] for token in tokens]).reshape(-1, 3)
+            yield number, comment, atoms, coords
+
+def xyz_structure(atoms, coords, title=None):
+    """
+    Structure of an XYZ frame, neutral with the lowest multiplicity
+    """
+    df_geom = pd.DataFrame({'Atom': atoms, 'x': coords[:,0], 'y': coords[:,1], 'z': coords[:,2]})
+    return make_structure('# hf/3-21g', title, f'0 {multiplicity(atoms)}', df_geom)
+
+@register_reader('xyz')
+def read_xyz(file_name, step=None):
+    number, comment, atoms, coords = _select(read_xyz_frames(file_name), step, file_name)
+    return xyz_structure(atoms, coords)
+
+@register_writer('xyz')
+def write_xyz_file(structure, file_name):
+    df_atoms, _ = split_lattice(structure['geom'])
+    with open_output(file_name) as output:
+        write_xyz(output, df_atoms['Atom'].to_numpy(), df_atoms[['x', 'y', 'z']].to_numpy(), file_name)
+
+# VASP
+
+def _read_header(lines, title):
+    # Title, scaling factor, lattice, element types and numbers, and coordinate type
+    lattice_scailing_factor = float(next(lines).split()[0])
+    lattice = np.array([next(lines).split()[:3] for _ in range(3)], dtype=float)
+    elem_type = next(lines).split()
+    if not elem_type or not all(e[0].isalpha() for e in elem_type):
+        raise ValueError('Element symbols must be given in the sixth line (VASP 5 format)')
+    elem_num = np.array(next(lines).split(), dtype=int)
+
+    coord_type = next(lines).split()[0].lower()
+    selective = coord_type.startswith('s')
+    if selective:
+        coord_type = next(lines).split()[0].lower()
+
+    if coord_type.startswith('c') or coord_type.startswith('k'):
+        direct = False
+    elif coord_type.startswith('d'):
+        direct = True
+    else:
+        raise TypeError('Cannot read geometry type parameter - It should be either cartesian or direct.')
+
+    return {'title': title, 'lattice': lattice * lattice_scailing_factor,
+            'scale': lattice_scailing_factor, 'elem_type': elem_type, 'elem_num': elem_num,
+            'selective': selective, 'direct': direct}
+
+def _convert(header, batch):
+    # Convert a batch of frames with the same cell to Cartesian coordinates with one matmul
+    geoms = np.array([geom for _, geom, _ in batch])
+    if header['direct']:
+        geoms = geoms @ header['lattice']
+    else:
+        geoms = geoms * header['scale']
+
+    for (number, _, flags), geom in zip(batch, geoms):
+        yield number, header, geom, flags
+
+def read_vasp_frames(file_name, stride=1, batch_size=64):
+    """
+    Stream frames from a POSCAR/CONTCAR, concatenated POSCARs, or an XDATCAR trajectory.
+    Only every stride-th frame is parsed, and at most batch_size frames are kept in memory.
+    Yield the frame number (from 1), the header (a dictionary with title, scaled lattice,
+    elem_type, elem_num, ...), Cartesian coordinates, and selective dynamics flags or None.
+    """
+    if stride < 1:
+        raise ValueError('Stride must be a positive integer')
+
+    with open_file(file_name) as inputfile:
+        lines = iter(inputfile)
+        try:
+            header = _read_header(lines, next(lines).strip())
+        except StopIteration:
+            raise ValueError('Cannot read the header of ' + file_name)
+        n_atoms = header['elem_num'].sum()
+
+        batch = []
+        number = 0
+        while True:
+            number += 1
+            block = list(itertools.islice(lines, n_atoms))
+            if len(block) < n_atoms:
+                break
+
+            if (number - 1) % stride == 0:
+                if header['selective']:
+                    tokens = np.array([line.split()[:6] for line in block])
+                    batch.append((number, np.array(tokens[:,:3], dtype=float), tokens[:,3:]))
+                else:
+                    tokens = [line.split()[:3] for line in block]
+                    batch.append((number, np.array(tokens, dtype=float), None))
+
+            if len(batch) == batch_size:
+                yield from _convert(header, batch)
+                batch = []
+
+            # Next frame: a new configuration line (XDATCAR) or a complete header
+            line = next(lines, '')
+            while line and not line.strip():
+                line = next(lines, '')
+            if not line:
+                break
+
+            if 'configuration' in line.lower():
+                continue
+
+            try:
+                new_header = _read_header(lines, line.strip())
+            except (ValueError, IndexError, StopIteration):
+                # Trailing data of a single structure, e.g., velocities in CONTCAR
+                break
+
+            if batch:
+                yield from _convert(header, batch)
+                batch = []
+            header = new_header
+            n_atoms = header['elem_num'].sum()
+
+        if batch:
+            yield from _convert(header, batch)
+
+def vasp_structure(header, geom, flags, latticeIdx=True, title=None):
+    """
+    Structure of a VASP frame, neutral with the lowest multiplicity.
+    Selective dynamics flags become freezing indices; only T,T,T and F,F,F are supported.
+    """
+    elem_list = np.repeat(header['elem_type'], header['elem_num'])
+
+    columns = {'Atom': elem_list}
+    if flags is not None:
+        fixed = np.all(flags == 'F', axis=1)
+        if not np.all(fixed | np.all(flags == 'T', axis=1)):
+            raise TypeError('Supported selective dynamics flags are only T,T,T and F,F,F.')
+        columns['Index'] = np.where(fixed, '-1', '0')
+
+    for axis, column in zip('xyz', geom.T):
+        columns[axis] = format_column(column, 16)
+    df_geom = pd.DataFrame(columns)
+
+    if latticeIdx:
+        df_tv = pd.DataFrame({'Atom': ['Tv'] * 3})
+        if flags is not None:
+            df_tv['Index'] = None
+        for axis, column in zip('xyz', header['lattice'].T):
+            df_tv[axis] = format_column(column, 16)
+        df_geom = pd.concat([df_geom, df_tv], ignore_index=True)
+
+    return make_structure('# pbepbe/3-21g/auto', title or header['title'], f'0 {multiplicity(elem_list)}', df_geom)
+
+@register_reader('vasp')
+def read_vasp(file_name, step=None):
+    number, header, geom, flags = _select(read_vasp_frames(file_name), step, file_name)
+    return vasp_structure(header, geom, flags)
+
+@register_writer('vasp')
+def write_vasp(structure, file_name, ctype='d'):
+    """
+    Write a periodic structure as POSCAR in direct (d) or Cartesian (c) coordinates.
+    Atoms are grouped by element, and frozen atoms (index -1) are fixed by selective dynamics.
+    """
+    if ctype not in ('d', 'c'):
+        raise ValueError('The coordination type must be d for direct or c for cartesian')
+
+    df_geom = structure['geom']
+    if not 'Tv' in df_geom['Atom'].values:
+        raise ValueError('The provided structure does not contain lattice information')
+
+    atom_rows = np.array(df_geom['Atom'] != 'Tv')
+    lattice = np.array(df_geom.loc[~atom_rows, ['x', 'y', 'z']])
+    atoms = np.array(df_geom.loc[atom_rows, 'Atom'])
+    coords = np.array(df_geom.loc[atom_rows, ['x', 'y', 'z']])
+
+    if ctype == 'd':
+        lattice_inv = np.linalg.inv(np.array(lattice, dtype=float))
+        coords = np.dot(np.array(coords, dtype=float), lattice_inv)
+
+    # Fix the atomic position if the given index is -1 using selective dynamics scheme
+    flags = None
+    if 'Index' in df_geom.columns:
+        frozen = np.array(df_geom.loc[atom_rows, 'Index'], dtype=int) < 0
+        flags = np.repeat(np.where(frozen, 'F', 'T')[:, None], 3, axis=1)
+
+    # Group atoms into species blocks in the order of the first appearance of each element
+    # For example, if the list of atoms comes as C, O, H, C, it should be sorted to be C, C, O, H
+    # The sorting is stable, so the order of atoms of each element is kept
+    uniqatoms, first_idx, atom_codes = np.unique(atoms, return_index=True, return_inverse=True)
+    appearance = np.argsort(first_idx)
+    species_rank = np.empty(len(uniqatoms), dtype=int)
+    species_rank[appearance] = np.arange(len(uniqatoms))
+    atom_codes = species_rank[atom_codes.reshape(-1)]
+
+    uniqatomlist = uniqatoms[appearance]
+    uniqatomcount = np.bincount(atom_codes, minlength=len(uniqatoms))
+    order = np.argsort(atom_codes, kind='stable')
+    coords = coords[order]
+    if flags is not None:
+        flags = flags[order]
+
+    with open_output(file_name) as output:
+        write_poscar(output, os.path.splitext(file_name)[0], lattice, uniqatomlist, uniqatomcount,
+                     coords, flags, ctype == 'd')
+        output.write('\n')
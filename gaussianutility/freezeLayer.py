@@ -4,60 +4,122 @@ import numpy as np
 import pandas as pd
 import argparse
 from argparse import RawTextHelpFormatter
-from gaussianutility.utilities import readinput
+from gaussianutility.utilities import readinput, split_lattice, expand_files, update_file, run_batch
+from gaussianutility.neighbors import distance_to_points
+from gaussianutility.writers import format_geometry
+
+def atom_numbers(text):
+    # Comma-separated atom numbers, e.g., 1,5,12
+    try:
+        return [int(atom) for atom in text.split(',') if atom]
+    except ValueError:
+        raise argparse.ArgumentTypeError("atom numbers must be comma-separated integers, e.g., 1,5: " + text)
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description= "Freeze a given ONIOM layer(s) in a Gaussian input structure during\n"
-                     "optimization calculation by adding indices (-1) next to atom symbols\n\n"
+                     "optimization calculation by adding indices (-1) next to atom symbols\n"
+                     "Alternatively, with -r, freeze all the atoms farther than a radius from\n"
+                     "given atoms (-a) or a point (-p); periodic images (Tv) are considered\n"
+                     "Multiple files or glob patterns can be given; they are processed in parallel with -j\n\n"
                      "Return file_name.com: Modified input structure",
         formatter_class=RawTextHelpFormatter)
 
-    parser.add_argument("file_name", help='Gaussian input file (.com or .gjf)')
+    parser.add_argument("file_name", nargs='+', help='Gaussian input file(s) (.com or .gjf) or glob pattern(s)')
     parser.add_argument('-i', '--index', nargs='?', const=1, \
     help="'H', 'M', or 'L' for freezing a high, medium, or low ONIOM layer, or their combination\n"+\
          "'U' unfreezes all the atoms. 'L' is default", default='L')
+    parser.add_argument('-r', '--radius', type=float, \
+    help="Radius (in Angstrom) of the unfrozen sphere; overrides -i")
+    parser.add_argument('-a', '--atoms', type=atom_numbers, \
+    help="Center atom number(s), starting from 1, for -r, separated by commas (e.g., 1,5)\n"+\
+         "With multiple atoms, the atoms within the radius from any of them are unfrozen")
+    parser.add_argument('-p', '--point', nargs=3, type=float, metavar=('X', 'Y', 'Z'), \
+    help="Center point (in Angstrom) for -r")
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes for multiple files; 0 uses all CPUs")
+    parser.add_argument('-d', '--dry-run', action='store_true', \
+    help="Print the changes as a unified diff without modifying the files")
     args = parser.parse_args()
     return args
-    
-def freeze_layer(file_name, index):
-    # Read a Gaussian input file
-    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
 
+def freeze_radius(df_geom, radius, center_atoms=None, center_point=None):
+    """
+    Set the Index column of a geometry from readinput to 0 for the atoms within radius
+    from the center atoms or point, and -1 for all the others.
+    Minimum-image distances are used if lattice vectors (Tv) are present.
+    """
+    if (center_atoms is None) == (center_point is None):
+        raise ValueError("Either center atoms or a center point must be provided")
+    if radius <= 0:
+        raise ValueError("Radius must be positive")
+
+    df_atoms, lattice = split_lattice(df_geom)
+    coords = np.array(df_atoms[['x','y','z']], dtype=float)
+
+    if center_atoms is not None:
+        center_atoms = np.array(center_atoms, dtype=int)
+        if np.any(center_atoms < 1) or np.any(center_atoms > len(coords)):
+            raise ValueError("Center atom numbers must be between 1 and {}".format(len(coords)))
+        points = coords[center_atoms - 1]
+    else:
+        points = np.array([center_point], dtype=float)
+
+    dist = distance_to_points(coords, points, radius, lattice)
+
+    if "Index" not in df_geom.columns:
+        df_geom.insert(1, "Index", None)
+    df_geom["Index"] = None
+    df_geom.loc[df_atoms.index, "Index"] = np.where(np.isfinite(dist), 0, -1)
+
+    return df_geom
+
+def freeze_layers(route, df_geom, index='L'):
+    """
+    Set the Index column of a geometry from readinput to -1 for the atoms in the given
+    ONIOM layers ('H', 'M', 'L', or their combination) and 0 for the others.
+    'U' unfreezes all the atoms.
+    """
     if "oniom" not in route.lower():
         raise TypeError("Input structure must be in ONIOM scheme")
-        
-    if "Index" in df_geom.columns:
-        df_geom["Index"] = 0
-    else:
+
+    freezeIdx = list(index)
+    if 'U' in freezeIdx and len(freezeIdx) > 1:
+        raise ValueError("U cannot be combined with other layer indices.")
+    for layer in freezeIdx:
+        if layer not in ['H', 'M', 'L', 'U']:
+            raise ValueError("Layer index must be H, M, L, their combination, or U")
+
+    if "Index" not in df_geom.columns:
         df_geom.insert(1, "Index", 0)
-        
-    # Read index for freezing
-    freezeIdx = list(freezeIdx)    
-    if 'U' in freezeIdx:
-        if len(freezeIdx) > 1:
-            raise ValueError("U cannot be combined with other layer indices.")
+    df_geom["Index"] = 0
+    df_geom.loc[df_geom["ONIOM_layer"].isin(freezeIdx), "Index"] = -1
+
+    return df_geom
 
+def freeze_layer(file_name, index, radius=None, center_atoms=None, center_point=None, dry_run=False):
+    # Read a Gaussian input file
+    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
+
+    if radius is not None:
+        df_geom = freeze_radius(df_geom, radius, center_atoms, center_point)
     else:
-        for layer in freezeIdx:
-            if layer not in ['H', 'M', 'L']:
-                raise ValueError("Layer index must be H, M, L, their combination, or U")
-                        
-            df_geom.loc[df_geom["ONIOM_layer"] == layer, "Index"] = -1
+        df_geom = freeze_layers(route, df_geom, index)
 
     # Write Gaussian input file
-    with open(file_name, 'w') as output:
-        output.write(f"{route}\n")
-        output.write(f"{title}\n")
-        output.write(charge_mult)
-        output.write(df_geom.to_csv(index=False, header=False, sep='\t'))
-        output.write('\n\n')
-        output.writelines(connectivity)
-        output.write('\n')
+    text = [f"{route}\n", f"{title}\n", charge_mult]
+    text.append(format_geometry(df_geom))
+    text.append('\n\n')
+    text += connectivity
+    text.append('\n')
+
+    return update_file(file_name, ''.join(text), dry_run)
 
 def main():
     args = parse_args()
-    freeze_layer(args.file_name, args.index)
+    file_names = expand_files(args.file_name)
+    run_batch(freeze_layer, file_names,
+              (args.index, args.radius, args.atoms, args.point, args.dry_run), args.jobs)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+import os
+import numpy as np
+import pandas as pd
+import argparse
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import split_lattice, inner_name
+from gaussianutility.formats import read_structure
+from gaussianutility.neighbors import neighbor_list, complete_basis
+from gaussianutility.connectivity import covalent_radii, bond_tolerance
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Report the bond lengths, bond angles, coordination numbers, and closest non-bonded\n"
+                     "contacts of a structure (.com, .out, .xyz, .vasp)\n"
+                     "Two atoms are bonded when their distance is below the sum of covalent radii plus\n"
+                     "the tolerance; with lattice vectors (Tv), the distances follow the minimum image\n"
+                     "convention and bonds across the cell boundaries are found as well\n"
+                     "A summary per element pair (and triple for angles) is printed\n\n"
+                     "Return file_name_bonds.csv: Bonds (atoms from 1, elements, length, lattice shift)\n"
+                     "       file_name_angles.csv: Angles (atom, center, atom, elements, angle)\n"
+                     "       file_name_atoms.csv: Coordination number of every atom\n"
+                     "       file_name_contacts.csv: Closest non-bonded contact of every element pair",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', help='Structure file (.com, .gjf, .out, .log, .xyz, .vasp)')
+    parser.add_argument('-i', '--index', default=None, \
+    help='Optimization step or trajectory frame; for outputs, -1 (default) for the last geometry')
+    parser.add_argument('-t', '--tolerance', type=float, default=bond_tolerance, \
+    help='Added to the sum of covalent radii for bonds in Angstrom (default: {})'.format(bond_tolerance))
+    parser.add_argument('-c', '--contact', type=float, default=4.0, \
+    help='Largest distance of the non-bonded contacts in Angstrom (default: 4.0)')
+    parser.add_argument('-n', '--no-csv', action='store_true', \
+    help='Print the summary only')
+    args = parser.parse_args()
+    return args
+
+def _pair_labels(first, second, center=None):
+    # Element pairs in alphabetical order, e.g., O-Si, or triples around the center, e.g., O-Si-O
+    first, second = np.asarray(first, dtype=str), np.asarray(second, dtype=str)
+    swap = first > second
+    low, high = np.where(swap, second, first), np.where(swap, first, second)
+    if center is not None:
+        low = np.char.add(np.char.add(low, '-'), np.asarray(center, dtype=str))
+    return np.char.add(np.char.add(low, '-'), high)
+
+def bond_angles(bonds, vectors, n_atoms):
+    """
+    Angles between every two bonds of the same atom, from bonds (i, j) and their vectors (j - i).
+    The bonds of an atom are gathered per number of bonds, so the angles of all the atoms
+    with the same number of bonds are computed at once.
+    Return the atoms (atom, center, atom) as an (n_angles, 3) array and the angles in degree.
+    """
+    center = np.concatenate([bonds[:, 0], bonds[:, 1]])
+    other = np.concatenate([bonds[:, 1], bonds[:, 0]])
+    vectors = np.concatenate([vectors, -vectors])
+
+    order = np.argsort(center, kind='stable')
+    center, other, vectors = center[order], other[order], vectors[order]
+    degree = np.bincount(center, minlength=n_atoms)
+    starts = np.cumsum(degree) - degree
+
+    triples, angles = [np.zeros((0, 3), dtype=int)], [np.zeros(0)]
+    for d in np.unique(degree[degree > 1]):
+        atoms = np.flatnonzero(degree == d)
+        slots = starts[atoms][:, None] + np.arange(d)
+        first, second = np.triu_indices(d, 1)
+        a, b = slots[:, first].ravel(), slots[:, second].ravel()
+
+        cos = np.einsum('ij,ij->i', vectors[a], vectors[b])
+        cos /= np.linalg.norm(vectors[a], axis=1) * np.linalg.norm(vectors[b], axis=1)
+        triples.append(np.stack([other[a], center[a], other[b]], axis=1))
+        angles.append(np.degrees(np.arccos(np.clip(cos, -1, 1))))
+
+    return np.concatenate(triples), np.concatenate(angles)
+
+def analyze(atoms, coords, lattice=None, tolerance=bond_tolerance, contact=4.0):
+    """
+    Bonds, angles, coordination numbers, and closest non-bonded contacts of a geometry,
+    from one neighbor list (cell lists, minimum image with the lattice vectors).
+    Every bond to a lattice image is a bond of its own. Atoms are 0-based.
+    Return a dictionary of arrays: bonds (n_bonds, 2), bond_shifts (n_bonds, 3), bond_lengths,
+    angles (n_angles, 3; atom, center, atom), angle_values (degree), coordination (n_atoms,),
+    and contacts (n_pairs, 2), contact_lengths, and contact_elements for every element pair.
+    """
+    atoms = np.asarray(atoms, dtype=str)
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    radii = covalent_radii(atoms)
+    basis, _ = complete_basis(lattice)
+
+    cutoff = max(2 * radii.max() + tolerance, contact) if len(radii) else contact
+    i, j, dist, shift = neighbor_list(coords, cutoff, lattice)
+
+    bonded = (dist <= radii[i] + radii[j] + tolerance) & (dist > 0)
+    bonds = np.stack([i[bonded], j[bonded]], axis=1)
+    vectors = coords[j[bonded]] + shift[bonded] @ basis - coords[i[bonded]]
+    angles, angle_values = bond_angles(bonds, vectors, len(atoms))
+
+    # Closest non-bonded contact of every element pair
+    free = ~bonded & (dist <= contact)
+    pairs = _pair_labels(atoms[i[free]], atoms[j[free]])
+    order = np.lexsort((dist[free], pairs))
+    labels, first = np.unique(pairs[order], return_index=True)
+    closest = np.flatnonzero(free)[order[first]]
+
+    return {'bonds': bonds, 'bond_shifts': shift[bonded], 'bond_lengths': dist[bonded],
+            'angles': angles, 'angle_values': angle_values,
+            'coordination': np.bincount(bonds.ravel(), minlength=len(atoms)),
+            'contacts': np.stack([i[closest], j[closest]], axis=1), 'contact_lengths': dist[closest],
+            'contact_elements': labels}
+
+def info_tables(atoms, info):
+    """
+    Tables (dataframes) of the bonds, angles, atoms, and contacts with atom numbers from 1
+    """
+    atoms = np.asarray(atoms, dtype=str)
+    bonds, angles, contacts = info['bonds'], info['angles'], info['contacts']
+
+    df_bonds = pd.DataFrame({'atom1': bonds[:, 0] + 1, 'atom2': bonds[:, 1] + 1,
+                             'elements': _pair_labels(atoms[bonds[:, 0]], atoms[bonds[:, 1]]),
+                             'length': info['bond_lengths'], 'a': info['bond_shifts'][:, 0],
+                             'b': info['bond_shifts'][:, 1], 'c': info['bond_shifts'][:, 2]})
+
+    df_angles = pd.DataFrame({'atom1': angles[:, 0] + 1, 'center': angles[:, 1] + 1, 'atom3': angles[:, 2] + 1,
+                              'elements': _pair_labels(atoms[angles[:, 0]], atoms[angles[:, 2]], atoms[angles[:, 1]]),
+                              'angle': info['angle_values']})
+
+    df_atoms = pd.DataFrame({'atom': np.arange(1, len(atoms) + 1), 'element': atoms,
+                             'coordination': info['coordination']})
+
+    df_contacts = pd.DataFrame({'elements': info['contact_elements'], 'atom1': contacts[:, 0] + 1,
+                                'atom2': contacts[:, 1] + 1, 'distance': info['contact_lengths']})
+
+    return df_bonds, df_angles, df_atoms, df_contacts
+
+def summary(df_bonds, df_angles, df_atoms, df_contacts):
+    text = []
+    stats = lambda df, column: df.groupby('elements')[column].agg(['count', 'mean', 'min', 'max'])
+
+    text.append("Bonds (Angstrom)          count      mean       min       max")
+    for label, row in stats(df_bonds, 'length').iterrows():
+        text.append("  {:20s} {:8d} {:9.4f} {:9.4f} {:9.4f}".format(label, int(row['count']), row['mean'], row['min'], row['max']))
+
+    text.append("Angles (degree)           count      mean       min       max")
+    for label, row in stats(df_angles, 'angle').iterrows():
+        text.append("  {:20s} {:8d} {:9.2f} {:9.2f} {:9.2f}".format(label, int(row['count']), row['mean'], row['min'], row['max']))
+
+    text.append("Coordination numbers      atoms      mean  distribution")
+    for element, group in df_atoms.groupby('element')['coordination']:
+        counts = group.value_counts().sort_index()
+        text.append("  {:20s} {:8d} {:9.2f}  {}".format(element, len(group), group.mean(),
+                    ", ".join("{}: {}".format(cn, n) for cn, n in counts.items())))
+
+    text.append("Closest non-bonded contacts    distance  atoms")
+    for _, row in df_contacts.iterrows():
+        text.append("  {:20s} {:14.4f}  {} {}".format(row['elements'], row['distance'], row['atom1'], row['atom2']))
+
+    return "\n".join(text) + "\n"
+
+def geom_info(file_name, step=None, tolerance=bond_tolerance, contact=4.0, csv=True):
+    structure = read_structure(file_name, step)
+    df_atoms, lattice = split_lattice(structure['geom'])
+    atoms = df_atoms['Atom'].to_numpy(dtype=str)
+    coords = np.array(df_atoms[['x','y','z']], dtype=float)
+
+    info = analyze(atoms, coords, lattice, tolerance, contact)
+    tables = info_tables(atoms, info)
+
+    if csv:
+        name = os.path.splitext(inner_name(file_name))[0]
+        for suffix, table in zip(['_bonds', '_angles', '_atoms', '_contacts'], tables):
+            table.to_csv(name + suffix + ".csv", index=False)
+
+    return summary(*tables)
+
+def main():
+    args = parse_args()
+    print(geom_info(args.file_name, args.index, args.tolerance, args.contact, not args.no_csv), end='')
+
+if __name__ == "__main__":
+    main()
@@ -5,26 +5,40 @@ import math as m
 import sys
 import argparse
 from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import open_file, inner_name
+from gaussianutility import profiling
 
 # Thermodynamic constants
 kB = 1.380649e-23 # J/K
 h = 6.62607015e-34 # Js
 Rgas = 8.3144626 # J/mol/K
 Na = 6.02214076e23
+c = 299792458 # m/s
+amu = 1.66053906660e-27 # kg
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description= """
         Calculate Gibbs free energy (in Hartrees) at different tempeature(s) from Gaussian output file (.out)
         The Gaussian job must be normally terminated with frequency calculation
+        A formatted checkpoint file (.fchk) of a frequency calculation can be given instead;
+        its rotational symmetry number is not stored, so give it with -s (default: 1)
+        With a .fchk file, -I recomputes the frequencies of an isotopologue from the force constants,
+        e.g., -I H=2 for all deuterium or -I 1=13,5=2 for atoms 1 and 5 (see isotopeFreq)
         Print temperatures and Gibbs free energies on terminal.
         """,
         formatter_class=RawTextHelpFormatter)
 
-    parser.add_argument('file_name', help='Gaussian output file (.out)')
+    parser.add_argument('file_name', help='Gaussian output file (.out) or formatted checkpoint file (.fchk)')
     parser.add_argument('T1', type=float, help='Temperature to calculate G (in K)')
     parser.add_argument('T2', type=float, nargs='?', help='Upper bound of temperature range (in K)')
     parser.add_argument('step_number', type=int, nargs='?', help="Number of steps of temperature between T1 and T2 to calculate G", default=20)
+    parser.add_argument('-s', '--symmetry', type=float, default=1, \
+    help="Rotational symmetry number for .fchk files (default: 1)")
+    parser.add_argument('-I', '--isotopes', \
+    help="Isotope pattern for .fchk files, e.g., H=2 or C=13,5=2")
+    parser.add_argument('--profile', action='store_true', \
+    help="Report the time of each phase as JSON lines on stderr")
     args = parser.parse_args()
     return args
     
@@ -67,17 +81,12 @@ def Contributions(temp, mass, press, vibTemp, multiplicity, rho_r, theta_r):
     
     return Stot, Etot # return total entropy and energy corrections
     
-def gibbs_temp(file_name, T1, T2, step_number):
-    #Set temperature based on the provided arguments
-    if T2:
-        temperature = np.linspace(T1, T2, step_number)
-    else:
-        temperature = np.array([T1])
-
-    # Exctract thermochemistry result from the output file
-    with open(file_name, 'r') as inFile:
-        lines = inFile.readlines()
-
+def read_thermochemistry(lines):
+    """
+    Thermochemistry of the frequency calculation in the lines of a Gaussian output file.
+    Return mass (kg), pressure (Pa), rotational symmetry number and temperatures (empty for atoms),
+    vibrational temperatures (K), multiplicity, and electronic energy (J/mol).
+    """
     multiplicity = None
     thermochem = []
     collecting_thermochem = False
@@ -123,13 +132,109 @@ def gibbs_temp(file_name, T1, T2, step_number):
             except: ValueError
     
     vibTemp = np.array(vibTemp)
+    if 'rho_r' not in locals():
+        rho_r = []
+        theta_r = []
+
+    return mass, press, rho_r, theta_r, vibTemp, multiplicity, ElectE
+
+def rotational_temperatures(masses, coords):
+    """
+    Rotational temperatures (K) from the principal moments of inertia of the atoms
+    (masses in AMU, coordinates in Angstrom); one for linear molecules and none for atoms
+    """
+    masses = np.asarray(masses, dtype=float) * amu
+    coords = np.asarray(coords, dtype=float) * 1e-10
+    if len(masses) < 2:
+        return np.array([])
+
+    coords = coords - masses @ coords / masses.sum()
+    inertia = np.eye(3) * np.einsum('i,ij,ij->', masses, coords, coords) - np.einsum('i,ij,ik->jk', masses, coords, coords)
+    moments = np.linalg.eigvalsh(inertia)
+    if moments[0] < 1e-3 * moments[2]:
+        moments = moments[2:]
+
+    return h**2 / (8 * m.pi**2 * moments * kB)
+
+def harmonic_thermochemistry(masses, coords, frequencies, multiplicity, energy, symmetry=1):
+    """
+    Thermochemistry as read_thermochemistry at 1 atm from the masses (AMU), coordinates (Angstrom),
+    frequencies (cm-1; the imaginary modes are ignored), and electronic energy (Hartree)
+    """
+    frequencies = np.asarray(frequencies, dtype=float)
+    theta_r = rotational_temperatures(masses, coords)
+    rho_r = symmetry if len(theta_r) else []
+    vibTemp = frequencies[frequencies > 0] * 100 * c * h / kB
+
+    return np.sum(masses) * amu, 101325, rho_r, theta_r, vibTemp, multiplicity, energy * 2625.4996394799e3
+
+def fchk_thermochemistry(file_name, symmetry=1, isotopes=None):
+    """
+    Thermochemistry as read_thermochemistry from a formatted checkpoint file of a frequency calculation;
+    the masses are the atomic weights of the file. With an isotope pattern (see gaussianutility.isotopes),
+    or without the frequencies (Vib-E2) in the file, the frequencies are computed from the force constants.
+    """
+    from gaussianutility.fchk import read_fchk, structure, vibrations
+    from gaussianutility.isotopes import isotopologues
+
+    sections = {}
+    if isotopes is None:
+        sections = read_fchk(file_name, ['Atomic numbers', 'Current cartesian coordinates', 'Real atomic weights',
+                                         'Charge', 'Multiplicity', 'Total Energy', 'Number of Normal Modes', 'Vib-E2'])
+    if 'Vib-E2' in sections:
+        atoms, coords, charge, multiplicity = structure(sections)
+        masses, energy = sections['Real atomic weights'], sections['Total Energy']
+        frequencies = vibrations(sections)['frequencies']
+    else:
+        masses, analysis, data = isotopologues(file_name, [isotopes])
+        masses, frequencies = masses[0], analysis['frequencies'][0]
+        coords, multiplicity, energy = data['coords'], data['multiplicity'], data['energy']
+
+    return harmonic_thermochemistry(masses, coords, frequencies, multiplicity, energy, symmetry)
+
+def thermochemistry(file_name, symmetry=1, isotopes=None):
+    """
+    Thermochemistry (see read_thermochemistry) of a Gaussian output file (.out)
+    or a formatted checkpoint file (.fchk; see fchk_thermochemistry)
+    """
+    if inner_name(file_name).lower().endswith('.fchk'):
+        return fchk_thermochemistry(file_name, symmetry, isotopes)
+    if isotopes is not None:
+        raise TypeError("Isotopes need the force constants of a formatted checkpoint file (.fchk)")
+
+    with open_file(file_name) as inFile:
+        lines = inFile.readlines()
+    profiling.checkpoint('read', lines)
+    thermo = read_thermochemistry(lines)
+    profiling.checkpoint('scan', lines=len(lines))
+    return thermo
+
+@profiling.profiled('gibbs_temp')
+def gibbs_temp(file_name, T1, T2, step_number, symmetry=1, isotopes=None):
+    #Set temperature based on the provided arguments
+    if T2:
+        temperature = np.linspace(T1, T2, step_number)
+    else:
+        temperature = np.array([T1])
+
+    # Exctract thermochemistry result from the output file
+    Gibbs = gibbs_energy(temperature, *thermochemistry(file_name, symmetry, isotopes))
+
+    temperature = np.ndarray.tolist(np.round(temperature,decimals=6))
+    Gibbs = np.ndarray.tolist(np.round(Gibbs,decimals=6))
+    profiling.checkpoint('math')
 
+    print("Temperature [K]: " + str(temperature).strip('[]'))
+    print("Gibbs free energy [Hartree]: " + str(Gibbs).strip('[]'))
+
+def gibbs_energy(temperature, mass, press, rho_r, theta_r, vibTemp, multiplicity, ElectE):
+    """
+    Gibbs free energies (Hartree) at the temperatures (array, K) from the thermochemistry
+    as returned by read_thermochemistry
+    """
     # Arrays of entropy and energy corrections in the given temperature (range)
     StotArr=[]
     EtotArr=[]
-    if 'rho_r' not in locals():
-        rho_r = []
-        theta_r = []
 
     for temp in temperature:
         Stot, Etot = Contributions(temp, mass, press, vibTemp, multiplicity, rho_r, theta_r)
@@ -141,17 +246,13 @@ def gibbs_temp(file_name, T1, T2, step_number):
     
     Hcorr = EtotArr + kB*temperature*Na # Thermal corrections to Enthalpy
     Gcorr = Hcorr - temperature * StotArr # Thermal corrections to Free energy
-    Gibbs = (ElectE + Gcorr) / 2625.4996394799e3 # Final Gibbs free energy in Hartree
-
-    temperature = np.ndarray.tolist(np.round(temperature,decimals=6))
-    Gibbs = np.ndarray.tolist(np.round(Gibbs,decimals=6))
-
-    print("Temperature [K]: " + str(temperature).strip('[]'))
-    print("Gibbs free energy [Hartree]: " + str(Gibbs).strip('[]'))
+    return (ElectE + Gcorr) / 2625.4996394799e3 # Final Gibbs free energy in Hartree
 
 def main():
     args = parse_args()
-    gibbs_temp(args.file_name, args.T1, args.T2, args.step_number)
+    if args.profile:
+        profiling.enable()
+    gibbs_temp(args.file_name, args.T1, args.T2, args.step_number, args.symmetry, args.isotopes)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import sqlite3
+import argparse
+from argparse import RawTextHelpFormatter
+from concurrent.futures import ProcessPoolExecutor
+from gaussianutility.utilities import expand_files, open_file, inner_name, read_route
+from gaussianutility.printE import read_E, split_jobs
+from gaussianutility.prefetch import prefetched
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Collect the results of Gaussian output files into a SQLite database\n"
+                     "Directories are searched recursively for .out and .log files (also compressed)\n"
+                     "Every linked job (--Link1--) is stored with the values printed by printE:\n"
+                     "  stoichiometry, job type, E, E+ZPE, H, G, number of imaginary frequencies,\n"
+                     "  and route section and charge/multiplicity\n"
+                     "Files whose size and modification time did not change since the last run are skipped,\n"
+                     "unless they failed to be parsed; files deleted from the given directories are removed\n\n"
+                     "Return results.db: SQLite database (tables files and jobs)",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('path', nargs='*', help='Gaussian output file(s), director(ies), or glob pattern(s)')
+    parser.add_argument('-d', '--database', default='results.db', \
+    help="SQLite database file (default: results.db)")
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes for parsing; 0 uses all CPUs")
+    parser.add_argument('-l', '--lowest', choices=['E', 'EZPE', 'H', 'G'], \
+    help="Print the job with the lowest value of each stoichiometry")
+    parser.add_argument('-q', '--query', \
+    help="Print the result of an SQL query, e.g., \"SELECT * FROM jobs WHERE imagf > 0\"")
+    args = parser.parse_args()
+    return args
+
+# Values of a job; the energies are stored as numbers
+columns = ['stoich', 'job_type', 'E', 'EZPE', 'H', 'G', 'imagf', 'route', 'charge_mult']
+
+schema = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY, size INTEGER, mtime REAL, normal INTEGER, error TEXT);
+CREATE TABLE IF NOT EXISTS jobs (
+    path TEXT, job INTEGER, stoich TEXT, job_type TEXT, E REAL, EZPE REAL, H REAL, G REAL,
+    imagf INTEGER, route TEXT, charge_mult TEXT, PRIMARY KEY (path, job));
+CREATE INDEX IF NOT EXISTS jobs_stoich_E ON jobs (stoich, E);
+CREATE INDEX IF NOT EXISTS jobs_stoich_G ON jobs (stoich, G);
+"""
+
+def connect(database):
+    """
+    Open the database and create the tables if they do not exist
+    """
+    connection = sqlite3.connect(database)
+    connection.executescript(schema)
+    return connection
+
+def find_logs(paths):
+    """
+    Gaussian output files in the given files, directories (recursively), and glob patterns
+    """
+    for path in expand_files(paths):
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if inner_name(name).endswith(('.out', '.log')):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def _number(value, kind=float):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+def read_jobs(file_name):
+    """
+    Results of every linked job in a Gaussian output file, as read by printE.
+    Return a list of dictionaries with the values in columns, and whether the
+    calculation was normally terminated.
+    """
+    with open_file(file_name) as inputfile:
+        lines = inputfile.readlines()
+    if not lines:
+        return [], False
+
+    calc_lines, normal = split_jobs(lines)
+
+    jobs = []
+    for calc in calc_lines:
+        result = read_E(calc)
+        try:
+            route, charge_mult, _ = read_route(calc)
+        except (IndexError, UnboundLocalError):
+            route, charge_mult = None, None
+
+        jobs.append({'stoich': result['stoich'] or None, 'job_type': result['job type'],
+                     'E': _number(result['E']), 'EZPE': _number(result.get('EZPE')),
+                     'H': _number(result.get('H')), 'G': _number(result.get('G')),
+                     'imagf': _number(result.get('imagf'), int),
+                     'route': route, 'charge_mult': charge_mult})
+    return jobs, normal
+
+def _parse(file_name):
+    try:
+        jobs, normal = read_jobs(file_name)
+        return file_name, jobs, normal, None
+    except Exception as error:
+        return file_name, [], False, "{}: {}".format(type(error).__name__, error)
+
+def _parse_all(file_names, jobs=1):
+    # Parse the files in a process pool when jobs > 1 (jobs=0 uses all CPUs)
+    jobs = jobs or os.cpu_count()
+    if jobs == 1 or len(file_names) < 2:
+        yield from map(_parse, prefetched(file_names))
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(file_names))) as executor:
+        yield from executor.map(_parse, file_names, chunksize=16)
+
+def _vanished(stored, paths):
+    # Stored files that no longer exist under the given directories, or given by name
+    roots = [os.path.join(os.path.abspath(path), '') for path in expand_files(paths) if os.path.isdir(path)]
+    named = {os.path.abspath(path) for path in expand_files(paths)}
+    return [path for path in stored if (path in named or path.startswith(tuple(roots))) and not os.path.exists(path)]
+
+def ingest(paths, database='results.db', jobs=1):
+    """
+    Add or update the results of the Gaussian output files in the database,
+    skipping files with the same size and modification time as stored (and parsed without an error).
+    Files deleted from the given directories (or given by name) are removed from the database.
+    Return the numbers of files parsed, skipped, and failed.
+    """
+    connection = connect(database)
+    stored = {path: (size, mtime) for path, size, mtime in connection.execute("SELECT path, size, mtime FROM files")}
+    parsed = {path for path, in connection.execute("SELECT path FROM files WHERE error IS NULL")}
+
+    with connection:
+        for path in _vanished(stored, paths):
+            connection.execute("DELETE FROM jobs WHERE path = ?", (path,))
+            connection.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    todo = {}
+    skipped, missing = 0, 0
+    for file_name in find_logs(paths):
+        path = os.path.abspath(file_name)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            missing += 1
+            print("!!!Error in " + path + ": no such file", file=sys.stderr)
+            continue
+        if path in parsed and stored[path] == (stat.st_size, stat.st_mtime):
+            skipped += 1
+        else:
+            todo[path] = (stat.st_size, stat.st_mtime)
+
+    failed = 0
+    with connection:
+        for path, records, normal, error in _parse_all(list(todo), jobs):
+            if error:
+                failed += 1
+                print("!!!Error in " + path + ": " + error, file=sys.stderr)
+
+            size, mtime = todo[path]
+            connection.execute("DELETE FROM jobs WHERE path = ?", (path,))
+            connection.executemany(
+                "INSERT INTO jobs VALUES (?, ?, {})".format(", ".join("?" * len(columns))),
+                [(path, idx + 1) + tuple(record[column] for column in columns) for idx, record in enumerate(records)])
+            connection.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                               (path, size, mtime, int(normal), error))
+
+    connection.close()
+
+    return len(todo) - failed, skipped, failed + missing
+
+def lowest(database, value='G'):
+    """
+    Job with the lowest value (E, EZPE, H, or G) of each stoichiometry.
+    Return rows of stoichiometry, value, path, and job number.
+    """
+    if value not in ('E', 'EZPE', 'H', 'G'):
+        raise ValueError("Value must be E, EZPE, H, or G")
+
+    connection = connect(database)
+    # SQLite takes the other columns from the row with the minimum
+    rows = connection.execute(
+        "SELECT stoich, MIN({0}), path, job FROM jobs WHERE {0} IS NOT NULL "
+        "GROUP BY stoich ORDER BY stoich".format(value)).fetchall()
+    connection.close()
+    return rows
+
+def query(database, sql):
+    connection = connect(database)
+    cursor = connection.execute(sql)
+    header = [description[0] for description in cursor.description or []]
+    rows = cursor.fetchall()
+    connection.close()
+    return header, rows
+
+def main():
+    args = parse_args()
+
+    if args.path:
+        parsed, skipped, failed = ingest(args.path, args.database, args.jobs)
+        print("{} files parsed, {} unchanged, {} failed".format(parsed, skipped, failed))
+
+    if args.lowest:
+        print("\t".join(['stoich', args.lowest, 'path', 'job']))
+        for row in lowest(args.database, args.lowest):
+            print("\t".join(str(value) for value in row))
+
+    if args.query:
+        header, rows = query(args.database, args.query)
+        print("\t".join(header))
+        for row in rows:
+            print("\t".join('' if value is None else str(value) for value in row))
+
+if __name__ == "__main__":
+    main()
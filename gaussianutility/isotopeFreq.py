@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+import os
+import numpy as np
+import pandas as pd
+import argparse
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import inner_name
+from gaussianutility.isotopes import isotopologues
+from gaussianutility.gibbsTemp import harmonic_thermochemistry, gibbs_energy
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Harmonic frequencies of isotopologues from the Cartesian force constants of a frequency\n"
+                     "calculation in a formatted checkpoint file (.fchk, from formchk), without new jobs\n"
+                     "For every isotope pattern, the force constants are mass-weighted and the translations\n"
+                     "and rotations are projected out; all the patterns are diagonalized at once\n"
+                     "The masses of the job are the reference pattern; a pattern is a comma-separated list of\n"
+                     "target=isotope, where the target is an element (all its atoms) or an atom number and\n"
+                     "the isotope is a mass number or a mass with a decimal point\n\n"
+                     "Examples of command line usage are:\n"
+                     "    isotopeFreq file_name.fchk -p H=2 C=13 1=13,7=2\n"
+                     "    isotopeFreq file_name.fchk -p O=18 -t 350 -s 2\n\n"
+                     "Return file_name_isotopes.csv: Frequencies (and IR intensities) of every pattern",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', help='Formatted checkpoint file (.fchk) of a frequency calculation')
+    parser.add_argument('-p', '--patterns', nargs='+', default=[], \
+    help="Isotope patterns, e.g., H=2 or C=13,5=2")
+    parser.add_argument('-t', '--temperature', type=float, default=298.15, \
+    help="Temperature of the Gibbs free energies in K (default: 298.15)")
+    parser.add_argument('-s', '--symmetry', type=float, default=1, \
+    help="Rotational symmetry number (default: 1)")
+    parser.add_argument('-n', '--no-csv', action='store_true', \
+    help="Print the summary only")
+    args = parser.parse_args()
+    return args
+
+Hartree2kcal = 627.5095
+# cm-1 in Hartree
+Wavenumber2Hartree = 4.556335252912e-6
+
+def isotope_table(patterns, analysis):
+    """
+    Table (dataframe) of the frequencies (and IR intensities) of every mode and pattern
+    """
+    table = {'mode': np.arange(1, analysis['frequencies'].shape[1] + 1)}
+    for idx, pattern in enumerate(patterns):
+        table['freq_' + pattern] = analysis['frequencies'][idx]
+        if 'ir_intensities' in analysis:
+            table['ir_' + pattern] = analysis['ir_intensities'][idx]
+    return pd.DataFrame(table)
+
+def isotope_freq(file_name, patterns, temperature=298.15, symmetry=1, csv=True):
+    patterns = ['natural'] + [pattern for pattern in patterns if pattern.lower() != 'natural']
+    masses, analysis, data = isotopologues(file_name, patterns)
+
+    text = ["{:20s} {:>10s} {:>8s} {:>14s} {:>16s} {:>12s}".format(
+            'Pattern', 'Mass', 'N(imag)', 'ZPE(kcal/mol)', 'G(Hartree)', 'dG(kcal/mol)')]
+    reference = None
+    for idx, pattern in enumerate(patterns):
+        frequencies = analysis['frequencies'][idx]
+        zpe = frequencies[frequencies > 0].sum() / 2 * Wavenumber2Hartree * Hartree2kcal
+        thermo = harmonic_thermochemistry(masses[idx], data['coords'], frequencies, data['multiplicity'],
+                                          data['energy'], symmetry)
+        gibbs = gibbs_energy(np.array([temperature]), *thermo)[0]
+        reference = gibbs if reference is None else reference
+        text.append("{:20s} {:10.4f} {:8d} {:14.4f} {:16.6f} {:12.4f}".format(
+                    pattern, masses[idx].sum(), int((frequencies < 0).sum()), zpe, gibbs,
+                    (gibbs - reference) * Hartree2kcal))
+
+    if csv:
+        name = os.path.splitext(inner_name(file_name))[0]
+        isotope_table(patterns, analysis).to_csv(name + "_isotopes.csv", index=False)
+
+    return "\n".join(text) + "\n"
+
+def main():
+    args = parse_args()
+    print(isotope_freq(args.file_name, args.patterns, args.temperature, args.symmetry, not args.no_csv), end='')
+
+if __name__ == "__main__":
+    main()
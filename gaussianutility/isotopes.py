@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from periodictable import elements
+from gaussianutility.fchk import read_fchk, structure, hessian, dipole_derivatives
+from gaussianutility import profiling
+
+"""
+
+Harmonic frequencies of isotopologues from the Cartesian force constants of a finished
+frequency calculation (formatted checkpoint file), without running freq=readisotopes.
+The force constants do not depend on the masses: for every isotope pattern (masses of the atoms),
+they are mass-weighted, the translations and rotations are projected out, and the internal
+block is diagonalized. All the patterns are diagonalized at once by batched numpy eigh.
+
+An isotope pattern is a comma-separated list of target=isotope entries; the target is an element
+symbol (all the atoms of the element) or an atom number (from 1), and the isotope is a mass number
+or a mass in AMU (with a decimal point), e.g., 'H=2', 'C=13,7=2', or '3=2.0141'.
+Entries are applied in order, so an atom entry after an element entry overrides it.
+
+"""
+
+# sqrt(Hartree/Bohr^2/AMU) in cm-1
+Hessian2Wavenumber = 5140.48714
+# (e^2/AMU) of dipole derivatives squared in KM/Mole
+IR2KMmol = 974.8801
+
+fchk_sections = ['Atomic numbers', 'Current cartesian coordinates', 'Real atomic weights', 'Charge', 'Multiplicity',
+                 'Total Energy', 'Cartesian Force Constants', 'Dipole Derivatives']
+
+def isotope_masses(atoms, pattern, masses=None):
+    """
+    Masses (AMU) of the atoms with an isotope pattern applied to the masses
+    (default: the most abundant isotopes). Return an array of shape (n_atoms,).
+    """
+    atoms = [str(atom) for atom in atoms]
+    if masses is None:
+        masses = [_isotope(atom, None) for atom in atoms]
+    masses = np.array(masses, dtype=float)
+
+    for entry in (pattern or '').replace(' ', '').split(','):
+        if not entry or entry.lower() == 'natural':
+            continue
+        if entry.count('=') != 1:
+            raise ValueError("Isotope entry '{}' must be target=isotope, e.g., H=2".format(entry))
+
+        target, isotope = entry.split('=')
+        if target.isdigit():
+            selected = [int(target) - 1]
+            if not 0 <= selected[0] < len(atoms):
+                raise ValueError("Atom {} is out of the {} atoms".format(target, len(atoms)))
+        else:
+            selected = [idx for idx, atom in enumerate(atoms) if atom.lower() == target.lower()]
+            if not selected:
+                raise ValueError("No {} atom is found for '{}'".format(target, entry))
+
+        for idx in selected:
+            masses[idx] = _isotope(atoms[idx], isotope)
+
+    return masses
+
+def _isotope(atom, isotope):
+    # Mass of an isotope (mass number or mass) of the element, or of its most abundant isotope
+    element = elements.symbol(atom)
+    if isotope is None:
+        abundant = max(element, key=lambda iso: iso.abundance, default=None)
+        return abundant.mass if abundant is not None and abundant.abundance else element.mass
+    if '.' in isotope:
+        return float(isotope)
+    try:
+        return element[int(isotope)].mass
+    except (ValueError, KeyError):
+        raise ValueError("{} has no isotope {}".format(atom, isotope))
+
+def external_basis(coords, masses):
+    """
+    Orthonormal basis of the mass-weighted Cartesian space for every set of masses (n_patterns, n_atoms):
+    the first k vectors are the translations and rotations (k = 5 for linear molecules, 6 otherwise,
+    3 for atoms) and the others span the internal motions.
+    Return the basis of shape (n_patterns, 3n, 3n) and k.
+    """
+    coords = np.asarray(coords, dtype=float)
+    masses = np.atleast_2d(np.asarray(masses, dtype=float))
+    n_atoms = len(coords)
+    sqrt_m = np.sqrt(masses)
+
+    centered = coords[None] - np.einsum('pi,ij->pj', masses, coords)[:, None] / masses.sum(axis=1)[:, None, None]
+    vectors = np.zeros((len(masses), n_atoms, 3, 6))
+    for axis in range(3):
+        vectors[:, :, axis, axis] = sqrt_m
+        unit = np.zeros(3)
+        unit[axis] = 1
+        vectors[:, :, :, 3 + axis] = np.cross(unit, centered) * sqrt_m[:, :, None]
+    vectors = vectors.reshape(len(masses), 3 * n_atoms, 6)
+
+    u, singular, _ = np.linalg.svd(vectors, full_matrices=True)
+    k = int((singular[0] > 1e-6 * singular[0, 0]).sum())
+    return u, k
+
+@profiling.profiled('harmonic_analysis', file_arg=None)
+def harmonic_analysis(force_constants, coords, masses, dipole_derivatives=None, chunk=None):
+    """
+    Projected harmonic frequencies of every set of masses (n_patterns, n_atoms) from the Cartesian
+    force constants (3n, 3n; Hartree/Bohr^2) at the coordinates (n_atoms, 3).
+    The internal block of the mass-weighted force constants of all the patterns is diagonalized at once.
+    Return a dictionary: frequencies (cm-1; negative for imaginary modes) and reduced_masses (AMU)
+    of shape (n_patterns, n_modes), modes (normalized Cartesian displacements) of shape
+    (n_patterns, n_modes, n_atoms, 3), and with the dipole derivatives (3n, 3),
+    ir_intensities (KM/Mole) of shape (n_patterns, n_modes).
+    The patterns are diagonalized in chunks of (3n)^2 x chunk values (default: 2^25, 256 MB).
+    """
+    force_constants = np.asarray(force_constants, dtype=float)
+    masses = np.atleast_2d(np.asarray(masses, dtype=float))
+    n_patterns, n_atoms = masses.shape
+    if force_constants.shape != (3 * n_atoms, 3 * n_atoms):
+        raise ValueError("Force constants of shape {} do not match {} atoms".format(force_constants.shape, n_atoms))
+
+    chunk = chunk or max(1, (1 << 25) // (9 * n_atoms**2))
+    if n_patterns > chunk:
+        parts = [harmonic_analysis(force_constants, coords, masses[start:start + chunk], dipole_derivatives, chunk)
+                 for start in range(0, n_patterns, chunk)]
+        return {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+
+    inv_sqrt_m = np.repeat(1 / np.sqrt(masses), 3, axis=1)
+    weighted = force_constants[None] * inv_sqrt_m[:, :, None] * inv_sqrt_m[:, None, :]
+    basis, k = external_basis(coords, masses)
+    internal = basis[:, :, k:]
+    profiling.checkpoint('project')
+
+    eigvals, eigvecs = np.linalg.eigh(internal.transpose(0, 2, 1) @ weighted @ internal)
+    profiling.checkpoint('eigh', nbytes=eigvecs.nbytes)
+
+    # Mass-weighted to Cartesian displacements of every mode
+    mw_modes = np.einsum('pij,pjm->pmi', internal, eigvecs)
+    cartesian = mw_modes * inv_sqrt_m[:, None, :]
+    norm = np.sqrt(np.einsum('pmi,pmi->pm', cartesian, cartesian))
+
+    analysis = {'frequencies': np.sign(eigvals) * np.sqrt(np.abs(eigvals)) * Hessian2Wavenumber,
+                'reduced_masses': 1 / norm**2,
+                'modes': (cartesian / norm[:, :, None]).reshape(n_patterns, -1, n_atoms, 3)}
+    if dipole_derivatives is not None:
+        derivatives = np.einsum('pmi,ix->pmx', cartesian, np.asarray(dipole_derivatives, dtype=float))
+        analysis['ir_intensities'] = IR2KMmol * np.einsum('pmx,pmx->pm', derivatives, derivatives)
+    return analysis
+
+def read_force_constants(file_name):
+    """
+    Atoms, coordinates (Angstrom), masses of the job (AMU), force constants (Hartree/Bohr^2),
+    and dipole derivatives (None if not in the file) of a formatted checkpoint file, as a dictionary
+    """
+    sections = read_fchk(file_name, fchk_sections)
+    if 'Cartesian Force Constants' not in sections:
+        raise TypeError('The formatted checkpoint file does not have Cartesian force constants; '
+                        'run formchk on the checkpoint file of a frequency calculation')
+
+    atoms, coords, charge, multiplicity = structure(sections)
+    masses = sections.get('Real atomic weights')
+    if masses is None:
+        masses = isotope_masses(atoms, None)
+    return {'atoms': atoms, 'coords': coords, 'masses': np.asarray(masses, dtype=float),
+            'charge': charge, 'multiplicity': multiplicity, 'energy': sections.get('Total Energy'),
+            'force_constants': hessian(sections),
+            'dipole_derivatives': dipole_derivatives(sections) if 'Dipole Derivatives' in sections else None}
+
+def isotopologues(file_name, patterns):
+    """
+    Harmonic analysis (see harmonic_analysis) of the isotope patterns of a formatted checkpoint file
+    at once; an empty pattern keeps the masses of the job. Return the masses (n_patterns, n_atoms),
+    the analysis, and the data of the file (see read_force_constants).
+    """
+    data = read_force_constants(file_name)
+    masses = np.array([isotope_masses(data['atoms'], pattern, data['masses']) for pattern in patterns])
+    analysis = harmonic_analysis(data['force_constants'], data['coords'], masses, data['dipole_derivatives'])
+    return masses, analysis, data
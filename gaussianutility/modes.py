@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from gaussianutility.utilities import open_file
+from gaussianutility import profiling
+
+"""
+
+Normal modes of a frequency calculation: frequencies, reduced masses, force constants,
+IR intensities, and the Cartesian displacement of every atom in every mode.
+Frozen atoms (e.g., of ONIOM layers) are not in the modes; atoms gives the atoms that are.
+The output is read in one pass; with freq=hpmodes, the high-precision blocks
+(5 modes per block, one row per coordinate) are used instead of the low-precision ones.
+
+"""
+
+# Rows of the header of a block of modes (low- and high-precision labels) and their keys
+labels = {'Frequencies': 'frequencies', 'Red. masses': 'reduced_masses', 'Reduced masses': 'reduced_masses',
+          'Frc consts': 'force_constants', 'Force constants': 'force_constants',
+          'IR Inten': 'ir_intensities', 'IR Intensities': 'ir_intensities'}
+
+def _values(line):
+    # Numbers after the '--' (low-precision) or '---' (high-precision) of a header row
+    return line.split('--', 1)[1].lstrip('-').split()
+
+def _displacements(rows, hp):
+    # Displacements of a block as an array of shape (modes, atoms, 3), the atom numbers, and the atomic numbers
+    rows = np.array(rows, dtype=float)
+    if hp:
+        # Coord Atom Element, then one column per mode; the rows are x, y, z of every atom
+        n_atoms = len(rows) // 3
+        disp = rows[:, 3:].reshape(n_atoms, 3, -1).transpose(2, 0, 1)
+        atoms, atomic_numbers = rows[::3, 1], rows[::3, 2]
+    else:
+        # Atom AN, then x, y, z of every mode
+        disp = rows[:, 2:].reshape(len(rows), -1, 3).transpose(1, 0, 2)
+        atoms, atomic_numbers = rows[:, 0], rows[:, 1]
+    return disp, atoms.astype(int), atomic_numbers.astype(int)
+
+def _section(blocks):
+    # Arrays of a section of the output from its blocks
+    modes = {key: [] for key in labels.values()}
+    disp = []
+    for block in blocks:
+        for key in modes:
+            values = block.get(key, [])
+            if len(values) != len(block['frequencies']):
+                raise ValueError("{} values of {} do not match {} frequencies of a block of modes"
+                                 .format(len(values), key, len(block['frequencies'])))
+            modes[key].extend(values)
+        block_disp, atoms, atomic_numbers = _displacements(block['rows'], block['hp'])
+        disp.append(block_disp)
+
+    modes = {key: np.array(values, dtype=float) for key, values in modes.items()}
+    modes['modes'] = np.concatenate(disp) if disp else np.zeros((0, 0, 3))
+    modes['atoms'] = atoms if disp else np.zeros(0, dtype=int)
+    modes['atomic_numbers'] = atomic_numbers if disp else np.zeros(0, dtype=int)
+    modes['hpmodes'] = bool(blocks) and blocks[0]['hp']
+    return modes
+
+@profiling.profiled('read_modes')
+def read_modes(file_name):
+    """
+    This reads the normal modes of the last frequency calculation of a Gaussian output file.
+    Return a dictionary of frequencies (cm-1), reduced_masses (AMU), force_constants (mDyne/A),
+    and ir_intensities (KM/Mole) of shape (n_modes,), modes of shape (n_modes, n_atoms, 3),
+    atoms (atom numbers, from 1) and atomic_numbers of shape (n_atoms,), and hpmodes (True for the high-precision blocks).
+    """
+    sections = []
+    block = None  # block of modes whose displacement rows are being read
+    width = 0  # number of fields of a displacement row
+
+    nlines, nbytes = 0, 0
+    with open_file(file_name) as inputfile:
+        for nlines, line in enumerate(inputfile, 1):
+            nbytes += len(line)
+            if width:
+                fields = line.split()
+                if len(fields) == width and fields[0].isdigit():
+                    block['rows'].append(fields)
+                    continue
+                width = 0
+
+            if 'Harmonic frequencies' in line:
+                sections.append([])
+            elif 'Frequencies --' in line and sections:
+                block = {'hp': 'Frequencies ---' in line, 'frequencies': _values(line), 'rows': []}
+                sections[-1].append(block)
+            elif block is not None and block['rows'] == []:
+                label = line.split('--', 1)[0].strip()
+                if label in labels:
+                    block[labels[label]] = _values(line)
+                elif label.startswith('Atom  AN') or label.startswith('Coord Atom Element'):
+                    n_modes = len(block['frequencies'])
+                    width = n_modes + 3 if block['hp'] else 3 * n_modes + 2
+    profiling.count(lines=nlines, nbytes=nbytes)
+
+    sections = [blocks for blocks in sections if blocks]
+    if not sections:
+        raise TypeError('The Gaussian job does not look like containing frequency calculations')
+
+    modes = _section(sections[-1])
+    # With hpmodes, the high-precision section is followed by the same modes in low precision
+    if len(sections) > 1 and not modes['hpmodes'] and sections[-2][0]['hp']:
+        hp_modes = _section(sections[-2])
+        if np.allclose(hp_modes['frequencies'], modes['frequencies'], atol=1e-3):
+            modes = hp_modes
+
+    return modes
+
+def displace(coords, modes, steps, atoms=None):
+    """
+    Displace the coordinates (n_atoms, 3) along the modes (n_modes, n_mode_atoms, 3) by the steps (Angstrom).
+    atoms are the atom numbers (from 1) of the modes, if not all the atoms are in the modes.
+    Return an array of shape (n_steps, n_modes, n_atoms, 3).
+    """
+    coords = np.asarray(coords, dtype=float)
+    modes = np.asarray(modes, dtype=float)
+    steps = np.asarray(steps, dtype=float)
+    if atoms is not None:
+        atoms = np.asarray(atoms, dtype=int) - 1
+        if atoms.size and (atoms.min() < 0 or atoms.max() >= len(coords)):
+            raise ValueError("The atoms of the modes are out of the geometry of {} atoms".format(len(coords)))
+        full = np.zeros((len(modes),) + coords.shape)
+        full[:, atoms] = modes
+        modes = full
+    if modes.shape[1:] != coords.shape:
+        raise ValueError("The modes of {} atoms do not match the geometry of {} atoms"
+                         .format(modes.shape[1], len(coords)))
+
+    return coords[None, None] + steps[:, None, None, None] * modes[None]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import itertools
+import numpy as np
+
+"""
+
+Cell-list neighbor search shared by the scripts that need interatomic distances.
+Atoms are binned on a grid aligned with the lattice (Tv) vectors, so a query only
+visits the neighboring bins and the cost grows linearly with the number of atoms.
+Periodic directions are wrapped and searched over lattice images; up to three Tv
+vectors are supported and the remaining directions are treated as open.
+
+"""
+
+def complete_basis(lattice=None):
+    """
+    Complete zero to three lattice (Tv) vectors to a 3x3 basis.
+    Missing directions are filled with orthonormal vectors and flagged non-periodic.
+    Return the basis (rows are vectors) and a boolean mask of the periodic axes.
+    """
+    if lattice is None:
+        lattice = np.zeros((0, 3))
+    lattice = np.asarray(lattice, dtype=float).reshape(-1, 3)
+    n_periodic = len(lattice)
+
+    if n_periodic > 3:
+        raise ValueError("At most three lattice vectors (Tv) can be provided")
+
+    if n_periodic == 0:
+        extra = np.eye(3)
+    elif n_periodic == 1:
+        a = lattice[0] / np.linalg.norm(lattice[0])
+        helper = np.eye(3)[np.argmin(np.abs(a))]
+        b = np.cross(a, helper)
+        b /= np.linalg.norm(b)
+        extra = np.array([b, np.cross(a, b)])
+    elif n_periodic == 2:
+        c = np.cross(lattice[0], lattice[1])
+        extra = np.array([c / np.linalg.norm(c)])
+    else:
+        extra = np.zeros((0, 3))
+
+    basis = np.vstack([lattice, extra])
+    periodic = np.arange(3) < n_periodic
+
+    return basis, periodic
+
+
+def _build_grid(coords, cutoff, lattice=None):
+    # Fractional coordinates; periodic axes are wrapped into [0, 1)
+    basis, periodic = complete_basis(lattice)
+    basis_inv = np.linalg.inv(basis)
+    frac = coords @ basis_inv
+    image = np.where(periodic, np.floor(frac), 0).astype(int)
+    frac = frac - image
+
+    # Distance between lattice planes per unit fractional coordinate
+    width = 1 / np.linalg.norm(basis_inv, axis=0)
+
+    origin = np.where(periodic, 0.0, frac.min(axis=0) if len(frac) else 0.0)
+    span = np.where(periodic, 1.0, np.ptp(frac, axis=0) if len(frac) else 0.0)
+    span = np.maximum(span, 1e-8)
+    length = span * width
+
+    # Bins at least as wide as the cutoff, capped to keep the grid about the size of the system
+    n_bins = np.maximum(1, np.floor(length / max(cutoff, 1e-8))).astype(int)
+    limit = 8 * len(coords) + 27
+    if np.prod(n_bins, dtype=float) > limit:
+        scale = (limit / np.prod(n_bins, dtype=float)) ** (1/3)
+        n_bins = np.maximum(1, np.floor(n_bins * scale)).astype(int)
+
+    bins = np.floor((frac - origin) / span * n_bins).astype(int)
+    bins = np.clip(bins, 0, n_bins - 1)
+    flat = np.ravel_multi_index(bins.T, n_bins)
+
+    counts = np.bincount(flat, minlength=np.prod(n_bins))
+    starts = np.cumsum(counts) - counts
+
+    return {
+        'basis': basis, 'basis_inv': basis_inv, 'periodic': periodic,
+        'origin': origin, 'span': span, 'n_bins': n_bins, 'bin_length': length / n_bins,
+        'wrapped': frac @ basis, 'image': image, 'bins': bins,
+        'order': np.argsort(flat, kind='stable'), 'counts': counts, 'starts': starts,
+    }
+
+
+def _point_bins(grid, points):
+    # Bins and wrapped Cartesian positions of arbitrary query points
+    frac = points @ grid['basis_inv']
+    frac = frac - np.where(grid['periodic'], np.floor(frac), 0)
+    bins = np.floor((frac - grid['origin']) / grid['span'] * grid['n_bins']).astype(int)
+    bins = np.clip(bins, 0, grid['n_bins'] - 1)
+    return bins, frac @ grid['basis']
+
+
+def _offsets(grid, cutoff):
+    reach = np.ceil(cutoff / grid['bin_length'] - 1e-12).astype(int)
+    reach = np.maximum(reach, 1)
+    # Open axes cannot reach further than the grid itself
+    reach = np.where(grid['periodic'], reach, np.minimum(reach, grid['n_bins']))
+    return itertools.product(*[range(-r, r+1) for r in reach])
+
+
+def _candidates(grid, query_bins, offset):
+    """
+    Pair every query with the atoms in the bin displaced by offset.
+    Return query indices, atom indices and integer lattice shifts of the atoms.
+    """
+    n_bins = grid['n_bins']
+    neighbor = query_bins + np.array(offset)
+    shift = np.where(grid['periodic'], np.floor_divide(neighbor, n_bins), 0)
+    neighbor = np.where(grid['periodic'], np.mod(neighbor, n_bins), neighbor)
+
+    valid = np.all((neighbor >= 0) & (neighbor < n_bins), axis=1)
+    query = np.nonzero(valid)[0]
+    flat = np.ravel_multi_index(neighbor[valid].T, n_bins)
+
+    count = grid['counts'][flat]
+    total = count.sum()
+    query_rep = np.repeat(query, count)
+    within = np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+    atom = grid['order'][np.repeat(grid['starts'][flat], count) + within]
+
+    return query_rep, atom, shift[query_rep]
+
+
+def neighbor_list(coords, cutoff, lattice=None):
+    """
+    Find all atom pairs closer than cutoff, including pairs between lattice images.
+    Every pair is reported once with i < j (or i == j for an atom and its own image).
+    Return i, j, distances, and integer lattice shifts such that
+    coords[j] + shifts @ lattice - coords[i] is the shortest vector of the pair.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    grid = _build_grid(coords, cutoff, lattice)
+    wrapped, basis, image = grid['wrapped'], grid['basis'], grid['image']
+
+    found_i, found_j, found_d, found_s = [], [], [], []
+    for offset in _offsets(grid, cutoff):
+        i, j, shift = _candidates(grid, grid['bins'], offset)
+
+        # Keep one direction of every pair; self images only with a positive shift
+        positive = np.sign(shift) @ np.array([9, 3, 1]) > 0
+        keep = (i < j) | ((i == j) & positive)
+        i, j, shift = i[keep], j[keep], shift[keep]
+
+        dist = np.linalg.norm(wrapped[j] + shift @ basis - wrapped[i], axis=1)
+        close = dist <= cutoff
+        i, j, shift = i[close], j[close], shift[close]
+
+        found_i.append(i)
+        found_j.append(j)
+        found_d.append(dist[close])
+        found_s.append(shift - image[j] + image[i])
+
+    return (np.concatenate(found_i), np.concatenate(found_j),
+            np.concatenate(found_d), np.concatenate(found_s).reshape(-1, 3))
+
+
+def distance_to_points(coords, points, cutoff, lattice=None):
+    """
+    Minimum-image distance from every atom to the nearest of the given points.
+    Only atoms within cutoff are evaluated; the others are returned as infinity.
+    """
+    coords = np.asarray(coords, dtype=float).reshape(-1, 3)
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    grid = _build_grid(coords, cutoff, lattice)
+    point_bins, point_wrapped = _point_bins(grid, points)
+
+    dist = np.full(len(coords), np.inf)
+    for offset in _offsets(grid, cutoff):
+        p, atom, shift = _candidates(grid, point_bins, offset)
+        # The atom sits in the displaced bin, so its image is shifted by +shift
+        d = np.linalg.norm(grid['wrapped'][atom] + shift @ grid['basis'] - point_wrapped[p], axis=1)
+        np.minimum.at(dist, atom, np.where(d <= cutoff, d, np.inf))
+
+    return dist
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import numpy as np
+import pandas as pd
+import argparse
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import expand_files, run_batch, open_file, inner_name
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Extract the convergence history of geometry optimization from Gaussian output file(s)\n"
+                     "For every optimization step: energy (SCF or ONIOM), Maximum Force, RMS Force,\n"
+                     "Maximum Displacement, and RMS Displacement with their thresholds,\n"
+                     "predicted change in energy, and cpu and elapsed time (with #p in the route)\n"
+                     "A summary of the last step is printed for every file\n"
+                     "Multiple files or glob patterns can be given; they are processed in parallel with -j\n\n"
+                     "Return file_name_history.csv (or .npz): Convergence history\n"
+                     "       file_name_history.png: Plot of the history (with -p)",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', nargs='+', help='Gaussian output file(s) (.out or .log) or glob pattern(s)')
+    parser.add_argument('-f', '--format', choices=['csv', 'npz', 'none'], default='csv', \
+    help="Format of the history file; 'none' only prints the summary (default: csv)")
+    parser.add_argument('-p', '--plot', action='store_true', \
+    help="Plot the energy and the convergence metrics relative to their thresholds")
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes for multiple files; 0 uses all CPUs")
+    args = parser.parse_args()
+    return args
+
+# Convergence criteria in the order printed by Gaussian, and their column names
+criteria = {'Maximum Force': 'max_force', 'RMS Force': 'rms_force',
+            'Maximum Displacement': 'max_disp', 'RMS Displacement': 'rms_disp'}
+
+# All the lines of interest are found in one pass over the file
+_pattern = re.compile(
+    r"^ SCF Done:\s+E\(\S+\)\s+=\s+(?P<scf>\S+)"
+    r"|^ ONIOM: extrapolated energy\s+=\s+(?P<oniom>\S+)"
+    r"|^ (?P<item>Maximum Force|RMS\s+Force|Maximum Displacement|RMS\s+Displacement)"
+    r"\s+(?P<value>\S+)\s+(?P<threshold>\S+)\s+(?P<converged>YES|NO)"
+    r"|^ Predicted change in Energy=\s*(?P<predicted>\S+)"
+    r"|^ Leave Link\s+\d+ at .*?cpu:\s+(?P<cpu>\S+)\s+elap:\s+(?P<elap>\S+)"
+    r"|^ (?P<entering>Entering Gaussian System|Link1:\s+Proceeding)",
+    re.MULTILINE)
+
+def _float(value):
+    # Gaussian writes exponents with D, e.g., -2.295472D-02; overflowed fields are '********'
+    try:
+        return float(value.replace('D', 'E'))
+    except ValueError:
+        return np.nan
+
+def read_history(file_name):
+    """
+    Read the convergence history of geometry optimization from a Gaussian output file.
+    A step ends with the table of the convergence criteria.
+    Return a dictionary of arrays with one value per step: job (linked job number from 1),
+    step, energy, max_force, rms_force, max_disp, rms_disp, their thresholds (e.g., max_force_threshold)
+    and converged flags (e.g., max_force_converged), predicted (change in energy),
+    and cpu and elapsed time in seconds (NaN without #p).
+    """
+    with open_file(file_name) as inputfile:
+        text = inputfile.read()
+
+    rows = []
+    job, step = 0, 0
+    energy = np.nan
+    cpu, elap, timed = 0.0, 0.0, False
+    current = {}
+
+    for match in _pattern.finditer(text):
+        kind = match.lastgroup
+        if kind in ('scf', 'oniom'):
+            energy = _float(match.group(kind))
+
+        elif kind == 'converged':
+            item = ' '.join(match.group('item').split())
+            name = criteria[item]
+            current[name] = _float(match.group('value'))
+            current[name + '_threshold'] = _float(match.group('threshold'))
+            current[name + '_converged'] = match.group('converged') == 'YES'
+
+            # The table ends with RMS Displacement
+            if name == 'rms_disp':
+                step += 1
+                current.update({'job': max(job, 1), 'step': step, 'energy': energy, 'predicted': np.nan,
+                                'cpu': cpu if timed else np.nan, 'elapsed': elap if timed else np.nan})
+                rows.append(current)
+                current = {}
+                cpu, elap = 0.0, 0.0
+
+        elif kind == 'predicted':
+            if rows:
+                rows[-1]['predicted'] = _float(match.group('predicted'))
+
+        elif kind == 'elap':
+            cpu += _float(match.group('cpu'))
+            elap += _float(match.group('elap'))
+            timed = True
+
+        elif kind == 'entering':
+            job, step = job + 1, 0
+            energy = np.nan
+
+    columns = ['job', 'step', 'energy']
+    for name in criteria.values():
+        columns += [name, name + '_threshold', name + '_converged']
+    columns += ['predicted', 'cpu', 'elapsed']
+
+    history = {}
+    for column in columns:
+        dtype = int if column in ('job', 'step') else bool if column.endswith('_converged') else float
+        history[column] = np.array([row.get(column, np.nan) for row in rows], dtype=dtype)
+
+    return history
+
+def plot_history(history, plot_file, title=None):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, (ax_energy, ax_ratio) = plt.subplots(2, 1, sharex=True, figsize=(8, 8))
+    index = np.arange(1, len(history['step']) + 1)
+
+    ax_energy.plot(index, history['energy'], 'b.-')
+    ax_energy.set_ylabel('Energy (Hartree)')
+    if title:
+        ax_energy.set_title(title)
+
+    # Metrics relative to their thresholds; below 1 is converged
+    for item, name in criteria.items():
+        ax_ratio.semilogy(index, history[name] / history[name + '_threshold'], '.-', label=item)
+    ax_ratio.axhline(1, color='k', linestyle='--', linewidth=1)
+    ax_ratio.set_xlabel('Step')
+    ax_ratio.set_ylabel('Value / Threshold')
+    ax_ratio.legend()
+
+    fig.savefig(plot_file)
+    plt.close(fig)
+
+def summary(file_name, history):
+    if len(history['step']) == 0:
+        return "{}: no optimization step".format(file_name)
+
+    converged = [history[name + '_converged'][-1] for name in criteria.values()]
+    text = "{}: {} steps, E {:.8f}, converged {}/4".format(
+        file_name, len(history['step']), history['energy'][-1], sum(converged))
+    if np.isfinite(history['elapsed']).any():
+        text += ", {:.1f} s/step".format(np.nanmean(history['elapsed']))
+    return text
+
+def opt_history(file_name, out_format='csv', plot=False):
+    history = read_history(file_name)
+    name = os.path.splitext(inner_name(file_name))[0] + "_history"
+
+    if out_format == 'csv':
+        pd.DataFrame(history).to_csv(name + ".csv", index=False)
+    elif out_format == 'npz':
+        np.savez(name + ".npz", **history)
+
+    if plot and len(history['step']):
+        plot_history(history, name + ".png", os.path.basename(file_name))
+
+    return summary(file_name, history) + "\n"
+
+def main():
+    args = parse_args()
+    file_names = expand_files(args.file_name)
+    run_batch(opt_history, file_names, (args.format, args.plot), args.jobs)
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,31 @@
 #!/usr/bin/env python3
 
-import numpy as np
-import pandas as pd
 import argparse
 from argparse import RawTextHelpFormatter
-from gaussianutility.utilities import readoutput
+from gaussianutility.utilities import inner_name
+from gaussianutility.pipeline import convert
+from gaussianutility.formats import file_format
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description= "Extract geometry from Gaussian output file (.out)\n"
                      "to Gaussian input file (.com)\n"
+                     "A formatted checkpoint file (.fchk) can be given instead; its current geometry\n"
+                     "is used and the route has its method and basis\n"
                      "This support ONIOM-type calculations\n"
-                     "Connectivity information will be lost\n\n"
+                     "Connectivity is not kept in the output file; with -c, bonds are\n"
+                     "perceived from covalent radii and written with geom=connectivity\n\n"
                      "Return file_name_geom.com: Gaussian input file",
         formatter_class=RawTextHelpFormatter)
 
-    parser.add_argument('file_name', help='Gaussian output file (.out)')
+    parser.add_argument('file_name', help='Gaussian output file (.out) or formatted checkpoint file (.fchk)')
     parser.add_argument('-i', '--index', nargs='?', const=1, \
     help='Optimization step index;\n0 for input, -1 for the last geometry, '+\
          'and L for the lowest energy geometry', default=-1)
     parser.add_argument('-n', '--name', nargs=1, required=False, \
     help='Provide name of the generated Gaussian input file including extension')
+    parser.add_argument('-c', '--connectivity', action='store_true', \
+    help='Perceive bonds from covalent radii and write a geom=connectivity section')
     args = parser.parse_args()
     return args
     
@@ -28,21 +33,16 @@ def main():
     args = parse_args()
     file_name, stepIdx = args.file_name, args.index
 
-    # Read Gaussian output file
-    routeStr, charge_mult, df_geom = readoutput(file_name, stepIdx)
-
     # Write .com file
     if args.name is not None:
         out_file = args.name[0]
     else:
-        out_file = file_name.rsplit(".",1)[0] + "_geom.com"
+        out_file = inner_name(file_name).rsplit(".",1)[0] + "_geom.com"
 
-    with open(out_file, 'w') as output:
-        output.write(f"{routeStr}\n\n")
-        output.write(f"{out_file}\n\n")
-        output.write(f"{charge_mult}\n")
-        output.write(df_geom.to_csv(index=False, header=False, sep='\t'))
-        output.write("\n\n")
+    # Read Gaussian output file, and perceive connectivity from the coordinates with -c
+    source_format = 'fchk' if file_format(file_name) == 'fchk' else 'out'
+    convert(file_name, out_file, step=stepIdx, source_format=source_format, target_format='com',
+            connectivity=args.connectivity)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+import numpy as np
+from gaussianutility.utilities import split_lattice
+from gaussianutility.formats import read_structure, write_structure
+from gaussianutility.connectivity import read_connectivity, write_connectivity, perceive_bonds
+from gaussianutility.sortInput import sort_atoms
+from gaussianutility.freezeLayer import freeze_layers, freeze_radius
+from gaussianutility.cellTransform import make_supercell, transform_cell, wrap_atoms, scale_charge_mult
+
+"""
+
+In-memory conversion of structure files: a structure is read once, modified by
+a sequence of transforms, and written once, without intermediate files.
+
+    convert('job.out', 'job.vasp', step='L', sort='AL', freeze='L')
+
+Transforms are registered by name and applied in the order of the keyword arguments.
+The value of a transform is passed as its argument, or as keyword arguments if it is
+a dictionary, e.g., freeze_radius={'radius': 6, 'atoms': [1]}; True applies a transform
+without arguments, and None or False skips it.
+
+"""
+
+transforms = {}
+
+def register_transform(name):
+    def register(func):
+        transforms[name] = func
+        return func
+    return register
+
+def _bonds(structure):
+    if structure['connectivity']:
+        return read_connectivity(structure['connectivity'])
+    return None, None
+
+def _set_bonds(structure, bonds, orders):
+    if bonds is not None:
+        structure['connectivity'] = write_connectivity(bonds, orders, len(structure['geom']))
+
+@register_transform('sort')
+def sort(structure, index='AL', order='a'):
+    """
+    Sort atoms as sortInput; 'x', 'y', 'z', 'A' (atomic number), 'L' (ONIOM layer), or a combination with 'L'
+    """
+    structure['geom'], structure['connectivity'] = sort_atoms(structure['route'], structure['geom'],
+                                                              structure['connectivity'], index, order)
+    return structure
+
+@register_transform('freeze')
+def freeze(structure, layers='L'):
+    """
+    Freeze ONIOM layers as freezeLayer; 'H', 'M', 'L', their combination, or 'U' to unfreeze all
+    """
+    structure['geom'] = freeze_layers(structure['route'], structure['geom'], layers)
+    return structure
+
+@register_transform('freeze_radius')
+def freeze_sphere(structure, radius, atoms=None, point=None):
+    """
+    Freeze all the atoms farther than radius from the given atoms (from 1) or point
+    """
+    structure['geom'] = freeze_radius(structure['geom'], radius, atoms, point)
+    return structure
+
+@register_transform('wrap')
+def wrap(structure):
+    """
+    Wrap atoms into the cell
+    """
+    structure['geom'] = wrap_atoms(structure['geom'])
+    return structure
+
+@register_transform('supercell')
+def supercell(structure, repeats):
+    """
+    Repeat the cell n1 x n2 x n3 times; the charges are multiplied (see scale_charge_mult)
+    """
+    n_atoms = len(split_lattice(structure['geom'])[0])
+    structure['geom'], bonds, orders = make_supercell(structure['geom'], repeats, *_bonds(structure))
+    structure['charge_mult'] = scale_charge_mult(structure['charge_mult'], n_atoms,
+                                                 len(split_lattice(structure['geom'])[0]))
+    _set_bonds(structure, bonds, orders)
+    return structure
+
+@register_transform('transform')
+def transform(structure, matrix):
+    """
+    Change the cell to integer combinations of the lattice vectors; the charges are multiplied (see scale_charge_mult)
+    """
+    n_atoms = len(split_lattice(structure['geom'])[0])
+    structure['geom'], bonds, orders = transform_cell(structure['geom'], matrix, *_bonds(structure))
+    structure['charge_mult'] = scale_charge_mult(structure['charge_mult'], n_atoms,
+                                                 len(split_lattice(structure['geom'])[0]))
+    _set_bonds(structure, bonds, orders)
+    return structure
+
+@register_transform('connectivity')
+def connectivity(structure):
+    """
+    Perceive bonds from covalent radii and add a geom=connectivity section
+    """
+    df_atoms, lattice = split_lattice(structure['geom'])
+    bonds, orders = perceive_bonds(df_atoms['Atom'], np.array(df_atoms[['x','y','z']], dtype=float), lattice)
+    structure['connectivity'] = write_connectivity(bonds, orders, len(structure['geom']))
+    if "geom=connectivity" not in structure['route']:
+        structure['route'] = structure['route'].rstrip() + " geom=connectivity"
+    return structure
+
+def apply_transforms(structure, operations):
+    """
+    Apply transforms, given as (name, value) pairs, to a structure in order
+    """
+    for name, value in operations:
+        if name not in transforms:
+            raise ValueError("Unknown transform '{}'; available transforms are {}".format(name, ", ".join(transforms)))
+        if value is None or value is False:
+            continue
+
+        func = transforms[name]
+        if value is True:
+            structure = func(structure)
+        elif isinstance(value, dict):
+            structure = func(structure, **value)
+        else:
+            structure = func(structure, value)
+
+    return structure
+
+def convert(source, target, step=None, title=None, source_format=None, target_format=None,
+            options=None, **operations):
+    """
+    Read a structure from source, apply the transforms given as keyword arguments in order,
+    and write it to target. Formats are detected from the file names unless given.
+    step selects the geometry of an output file (0, -1, or 'L' as in out2com) or
+    the frame of a trajectory; options are passed to the writer, e.g., {'ctype': 'c'} for VASP.
+    Return the final structure.
+    """
+    structure = read_structure(source, step, source_format)
+    structure = apply_transforms(structure, operations.items())
+    if title is not None:
+        structure['title'] = title
+
+    write_structure(structure, target, target_format, **(options or {}))
+
+    return structure
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+
+Read-ahead of files that are processed one after another, e.g., printE *.out on a network
+file system: while a file is parsed, the next ones are read into memory by background
+threads, so that the parser does not wait for a cold read of every file.
+open_file (gaussianutility.utilities) takes the prefetched contents of a file if there are any.
+At most `read_ahead` files and `max_buffered` bytes are held in memory; a file that does not fit is only
+advised to the kernel (posix_fadvise WILLNEED) to be read into the page cache.
+The inode, size, and modification time of a file are kept with its contents; a file changed after
+it was read ahead (e.g., by an earlier step of a manifest) is read again.
+GAUSSIANUTILITY_PREFETCH sets the number of files read ahead; 0 disables prefetching.
+
+"""
+
+env_var = 'GAUSSIANUTILITY_PREFETCH'
+
+# Number of files read ahead, and maximum bytes held in memory
+read_ahead = 4
+max_buffered = 256 << 20
+
+# Futures of the (inode, size, mtime) and contents of the files being read, by absolute path
+_buffers = {}
+_lock = threading.Lock()
+
+def _version(info):
+    return info.st_ino, info.st_size, info.st_mtime_ns
+
+def _read(path):
+    with open(path, 'rb') as inputfile:
+        return _version(os.fstat(inputfile.fileno())), inputfile.read()
+
+def _advise(path):
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+def take(file_name):
+    """
+    Prefetched contents of a file as a binary stream, or None if the file was not prefetched,
+    has changed since (inode, size, or mtime), or could not be read (the caller then reads it itself).
+    The contents are handed over once.
+    """
+    if not _buffers:
+        return None
+    with _lock:
+        future = _buffers.pop(os.path.abspath(file_name), None)
+    if future is None:
+        return None
+
+    try:
+        version, data = future.result()
+        if version != _version(os.stat(file_name)):
+            return None
+        return io.BytesIO(data)
+    except OSError:
+        return None
+
+def _discard(path):
+    with _lock:
+        future = _buffers.pop(path, None)
+    if future is not None:
+        future.cancel()
+
+def _size(path):
+    try:
+        return os.stat(path).st_size
+    except OSError:
+        return 0
+
+def prefetched(file_names, ahead=None, max_bytes=None):
+    """
+    Iterate over the file names while the next files are read in the background.
+    The contents of a file are released when the iteration moves to the next file.
+    """
+    file_names = list(file_names)
+    if ahead is None:
+        ahead = int(os.environ.get(env_var, read_ahead))
+    if max_bytes is None:
+        max_bytes = max_buffered
+    if ahead < 1 or len(file_names) < 2:
+        yield from file_names
+        return
+
+    paths = [os.path.abspath(file_name) for file_name in file_names]
+    sizes = {}  # files held in memory (or being read) and their sizes
+    scheduled = 0
+
+    with ThreadPoolExecutor(max_workers=min(ahead, 8)) as executor:
+        try:
+            for idx, file_name in enumerate(file_names):
+                # Read the files up to ahead after this one, within the bytes limit
+                while scheduled < len(paths) and scheduled <= idx + ahead:
+                    path = paths[scheduled]
+                    size = _size(path)
+                    if path in sizes or path in _buffers:
+                        pass
+                    elif size > max_bytes:
+                        executor.submit(_advise, path)
+                    elif sum(sizes.values()) + size > max_bytes:
+                        break
+                    else:
+                        sizes[path] = size
+                        with _lock:
+                            _buffers[path] = executor.submit(_read, path)
+                    scheduled += 1
+
+                yield file_name
+
+                if paths[idx] in sizes:
+                    _discard(paths[idx])
+                    del sizes[paths[idx]]
+        finally:
+            for path in sizes:
+                _discard(path)
@@ -3,6 +3,9 @@
 import numpy as np
 import argparse
 from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import open_file
+from gaussianutility import profiling
+from gaussianutility.prefetch import prefetched
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -15,10 +18,14 @@ def parse_args():
                      , formatter_class=RawTextHelpFormatter)
 
     parser.add_argument('file_name', nargs='+', help='Gaussian output file(s) (.out or .log)')
+    parser.add_argument('--profile', action='store_true', \
+    help="Report the time of each phase as JSON lines on stderr")
     args = parser.parse_args()
     return args
     
+@profiling.profiled('read_E', file_arg=None)
 def read_E(lines):
+    profiling.count(lines=len(lines))
     stoich, E, EZPE, H, G, imagf = '', '', '', '', '', ''
 
     # Stoichiometry
@@ -107,44 +114,66 @@ def read_E(lines):
             'E': E
         }
 
+def split_jobs(lines):
+    """
+    Divide the lines of an output file into its linked jobs (--Link1--).
+    Return the lines of each job, and whether the calculation was normally terminated.
+    """
+    if "Normal" not in lines[-1].split():
+        return [lines], False
+
+    ### Divide multiple calculation steps ###
+    linked_jobs_idx = [0]
+    for idx, line in enumerate(lines):
+        if line.startswith(" Normal"):
+            linked_jobs_idx.append(idx)
+
+    calc_lines = [lines[linked_jobs_idx[i]:linked_jobs_idx[i+1]+2] for i in range(len(linked_jobs_idx)-1)]
+    return calc_lines, True
+
+@profiling.profiled('printE')
+def print_E(file_name):
+    with open_file(file_name) as file:
+        lines = file.readlines()
+    profiling.checkpoint('read', lines)
+
+    try:
+        lines[-1]
+    except IndexError:
+        print("!!!Caution: " + file_name + " is an empty file.")
+        return
+
+    calc_lines, normal = split_jobs(lines)
+    calc_E = [read_E(calc) for calc in calc_lines]
+    print(format_E(file_name, calc_E, normal), end='')
+
+def format_E(file_name, calc_E, normal):
+    """
+    Text of the results (read_E of every linked job) of a file, with the numbers as written in the output
+    """
+    text = ["Results of " + file_name + ", " + calc_E[0]['stoich']]
+
+    if not normal:
+        text.append("!!!Caution: The calculation does not seem to be normally ternimated!!!")
+        text.append(f"   1 calc: {calc_E[0]['job type']}  {calc_E[0]['E']}")
+
+    else:
+        for i in range(len(calc_E)):
+            result = calc_E[i]
+            if result['job type'] == 'frequency':
+                text.append(f"   {i+1} calc: {result['job type']}  {result['E']}  {result['EZPE']}  {result['H']}  {result['G']}  {result['imagf']}")
+            else:
+                text.append(f"   {i+1} calc: {result['job type']}  {result['E']}")
+
+    return "\n".join(text) + "\n"
+
 def main():
     args = parse_args()
-    file_names = args.file_name
-
-    for file_name in file_names:
-        with open(file_name, 'r') as file:
-            lines = file.readlines()
-
-        try:
-            lines[-1]
-        except IndexError:
-            print("!!!Caution: " + file_name + " is an empty file.")
-            continue
-
-        if "Normal" not in lines[-1].split():
-            calc_E = [read_E(lines)]
-            print("Results of " + file_name + ", " + calc_E[0]['stoich'])
-            print("!!!Caution: The calculation does not seem to be normally ternimated!!!")
-            print(f"   1 calc: {calc_E[0]['job type']}  {calc_E[0]['E']}")
-
-        else:        
-        ### Divide multiple calculation steps ###
-            linked_jobs_idx = [0]
-            for idx, line in enumerate(lines):
-                if line.startswith(" Normal"):
-                    linked_jobs_idx.append(idx)
-        
-            ### Read data of each job ###
-            calc_lines = [lines[linked_jobs_idx[i]:linked_jobs_idx[i+1]+2] for i in range(len(linked_jobs_idx)-1)]
-            calc_E = [read_E(calc) for calc in calc_lines]
-            print("Results of " + file_name + ", " + calc_E[0]['stoich'])
-        
-            for i in range(len(calc_E)):
-                result = calc_E[i]
-                if result['job type'] == 'frequency':
-                    print(f"   {i+1} calc: {result['job type']}  {result['E']}  {result['EZPE']}  {result['H']}  {result['G']}  {result['imagf']}")
-                else:
-                    print(f"   {i+1} calc: {result['job type']}  {result['E']}")
+    if args.profile:
+        profiling.enable()
+
+    for file_name in prefetched(args.file_name):
+        print_E(file_name)
     
                 
 if __name__ == '__main__':
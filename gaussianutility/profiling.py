@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+import contextlib
+import argparse
+from argparse import RawTextHelpFormatter
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+"""
+
+Opt-in timing of the phases of the readers, parsers, and writers.
+Profiling is enabled with the --profile option of a script, or for any script by setting
+the environment variable GAUSSIANUTILITY_PROFILE to 1 (report to stderr) or to a file name.
+Every phase writes one JSON line: phase (nested names joined with '/'), file,
+wall time, lines scanned, bytes read or written, peak RSS of the process, and pid.
+Processes started by -j inherit the setting and append to the same report.
+Every thread has its own stack of phases, so functions profiled in threads are reported per thread.
+When disabled, a profiled function costs one extra call and a check.
+
+"""
+
+env_var = 'GAUSSIANUTILITY_PROFILE'
+
+def _target(value):
+    if not value or value.lower() in ('0', 'false', 'no', 'off'):
+        return None
+    if value.lower() in ('1', 'true', 'yes', 'on', '-', 'stderr'):
+        return '-'
+    return value
+
+# Report target: None (disabled), '-' (stderr), or a file name
+_output = _target(os.environ.get(env_var))
+_null = contextlib.nullcontext()
+_lock = threading.Lock()
+
+class _Phases(threading.local):
+    # Stack of the open phases of a thread
+    def __init__(self):
+        self.stack = []
+
+_phases = _Phases()
+
+def enable(target='-'):
+    """
+    Enable profiling in this process and the processes it starts.
+    target is '-' for stderr or a file name to append the JSON lines to.
+    """
+    global _output
+    _output = _target(target)
+    if _output is None:
+        os.environ.pop(env_var, None)
+    else:
+        os.environ[env_var] = _output
+
+def active():
+    return _output is not None
+
+def peak_rss():
+    """
+    Peak resident memory of the process in MiB (None if unavailable)
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / 1024 ** 2 if sys.platform == 'darwin' else rss / 1024
+
+def _emit(record):
+    line = json.dumps(record) + '\n'
+    with _lock:
+        if _output == '-':
+            sys.stderr.write(line)
+            sys.stderr.flush()
+        else:
+            with open(_output, 'a') as output:
+                output.write(line)
+
+def _record(name, file_name, wall, lines, nbytes):
+    _emit({'phase': name, 'file': file_name, 'wall_s': round(wall, 6), 'lines': lines,
+           'bytes': nbytes, 'peak_rss_mb': peak_rss(), 'pid': os.getpid()})
+
+def _push(name, file_name):
+    parent = _phases.stack[-1] if _phases.stack else None
+    if file_name is not None:
+        file_name = os.fspath(file_name)
+    elif parent is not None:
+        file_name = parent['file']
+
+    now = time.perf_counter()
+    frame = {'name': parent['name'] + '/' + name if parent else name, 'file': file_name,
+             'start': now, 'segment': now, 'lines': 0, 'bytes': 0, 'segment_lines': 0, 'segment_bytes': 0}
+    _phases.stack.append(frame)
+
+def _pop():
+    frame = _phases.stack.pop()
+    # Counts after the last checkpoint belong to the phase itself
+    frame['lines'] += frame['segment_lines']
+    frame['bytes'] += frame['segment_bytes']
+    _record(frame['name'], frame['file'], time.perf_counter() - frame['start'], frame['lines'], frame['bytes'])
+    if _phases.stack:
+        _phases.stack[-1]['lines'] += frame['lines']
+        _phases.stack[-1]['bytes'] += frame['bytes']
+
+@contextlib.contextmanager
+def _phase(name, file_name):
+    _push(name, file_name)
+    try:
+        yield
+    finally:
+        _pop()
+
+def phase(name, file_name=None):
+    """
+    Context manager timing a block as a phase; the file is inherited from the enclosing phase
+    """
+    if _output is None:
+        return _null
+    return _phase(name, file_name)
+
+def _file_name(value):
+    # A file name, or the name of an open file
+    if isinstance(value, (str, os.PathLike)):
+        return value
+    name = getattr(value, 'name', None)
+    return name if isinstance(name, str) else None
+
+def profiled(name, file_arg=0):
+    """
+    Decorator timing every call of a function as a phase.
+    The positional argument file_arg (None for none) is the file name or an open file.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _output is None:
+                return func(*args, **kwargs)
+            file_name = _file_name(args[file_arg]) if file_arg is not None and len(args) > file_arg else None
+            with _phase(name, file_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(text=None, lines=0, nbytes=0):
+    """
+    Add to the lines and bytes of the current phase.
+    text is a list of lines or a string whose lines and characters are counted.
+    """
+    if not _phases.stack:
+        return
+    if text is not None:
+        if isinstance(text, str):
+            lines += text.count('\n')
+            nbytes += len(text)
+        else:
+            lines += len(text)
+            nbytes += sum(map(len, text))
+
+    frame = _phases.stack[-1]
+    frame['segment_lines'] += lines
+    frame['segment_bytes'] += nbytes
+
+def checkpoint(name, text=None, lines=0, nbytes=0):
+    """
+    End a sequential part of the current phase (e.g., 'read', 'scan', 'dataframe'),
+    reported as a nested phase from the previous checkpoint (or the phase start).
+    """
+    if not _phases.stack:
+        return
+    count(text, lines, nbytes)
+
+    frame = _phases.stack[-1]
+    now = time.perf_counter()
+    _record(frame['name'] + '/' + name, frame['file'], now - frame['segment'],
+            frame['segment_lines'], frame['segment_bytes'])
+    frame['lines'] += frame['segment_lines']
+    frame['bytes'] += frame['segment_bytes']
+    frame['segment'], frame['segment_lines'], frame['segment_bytes'] = now, 0, 0
+
+def summarize(records):
+    """
+    Totals per phase of profile records: calls, files, wall time, lines, bytes, and maximum peak RSS
+    """
+    totals = {}
+    for record in records:
+        total = totals.setdefault(record['phase'], {'calls': 0, 'files': set(), 'wall_s': 0.0,
+                                                    'lines': 0, 'bytes': 0, 'peak_rss_mb': 0.0})
+        total['calls'] += 1
+        total['files'].add(record['file'])
+        total['wall_s'] += record['wall_s']
+        total['lines'] += record['lines']
+        total['bytes'] += record['bytes']
+        total['peak_rss_mb'] = max(total['peak_rss_mb'], record['peak_rss_mb'] or 0.0)
+
+    for total in totals.values():
+        total['files'] = len(total['files'] - {None})
+    return totals
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Summarize a profile report (JSON lines) per phase:\n"
+                     "  calls, files, total wall time, lines, bytes, and peak RSS\n"
+                     "A report is written by running a script with GAUSSIANUTILITY_PROFILE=report.jsonl",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', help='Profile report (JSON lines)')
+    args = parser.parse_args()
+    return args
+
+def main():
+    args = parse_args()
+    with open(args.file_name) as inputfile:
+        records = [json.loads(line) for line in inputfile if line.strip()]
+
+    print(f"{'phase':40s} {'calls':>6s} {'files':>6s} {'wall s':>10s} {'lines':>11s} {'MB':>9s} {'RSS MB':>8s}")
+    for name, total in sorted(summarize(records).items(), key=lambda item: -item[1]['wall_s']):
+        print(f"{name:40s} {total['calls']:6d} {total['files']:6d} {total['wall_s']:10.4f} "
+              f"{total['lines']:11d} {total['bytes'] / 1e6:9.2f} {total['peak_rss_mb']:8.1f}")
+
+if __name__ == "__main__":
+    main()
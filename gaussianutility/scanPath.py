@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import os
+import re
+import numpy as np
+import pandas as pd
+import argparse
+from argparse import RawTextHelpFormatter
+from periodictable import elements
+from gaussianutility.utilities import expand_files, run_batch, open_file, inner_name
+from gaussianutility.writers import open_output, write_xyz
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Extract the points of a relaxed potential energy surface scan (opt=modredundant)\n"
+                     "or of an IRC from Gaussian output file(s)\n"
+                     "For every scan point: converged energy, scanned coordinates (bond, angle, dihedral\n"
+                     "of the ModRedundant input with S), and geometry\n"
+                     "For every IRC point: energy, net reaction coordinate (negative on the reverse path),\n"
+                     "and geometry, ordered from the reverse end through the TS to the forward end\n"
+                     "Multiple files or glob patterns can be given; they are processed in parallel with -j\n\n"
+                     "Return file_name_scan.csv (or _irc.csv): Table of the points\n"
+                     "       file_name_scan.xyz (or _irc.xyz): Geometries of the points as a multi-frame XYZ",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', nargs='+', help='Gaussian output file(s) (.out or .log) or glob pattern(s)')
+    parser.add_argument('-n', '--no-xyz', action='store_true', \
+    help="Write the table only")
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes for multiple files; 0 uses all CPUs")
+    args = parser.parse_args()
+    return args
+
+Hartree2kcal = 627.5095
+
+# Orientation blocks; the input orientation is kept for the geometries when it is printed
+_orientations = ('Input orientation:', 'Z-Matrix orientation:', 'Standard orientation:')
+_point = re.compile(r"^ Point Number:\s+(\d+)\s+Path Number:\s+(\d+)")
+
+# Internal coordinates of the ModRedundant input and their number of atoms
+_coordinates = {'B': ('R', 2), 'A': ('A', 3), 'D': ('D', 4)}
+
+def _scanned(line):
+    # Label and atoms of a scanned coordinate of a ModRedundant line, e.g., B 1 2 S 10 0.1
+    tokens = line.split()
+    if tokens[0] not in _coordinates:
+        return None
+    label, n_atoms = _coordinates[tokens[0]]
+    if len(tokens) <= n_atoms + 1 or tokens[n_atoms + 1] != 'S':
+        return None
+    try:
+        atoms = [int(token) for token in tokens[1:n_atoms + 1]]
+    except ValueError:
+        return None
+    return "{}({})".format(label, ",".join(map(str, atoms))), atoms
+
+def measure(coords, atoms):
+    """
+    Distance (Angstrom), angle, or dihedral (degree) of the atoms (from 1) in every geometry
+    of coords (n_points, n_atoms, 3). Return an array of shape (n_points,).
+    """
+    p = np.asarray(coords, dtype=float)[:, np.asarray(atoms) - 1]
+    if len(atoms) == 2:
+        return np.linalg.norm(p[:, 1] - p[:, 0], axis=-1)
+
+    if len(atoms) == 3:
+        u, v = p[:, 0] - p[:, 1], p[:, 2] - p[:, 1]
+        cos = np.einsum('ij,ij->i', u, v) / np.linalg.norm(u, axis=-1) / np.linalg.norm(v, axis=-1)
+        return np.degrees(np.arccos(np.clip(cos, -1, 1)))
+
+    b0, b1, b2 = p[:, 1] - p[:, 0], p[:, 2] - p[:, 1], p[:, 3] - p[:, 2]
+    n1, n2 = np.cross(b0, b1), np.cross(b1, b2)
+    m1 = np.cross(b1 / np.linalg.norm(b1, axis=-1)[:, None], n1)
+    return np.degrees(np.arctan2(np.einsum('ij,ij->i', m1, n2), np.einsum('ij,ij->i', n1, n2)))
+
+def read_path(file_name):
+    """
+    Read the points of a relaxed scan (opt=modredundant) or an IRC from a Gaussian output file in one pass.
+    A scan point ends with 'Optimization completed' (or 'stopped', not converged), and an IRC point
+    with its 'Point Number:  n  Path Number:  p' line; the TS is the first geometry of an IRC.
+    Return a dictionary: kind ('scan' or 'irc'), point, path (IRC: 0 TS, 1 forward, 2 reverse),
+    energy (Hartree, ONIOM extrapolated for ONIOM), converged (scan), coordinates (dictionary of
+    the scanned coordinates, or the net reaction coordinate of an IRC, per point),
+    atomic_numbers of shape (n_atoms,), and coords of shape (n_points, n_atoms, 3).
+    """
+    route, route_lines = None, None
+    scanned = {}
+    modredundant = False
+    orientation, skip, rows = None, 0, []
+    last = {}  # last geometry of every kind of orientation
+    first = None  # first geometry and energy; the TS of an IRC
+    energy = np.nan
+    scan_points, irc_points = [], []
+
+    def current():
+        for kind in _orientations:
+            if kind in last:
+                return last[kind]
+        return None
+
+    with open_file(file_name) as inputfile:
+        for line in inputfile:
+            if orientation is not None:
+                # Rows of the geometry after the 4 lines of the header, until the dashed line
+                if skip:
+                    skip -= 1
+                elif line.startswith(' ---'):
+                    last[orientation] = rows
+                    orientation = None
+                else:
+                    rows.append(line.split())
+                continue
+
+            if route_lines is not None:
+                if line.startswith(' --'):
+                    route, route_lines = "".join(route_lines), None
+                else:
+                    route_lines.append(line.strip('\n')[1:])
+            elif route is None and line.startswith(' #'):
+                route_lines = [line.strip('\n')[1:]]
+
+            elif modredundant:
+                tokens = line.split()
+                if tokens and len(tokens[0]) == 1 and tokens[0].isalpha():
+                    coordinate = _scanned(line)
+                    if coordinate is not None:
+                        scanned[coordinate[0]] = coordinate[1]
+                else:
+                    modredundant = False
+            elif 'ModRedundant input section has been read' in line:
+                modredundant = True
+
+            elif 'orientation:' in line and line.strip() in _orientations:
+                orientation, skip, rows = line.strip(), 4, []
+            elif line.startswith((' SCF Done:', ' ONIOM: extrapolated energy')):
+                energy = float(line.split('=')[1].split()[0])
+                # The ONIOM energy of the first geometry follows the SCF energies of its layers
+                if first is None or first[0] is current():
+                    first = (current(), energy)
+
+            elif line.startswith((' Optimization completed', ' Optimization stopped')):
+                scan_points.append({'point': len(scan_points) + 1, 'energy': energy, 'geom': current(),
+                                    'converged': 'completed' in line})
+            elif line.startswith(' Point Number:'):
+                match = _point.match(line)
+                if match:
+                    irc_points.append({'point': int(match.group(1)), 'path': int(match.group(2)),
+                                       'energy': energy, 'geom': current(), 'coordinate': np.nan})
+            elif line.startswith('   NET REACTION COORDINATE UP TO THIS POINT') and irc_points:
+                irc_points[-1]['coordinate'] = float(line.split('=')[1])
+
+    if route is None:
+        raise TypeError('The file does not look like a Gaussian output file')
+    if 'irc' in route.lower():
+        kind, points = 'irc', irc_points
+    elif 'modredundant' in route.lower():
+        kind, points = 'scan', scan_points
+    else:
+        raise TypeError('The Gaussian job does not look like a relaxed scan (opt=modredundant) or an IRC')
+
+    if kind == 'irc':
+        for point in points:
+            if point['path'] == 2:
+                point['coordinate'] = -abs(point['coordinate'])
+        if first is not None and not any(point['point'] == 0 for point in points):
+            points.insert(0, {'point': 0, 'path': 0, 'energy': first[1], 'geom': first[0], 'coordinate': 0.0})
+        # Reverse path, TS, and forward path
+        points = [points[idx] for idx in np.argsort([point['coordinate'] for point in points], kind='stable')]
+
+    points = [point for point in points if point['geom'] is not None]
+    if not points:
+        raise TypeError('No {} point is found in {}'.format(kind, file_name))
+
+    geoms = np.array([point['geom'] for point in points], dtype=float)
+    path = {'kind': kind,
+            'point': np.array([point['point'] for point in points], dtype=int),
+            'energy': np.array([point['energy'] for point in points], dtype=float),
+            'atomic_numbers': geoms[0, :, 1].astype(int),
+            'coords': geoms[:, :, 3:6]}
+
+    if kind == 'irc':
+        path['path'] = np.array([point['path'] for point in points], dtype=int)
+        path['coordinates'] = {'reaction_coordinate': np.array([point['coordinate'] for point in points])}
+    else:
+        path['converged'] = np.array([point['converged'] for point in points], dtype=bool)
+        path['coordinates'] = {label: measure(path['coords'], atoms) for label, atoms in scanned.items()}
+
+    return path
+
+def path_table(path):
+    """
+    Table of the points: point (and path), coordinates, energy, relative energy (kcal/mol),
+    and converged (scan)
+    """
+    table = {'point': path['point']}
+    if path['kind'] == 'irc':
+        table['path'] = path['path']
+    table.update(path['coordinates'])
+    table['energy'] = path['energy']
+    table['rel_energy_kcal'] = (path['energy'] - np.nanmin(path['energy'])) * Hartree2kcal
+    if path['kind'] == 'scan':
+        table['converged'] = path['converged']
+    return pd.DataFrame(table)
+
+def write_path_xyz(path, table, file_name):
+    atoms = np.array([elements[number].symbol for number in path['atomic_numbers']])
+    columns = [column for column in table.columns if column not in ('rel_energy_kcal', 'converged')]
+    with open_output(file_name) as output:
+        for idx, coords in enumerate(path['coords']):
+            values = [table[column].iloc[idx] for column in columns]
+            comment = " ".join("{}={:.8f}".format(column, value) if column == 'energy' else
+                               "{}={:.6f}".format(column, value) if isinstance(value, float) else
+                               "{}={}".format(column, value) for column, value in zip(columns, values))
+            write_xyz(output, atoms, coords, comment, precision=6)
+
+def summary(file_name, path, table):
+    text = "{}: {} {} points".format(file_name, path['kind'], len(table))
+    if path['kind'] == 'scan' and not path['converged'].all():
+        text += " ({} not converged)".format(int((~path['converged']).sum()))
+    return text + ", E {:.8f} to {:.8f} ({:.2f} kcal/mol)".format(
+        np.nanmin(path['energy']), np.nanmax(path['energy']), table['rel_energy_kcal'].max())
+
+def scan_path(file_name, xyz=True):
+    path = read_path(file_name)
+    table = path_table(path)
+    name = os.path.splitext(inner_name(file_name))[0] + "_" + path['kind']
+
+    table.to_csv(name + ".csv", index=False)
+    if xyz:
+        write_path_xyz(path, table, name + ".xyz")
+
+    return summary(file_name, path, table) + "\n"
+
+def main():
+    args = parse_args()
+    file_names = expand_files(args.file_name)
+    run_batch(scan_path, file_names, (not args.no_xyz,), args.jobs)
+
+if __name__ == "__main__":
+    main()
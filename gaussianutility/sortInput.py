@@ -5,18 +5,22 @@ import pandas as pd
 from periodictable import elements
 import argparse
 from argparse import RawTextHelpFormatter
-from gaussianutility.utilities import readinput
+from gaussianutility.utilities import readinput, split_lattice, expand_files, update_file, run_batch
+from gaussianutility.connectivity import read_connectivity, write_connectivity
+from gaussianutility.writers import format_geometry
+from gaussianutility import profiling
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description= "Sort geometry by an index; 'x', 'y', or 'z' coordinate, atomic number,\n"
                      "or ONIOM layer from low to high in the Gaussian input file (.com or .gjf)\n"
                      "Sorting by an atomic number is defualt"
-                     "Sorting in ascending order is default\n\n"
+                     "Sorting in ascending order is default\n"
+                     "Multiple files or glob patterns can be given; they are processed in parallel with -j\n\n"
                      "Return file_name.com: Gaussian input file with a sorted geometry",
         formatter_class=RawTextHelpFormatter)
 
-    parser.add_argument('file_name', help='Gaussian input file (.com or .gjf)')
+    parser.add_argument('file_name', nargs='+', help='Gaussian input file(s) (.com or .gjf) or glob pattern(s)')
     parser.add_argument('-s', '--sort', nargs='?', const=1, \
     help="Index for sorting;\n"+\
          "'x' or 'y' or 'z' for coordinate, 'A' for atomic number, and 'L' for ONIOM layer\n"+\
@@ -31,14 +35,23 @@ def parse_args():
          "If two sorting indeices (after -s) are provided for an ONIOM input,\n"+\
          "the ONIOM layer will be sorted from low to high automatically,\n"+\
          "and the atoms in each layer will be sorted based on the other index", default='a')
+    parser.add_argument('-j', '--jobs', type=int, default=1, \
+    help="Number of parallel processes for multiple files; 0 uses all CPUs")
+    parser.add_argument('-d', '--dry-run', action='store_true', \
+    help="Print the changes as a unified diff without modifying the files")
+    parser.add_argument('--profile', action='store_true', \
+    help="Report the time of each phase as JSON lines on stderr")
 
     args = parser.parse_args()
     return args
     
-def sort_input(file_name, sortIdx, orderIdx):
-    # Read a Gaussian input file
-    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
-
+@profiling.profiled('sort_atoms', file_arg=None)
+def sort_atoms(route, df_geom, connectivity, sortIdx='AL', orderIdx='a'):
+    """
+    Sort a geometry from readinput by the sorting index and renumber its connectivity lines.
+    Lattice vectors (Tv) are not sorted and stay after the atoms.
+    Return the sorted geometry and connectivity.
+    """
     oniomIdx = "oniom" in route.lower()
     
     # Check sorting and ordering indecies
@@ -65,7 +78,11 @@ def sort_input(file_name, sortIdx, orderIdx):
         if orderIdx == 'a': orderIdx = [1, 1]
         elif orderIdx == 'r': orderIdx = [1, 0]
 
-    # Sorting atoms
+    # Sorting atoms; lattice vectors are appended after the sorted atoms
+    df_atoms, lattice = split_lattice(df_geom)
+    df_tv = df_geom.drop(index=df_atoms.index)
+    df_geom = df_atoms.copy()
+
     ## Sorting based on the ONIOM layer first
     if oniomIdx and 'L' in sortIdx:
         df_layer_sort = pd.DataFrame({'ONIOM_layer': ['L', 'M', 'H']})
@@ -106,85 +123,40 @@ def sort_input(file_name, sortIdx, orderIdx):
             
         df_geom[sortCoord] = ["{:.8f}".format(val) for val in df_geom[sortCoord]]
 
+    df_geom = pd.concat([df_geom, df_tv])
+
     # Modify connectivity data
-    if 'connectivity' in route:
-        atomIdxSwitch = np.vstack([df_geom.index.values, np.array(range(len(df_geom)))]).T
-        atomIdxSwitch = atomIdxSwitch + np.ones(atomIdxSwitch.shape, dtype=int)
-        atomIdxSwitch = {atomIdxSwitch[i,0]: atomIdxSwitch[i,1] for i in range(len(df_geom))}
-
-        newConnect = []
-        for line in connectivity:
-            vals = line.split()
-            for idx, val in enumerate(vals):
-                try: vals[idx] = str(atomIdxSwitch[int(val)])
-                except ValueError:
-                    pass
-
-            newConnect.append(vals)
-
-        idx2remove = []
-        connect2add = []
-        for idx1, line in enumerate(newConnect):            
-            if len(line) > 1:
-                #1, 3, 5, ...
-                for idx2 in range(len(line)):
-                    if idx2 % 2 == 1:
-                        connect2add.append([line[0], line[idx2], line[idx2+1]])
-                                          
-                idx2remove.append(idx1)
-                                          
-        for idx in sorted(idx2remove, reverse=True):
-            del newConnect[idx]
-                    
-        newConnect = newConnect + connect2add
-
-        for idx, line in enumerate(newConnect):
-            if len(line) > 1 and int(line[0]) > int(line[1]):
-                newConnect[idx] = [line[1], line[0], line[2]]
-                
-        missingAtom = np.setdiff1d(np.array(range(len(df_geom)))+1, np.unique([int(elem[0]) for elem in newConnect]))
-        for elem in missingAtom:
-            newConnect.append([str(elem)])
-                
-        newConnect = sorted(newConnect, key=lambda x:int(x[0]))
-        newConnectSorted = []
-
-        for i in range(len(df_geom)):
-            sublist = [elem for elem in newConnect if int(elem[0]) == i+1]
-            if len(sublist) > 1:
-                starting = sublist[0][0]
-                connected = []
-                for elem in sublist:
-                    connected.append(elem[1:])
-                
-                connected = [x for x in connected if x]
-                
-                if len(connected) > 1:
-                    connected = [[starting]] + sorted(connected, key=lambda x:int(x[0]))
-                else:
-                    connected = [[starting]] + connected
-            
-                connected = [item for sublist in connected for item in sublist]
-                newConnectSorted.append(connected)
-                
-            else:
-                newConnectSorted.append(sublist[0])
+    if connectivity:
+        bonds, orders = read_connectivity(connectivity)
+        newIdx = np.empty(len(df_geom), dtype=int)
+        newIdx[df_geom.index.values] = np.arange(len(df_geom))
+        connectivity = write_connectivity(newIdx[bonds], orders, len(df_geom))
+
+    return df_geom.reset_index(drop=True), connectivity
+
+@profiling.profiled('sort_input')
+def sort_input(file_name, sortIdx, orderIdx, dry_run=False):
+    # Read a Gaussian input file
+    route, title, charge_mult, df_geom, connectivity = readinput(file_name)
+
+    df_geom, connectivity = sort_atoms(route, df_geom, connectivity, sortIdx, orderIdx)
 
     # Write Gaussian input file
-    with open(file_name, 'w') as output:
-        output.write(f"{route}\n")
-        output.write(f"{title}\n")
-        output.write(charge_mult)
-        output.write(df_geom.to_csv(index=False, header=False, sep='\t'))
-        output.write('\n\n')
-        if 'newConnectSorted' in locals():
-            for line in newConnectSorted:
-                output.write(' '.join(line) + '\n')
-            output.write('\n')
+    text = [f"{route}\n", f"{title}\n", charge_mult]
+    text.append(format_geometry(df_geom))
+    text.append('\n\n')
+    if connectivity:
+        text += connectivity
+        text.append('\n')
+
+    return update_file(file_name, ''.join(text), dry_run)
 
 def main():
     args = parse_args()
-    sort_input(args.file_name, args.sort, args.order)
+    if args.profile:
+        profiling.enable()
+    file_names = expand_files(args.file_name)
+    run_batch(sort_input, file_names, (args.sort, args.order, args.dry_run), args.jobs)
 
 if __name__ == "__main__":
     main()
@@ -6,6 +6,9 @@ import pandas as pd
 import argparse
 from argparse import RawTextHelpFormatter
 import matplotlib.pyplot as plt
+from gaussianutility.utilities import open_file, inner_name
+from gaussianutility import profiling
+from gaussianutility.prefetch import prefetched
 
 ##### Change these lines to modify X range or make corrections #####
 ##### For UV-Vis #####
@@ -22,8 +25,11 @@ IR_wn_factor = 1 # default
 IR_HWHM = 4 # IR peak half-width at half-max, cm-1 # default
 
 # Define functions to extract spectrum data from output file(s)
+@profiling.profiled('uv_vis')
 def uv_vis(file_name):
-    readfile = open(file_name).readlines()
+    with open_file(file_name) as inputfile:
+        readfile = inputfile.readlines()
+    profiling.count(readfile)
     wavelengths = []
     strengths = []
     
@@ -46,17 +52,41 @@ def uv_vis(file_name):
     
     return wavelengths, strengths
 
+def fchk_vibrations(file_name, key, isotopes=None):
+    # Frequencies and the IR intensities or Raman activities of a formatted checkpoint file;
+    # IR from the force constants and dipole derivatives with isotopes or without Vib-E2
+    from gaussianutility.fchk import read_fchk, vibrations
+    from gaussianutility.isotopes import isotopologues
 
-def ir(file_name):
-    readfile = open(file_name, 'r')
+    sections = read_fchk(file_name, ['Number of Normal Modes', 'Vib-E2']) if isotopes is None else {}
+    if 'Vib-E2' in sections:
+        modes = vibrations(sections)
+        return modes['frequencies'], modes[key]
+    if key != 'ir_intensities':
+        raise TypeError('Raman activities are only read from the frequencies (Vib-E2) of the file, without isotopes')
+
+    masses, analysis, data = isotopologues(file_name, [isotopes])
+    if 'ir_intensities' not in analysis:
+        raise TypeError('The formatted checkpoint file does not have dipole derivatives for IR intensities')
+    return analysis['frequencies'][0], analysis['ir_intensities'][0]
+
+@profiling.profiled('ir')
+def ir(file_name, isotopes=None):
+    if inner_name(file_name).lower().endswith('.fchk'):
+        return fchk_vibrations(file_name, 'ir_intensities', isotopes)
+
+    readfile = open_file(file_name)
     frequencies = []
     intensities = []
     
-    for line in readfile:
+    nlines, nbytes = 0, 0
+    for nlines, line in enumerate(readfile, 1):
+        nbytes += len(line)
         if 'Frequencies --' in line:
             frequencies.append(line.split()[2:])
         if 'IR Inten' in line:
             intensities.append(line.split()[3:])
+    profiling.count(lines=nlines, nbytes=nbytes)
             
     if len(intensities) == 0:
         raise TypeError('The Gaussian job does not look like conntaining normal IR information')
@@ -66,16 +96,23 @@ def ir(file_name):
 
     return frequencies, intensities
 
-def raman(file_name):
-    readfile = open(file_name, 'r')
+@profiling.profiled('raman')
+def raman(file_name, isotopes=None):
+    if inner_name(file_name).lower().endswith('.fchk'):
+        return fchk_vibrations(file_name, 'raman_activities', isotopes)
+
+    readfile = open_file(file_name)
     frequencies = []
     intensities = []
     
-    for line in readfile:
+    nlines, nbytes = 0, 0
+    for nlines, line in enumerate(readfile, 1):
+        nbytes += len(line)
         if 'Frequencies --' in line:
             frequencies.append(line.split()[2:])
         if 'Raman Activ' in line:
             intensities.append(line.split()[3:])
+    profiling.count(lines=nlines, nbytes=nbytes)
             
     if len(intensities) == 0:
         raise TypeError('The Gaussian job does not look like conntaining normal IR information')
@@ -116,6 +153,8 @@ def parse_args():
         Produce Normal-IR, Raman, or UV-Vis spectrum from Gaussian output file (.out)
         For Raman spectrum, the Gaussian calculation should be done with freq=raman keyword
         For UV-Vis spectrum, excited state calculations (like TD-DFT and EOM-CCSD) should be done
+        For IR and Raman spectra, formatted checkpoint files (.fchk) can be given as well;
+        with -I, the IR spectrum of an isotopologue is computed from their force constants (see isotopeFreq)
         Linear combination of multiple spectra for mixtures is available by adding ratio arguments
         This case, the sum of the ratios must be 1
 
@@ -133,9 +172,13 @@ def parse_args():
                         choices=["uv", "ir", "raman"],
                         help="Type of spectrum; 'uv' for UV-Vis, 'ir' for normal IR, and 'raman' for Raman")
     parser.add_argument('file_name', nargs='+', 
-                        help="Gaussian output files (.out)")
+                        help="Gaussian output files (.out), or .fchk files for IR and Raman")
     parser.add_argument('-r', '--ratio', nargs='?', 
                         help="Ratios of input structures (required when multiple structures are provided)")
+    parser.add_argument('-I', '--isotopes',
+                        help="Isotope pattern for .fchk files, e.g., H=2 or C=13,5=2")
+    parser.add_argument('--profile', action='store_true',
+                        help="Report the time of each phase as JSON lines on stderr")
     args = parser.parse_args()
 
     return args
@@ -143,6 +186,8 @@ def parse_args():
 def main():
     # Read provided arguments
     args = parse_args()
+    if args.profile:
+        profiling.enable()
     type_name = args.type
     file_names = args.file_name
     ratios = [float(val) for val in args.ratio] if args.ratio else [1]
@@ -155,10 +200,14 @@ def main():
 
     names = []
     for file_name in file_names:
-        name, informat = file_name.rsplit(".", 1)
+        name, informat = inner_name(file_name).rsplit(".", 1)
         names.append(name)
+        if type_name != 'uv' and informat.lower() == 'fchk':
+            continue
+        if args.isotopes is not None:
+            raise TypeError("Isotopes need the force constants of formatted checkpoint files (.fchk)")
         if informat not in ("out"):
-            raise TypeError("The input file format must be .out")
+            raise TypeError("The input file format must be .out" + ("" if type_name == 'uv' else " or .fchk"))
 
     # Plot spectra
     # UV-Vis
@@ -173,18 +222,19 @@ def main():
         xrange = UV_wl_range
         curve_per_file = []
         
-        for file_name in file_names:
+        for file_name in prefetched(file_names):
             wavelengths, strengths = uv_vis(file_name)
             
-            curve_per_x = []
-            for idx, wv in enumerate(wavelengths):
-                wv_array = np.ones(len(xrange)) * wv
-                st_array = np.ones(len(xrange)) * strengths[idx]
+            with profiling.phase('broadening', file_name):
+                curve_per_x = []
+                for idx, wv in enumerate(wavelengths):
+                    wv_array = np.ones(len(xrange)) * wv
+                    st_array = np.ones(len(xrange)) * strengths[idx]
+                    
+                    curve = np.array(list(map(uvGauss, xrange, st_array, wv_array)))
+                    curve_per_x.append(curve)
                 
-                curve = np.array(list(map(uvGauss, xrange, st_array, wv_array)))
-                curve_per_x.append(curve)
-            
-            final_curve = np.sum(curve_per_x, axis=0)
+                final_curve = np.sum(curve_per_x, axis=0)
             curve_per_file.append(final_curve)
             
             if len(file_names) == 1:
@@ -236,21 +286,22 @@ def main():
         xrange = IR_wv_range
         curve_per_file = []
         
-        for file_name in file_names:
+        for file_name in prefetched(file_names):
             if type_name == 'ir':
-                frequencies, intensities = ir(file_name)
+                frequencies, intensities = ir(file_name, args.isotopes)
                 frequencies *= IR_wn_factor # Correction factor
                 intensities *= 1e5/2.24e3
             elif type_name == 'raman':
-                frequencies, intensities = raman(file_name)
+                frequencies, intensities = raman(file_name, args.isotopes)
                 
-            curve_per_x = []
-            for idx, mu in enumerate(frequencies):
-                mu_array = np.ones(len(xrange)) * mu
-                curve = np.array(list(map(cauchy, xrange, mu_array))) * intensities[idx]
-                curve_per_x.append(curve)
-            
-            final_curve = np.sum(curve_per_x, axis=0)
+            with profiling.phase('broadening', file_name):
+                curve_per_x = []
+                for idx, mu in enumerate(frequencies):
+                    mu_array = np.ones(len(xrange)) * mu
+                    curve = np.array(list(map(cauchy, xrange, mu_array))) * intensities[idx]
+                    curve_per_x.append(curve)
+                
+                final_curve = np.sum(curve_per_x, axis=0)
             curve_per_file.append(final_curve)
             
             if len(file_names) == 1:
@@ -3,7 +3,17 @@
 import numpy as np
 import pandas as pd
 import sys
+import os
+import io
+import glob
+import gzip
+import bz2
+import lzma
+import difflib
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from periodictable import elements
+from gaussianutility import profiling, prefetch
 
 """
 
@@ -12,6 +22,93 @@ The utilities herein are not used by itself but inside another script.
 
 """
 
+# Magic bytes of the compressed files that can be read, and their extensions
+compressions = {'gzip': b'\x1f\x8b', 'bzip2': b'BZh', 'xz': b'\xfd7zXZ\x00', 'zstd': b'\x28\xb5\x2f\xfd'}
+compressed_extensions = ('.gz', '.bz2', '.xz', '.zst', '.zstd')
+extension_compressions = {'.gz': 'gzip', '.bz2': 'bzip2', '.xz': 'xz', '.zst': 'zstd', '.zstd': 'zstd'}
+
+
+def inner_name(file_name):
+    """
+    This removes the extension of compression, e.g., job.out.gz to job.out,
+    so that the format of a compressed file is recognized by its inner extension.
+    """
+    name, ext = os.path.splitext(file_name)
+    if ext.lower() in compressed_extensions:
+        return name
+    return file_name
+
+
+def compression(file_name):
+    """
+    This detects the compression of a file (or a binary stream) from its first bytes.
+    Return 'gzip', 'bzip2', 'xz', 'zstd', or None for an uncompressed file.
+    """
+    if isinstance(file_name, io.BytesIO):
+        head = file_name.getbuffer()[:6].tobytes()
+    else:
+        with open(file_name, 'rb') as inputfile:
+            head = inputfile.read(6)
+
+    for kind, magic in compressions.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+def _open_zstd(source):
+    try:
+        from compression import zstd
+        return zstd.open(source, 'rb')
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Reading zstd-compressed files requires the zstandard package (pip install zstandard)")
+
+    if not isinstance(source, io.IOBase):
+        source = open(source, 'rb')
+    stream = zstandard.ZstdDecompressor().stream_reader(source, closefd=True)
+    return io.BufferedReader(stream)
+
+
+def open_file(file_name, mode='r'):
+    """
+    This opens a file for reading like open(), decompressing gzip, bzip2, xz,
+    and zstd files on the fly; compression is recognized by the magic bytes.
+    mode is 'r' for text or 'rb' for bytes.
+    The contents read ahead by gaussianutility.prefetch are used if there are any.
+    """
+    source = prefetch.take(file_name) or file_name
+    kind = compression(source)
+    if kind is None:
+        if source is file_name:
+            return open(file_name, mode)
+        stream = source
+    elif kind == 'gzip':
+        stream = gzip.open(source, 'rb')
+    elif kind == 'bzip2':
+        stream = bz2.open(source, 'rb')
+    elif kind == 'xz':
+        stream = lzma.open(source, 'rb')
+    else:
+        stream = _open_zstd(source)
+
+    if 'b' in mode:
+        return stream
+    return io.TextIOWrapper(stream)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+@profiling.profiled('readinput')
 def readinput(file_name):
     """
     This reads an Gaussian inputfile and decomposes it into multiple elements 
@@ -20,13 +117,14 @@ def readinput(file_name):
     Geometry is a pandas dataframe and all the others are strings
     """
     # Check input file
-    name, input_format = file_name.rsplit(".", 1)
+    name, input_format = inner_name(file_name).rsplit(".", 1)
     if input_format not in ('com', 'gjf'):
         raise TypeError('The input file format must be .com or .gjf')
 
     # Find the elements of the Gaussian input file
-    with open(file_name, 'r') as inputfile:
+    with open_file(file_name) as inputfile:
         lines = inputfile.readlines()
+    profiling.checkpoint('read', lines)
 
     # Route section
     for idx, line in enumerate(lines):
@@ -66,13 +164,22 @@ def readinput(file_name):
             connectivity.append(line)
             if line.startswith(str(len(geom))) or line.startswith(" "+str(len(geom))):
                 break
+    profiling.checkpoint('scan', lines=len(lines))
 
     if any(keyword in route.lower() for keyword in ["oniom"]):
         lineLen = 0
         for line in geom:
             if len(line) > lineLen: lineLen = len(line)
 
-        if lineLen == 5:
+        # Layers not assigned yet: Atom x y z, or Atom Index x y z (frozen index); an empty layer column
+        if lineLen == 4 or (lineLen == 5 and all(_is_number(line[-1]) for line in geom if len(line) == 5)):
+            if lineLen == 4:
+                df_geom = pd.DataFrame(geom, columns = ['Atom','x','y','z'])
+            else:
+                geom = [line if len(line) == 5 else line[:1] + [None] + line[1:] for line in geom]
+                df_geom = pd.DataFrame(geom, columns = ['Atom','Index','x','y','z'])
+            df_geom['ONIOM_layer'] = None
+        elif lineLen == 5:
             df_geom = pd.DataFrame(geom, columns = ['Atom','x','y','z','ONIOM_layer'])
         elif lineLen > 5:
             clmnName = []
@@ -105,6 +212,7 @@ def readinput(file_name):
 
             if lineLen == 5:
                 #Check if the geometry has periodic boundaries
+                boundary_flag = False
                 if 'Tv' in np.array(df_geom['C0']):
                     df_geom = df_geom.loc[df_geom['C0'] != 'Tv']
                     boundary_flag = True
@@ -132,26 +240,18 @@ def readinput(file_name):
                 df_geom = df_geom.rename({'C0':'Atom', 'C1':'x', 'C2':'y', 'C3':'z'}, axis='columns')
 
     df_geom['Atom'] = np.array([atomSb.split('-')[0] for atomSb in list(df_geom['Atom'])])
+    profiling.checkpoint('dataframe')
     
     return route, title, charge_mult, df_geom, connectivity
 
 
-def readoutput(file_name, stepIdx = -1):
+def read_route(lines):
     """
-    This reads an Gaussian outputfile and decomposes it into multiple elements 
-    as a return for the use in other scripts.
-    Return route section, title, spin and multiplicity, and and geometry.
-    Geometry is a pandas dataframe and all the others are strings
+    This reads the route section and charge and multiplicity of a Gaussian output
+    from its lines.
+    Return route section, charge and multiplicity as strings, and the index of the
+    line after charge and multiplicity.
     """
-    # Check input file
-    name, input_format = file_name.rsplit(".", 1)
-    if input_format not in ['out', 'log']:
-        raise TypeError('The input file format must be .out or .log')
-
-    # Read file
-    with open(file_name, 'r') as inputfile:
-        lines = inputfile.readlines()
-
     # Read computational chemistry method and remove unnecessary keywords 
     for idx, line in enumerate(lines):
         if "#" in line:
@@ -205,6 +305,40 @@ def readoutput(file_name, stepIdx = -1):
         charge, multiplicity = lines[idx_charge].split()[2], lines[idx_charge].split()[5]
         charge_mult = "{} {}".format(charge, multiplicity)
 
+
+    return routeStr, charge_mult, idx_charge_end
+
+
+@profiling.profiled('readoutput')
+def readoutput(file_name, stepIdx = -1):
+    """
+    This reads an Gaussian outputfile and decomposes it into multiple elements 
+    as a return for the use in other scripts.
+    Return route section, title, spin and multiplicity, and and geometry.
+    Geometry is a pandas dataframe and all the others are strings
+    """
+    # Check input file
+    name, input_format = inner_name(file_name).rsplit(".", 1)
+    if input_format not in ['out', 'log']:
+        raise TypeError('The input file format must be .out or .log')
+
+    # Read file
+    with open_file(file_name) as inputfile:
+        lines = inputfile.readlines()
+    profiling.checkpoint('read', lines)
+
+    return parse_output(lines, stepIdx)
+
+
+def parse_output(lines, stepIdx = -1):
+    """
+    This does the work of readoutput on the lines of a Gaussian output file that are
+    already read, e.g., to take the energies from the same lines.
+    Return route section, spin and multiplicity, and geometry as readoutput.
+    """
+    routeStr, charge_mult, idx_charge_end = read_route(lines)
+    oniom = any(word in routeStr.lower() for word in ["oniom"])
+
     # Read oniom layer data
     iniGeom = []
     for line in lines[idx_charge_end:]:
@@ -277,6 +411,7 @@ def readoutput(file_name, stepIdx = -1):
         geom.append(line.split())
         if "----------------------------" in line:
             break
+    profiling.checkpoint('scan', lines=len(lines))
 
     # Convert geometry information to Pandas dataframe
     df_geom = pd.DataFrame(geom[:-1], columns = ['index','atomic number','atomic type','x','y','z'])
@@ -294,6 +429,167 @@ def readoutput(file_name, stepIdx = -1):
 
     df_geom = df_geom.drop(columns='atomic number')
     df_geom.insert(0, 'Atom', atomSb)
+    profiling.checkpoint('dataframe')
 
     return routeStr, charge_mult, df_geom
     
+
+
+def split_lattice(df_geom):
+    """
+    This separates the lattice vectors (Tv rows) from a geometry dataframe
+    returned by readinput or readoutput.
+    Return the dataframe of atoms and the lattice as a numpy array of shape (n, 3),
+    or None if the geometry is not periodic.
+    """
+    tv = np.array(df_geom['Atom'] == 'Tv')
+    if not tv.any():
+        return df_geom, None
+
+    lattice = np.array(df_geom.loc[tv, ['x', 'y', 'z']], dtype=float)
+
+    return df_geom.loc[~tv], lattice
+
+
+def expand_files(file_names):
+    """
+    This expands glob patterns (e.g. '*.com') in the given file names,
+    keeping the order and removing duplicates.
+    Names without a match are kept, so that a missing file is reported when opened.
+    """
+    expanded = []
+    for file_name in file_names:
+        matches = sorted(glob.glob(file_name)) if glob.has_magic(file_name) else []
+        for match in (matches or [file_name]):
+            if match not in expanded:
+                expanded.append(match)
+
+    return expanded
+
+
+def _compress(data, kind):
+    # Compress bytes as a file of the kind returned by compression()
+    if kind == 'gzip':
+        return gzip.compress(data)
+    if kind == 'bzip2':
+        return bz2.compress(data)
+    if kind == 'xz':
+        return lzma.compress(data)
+    try:
+        from compression import zstd
+        return zstd.compress(data)
+    except ImportError:
+        pass
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Writing zstd-compressed files requires the zstandard package (pip install zstandard)")
+    return zstandard.ZstdCompressor().compress(data)
+
+
+def _temporary_file(file_name):
+    # New file next to file_name, created as open() does (0666 without the umask, applied by the kernel)
+    directory = os.path.dirname(os.path.abspath(file_name))
+    prefix = '.' + os.path.basename(file_name) + '.'
+    while True:
+        tmp_name = os.path.join(directory, prefix + os.urandom(4).hex())
+        try:
+            return os.open(tmp_name, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666), tmp_name
+        except FileExistsError:
+            continue
+
+
+@profiling.profiled('write_atomic')
+def write_atomic(file_name, text):
+    """
+    This writes text to a temporary file in the same directory and renames it
+    over file_name, so that the original file is never left half-written.
+    A compressed file (e.g., job.com.gz) is written with the same compression.
+    A new file gets the permissions of open() (0666 without the umask), and an existing one keeps its own.
+    """
+    if os.path.exists(file_name):
+        kind = compression(file_name)
+        mode = os.stat(file_name).st_mode & 0o7777
+    else:
+        kind = extension_compressions.get(os.path.splitext(file_name)[1].lower())
+        mode = None
+
+    data = text.encode()
+    if kind is not None:
+        data = _compress(data, kind)
+
+    fd, tmp_name = _temporary_file(file_name)
+    try:
+        with os.fdopen(fd, 'wb') as output:
+            output.write(data)
+            profiling.count(text)
+            output.flush()
+            os.fsync(output.fileno())
+        if mode is not None:
+            os.chmod(tmp_name, mode)
+        os.replace(tmp_name, file_name)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+        raise
+
+
+def update_file(file_name, text, dry_run=False):
+    """
+    This replaces the content of file_name with text atomically.
+    With dry_run, the file is not modified and a unified diff is returned instead.
+    """
+    if not dry_run:
+        write_atomic(file_name, text)
+        return ''
+
+    with open_file(file_name) as inputfile:
+        old_lines = inputfile.readlines()
+
+    diff = difflib.unified_diff(old_lines, text.splitlines(keepends=True),
+                                fromfile=file_name, tofile=file_name + ' (modified)')
+    return ''.join(diff)
+
+
+def _run_one(func, args, file_name):
+    try:
+        return file_name, func(file_name, *args), None
+    except Exception as error:
+        return file_name, None, "{}: {}".format(type(error).__name__, error)
+
+
+def run_batch(func, file_names, args=(), jobs=1):
+    """
+    This applies func(file_name, *args) to every file, in a process pool when jobs > 1
+    (jobs=0 uses all CPUs), and prints the returned text (e.g. dry-run diffs) in order.
+    A single file is processed directly so that errors are raised as usual;
+    with multiple files, errors are reported per file and the others are still processed.
+    """
+    if len(file_names) == 1:
+        output = func(file_names[0], *args)
+        if output:
+            print(output, end='')
+        return
+
+    worker = functools.partial(_run_one, func, args)
+    jobs = jobs or os.cpu_count()
+
+    if jobs == 1:
+        failed = _report(map(worker, prefetch.prefetched(file_names)))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(file_names))) as executor:
+            failed = _report(executor.map(worker, file_names))
+
+    if failed:
+        sys.exit("{} of {} files failed".format(failed, len(file_names)))
+
+
+def _report(results):
+    failed = 0
+    for file_name, output, error in results:
+        if error:
+            failed += 1
+            print("!!!Error in " + file_name + ": " + error, file=sys.stderr)
+        elif output:
+            print(output, end='')
+    return failed
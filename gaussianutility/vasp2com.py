@@ -1,115 +1,80 @@
 #!/usr/bin/env python
 
-import numpy as np
+import os
 import itertools
-import mendeleev as md
-import pandas as pd
 import argparse
 from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import inner_name
+from gaussianutility.formats import read_vasp_frames, vasp_structure, write_input
+from gaussianutility.pipeline import connectivity
+from gaussianutility.writers import open_output
 
 def parse_args():
     parser = argparse.ArgumentParser(
         description= "Convert vasp input file to Gaussian input file (.com)\n"
-                     "The computational method in the Gaussian calculation must be modified manually if needed\n\n"
-                     "Return file_name.com: Gaussian input file",
+                     "The computational method in the Gaussian calculation must be modified manually if needed\n"
+                     "Multi-frame files (XDATCAR or concatenated POSCARs) are read frame by frame;\n"
+                     "one input is written per selected frame, or a single --Link1-- job with -l\n\n"
+                     "Return file_name.com: Gaussian input file\n"
+                     "       file_name_N.com: Gaussian input file of frame N (multi-frame files)",
         formatter_class=RawTextHelpFormatter)
 
-    parser.add_argument("file_name", help='VASP input file, e.g., POSCAR')
+    parser.add_argument("file_name", help='VASP input file, e.g., POSCAR, or trajectory, e.g., XDATCAR')
+    parser.add_argument('-c', '--connectivity', action='store_true', \
+    help='Perceive bonds from covalent radii (across periodic boundaries)\n'+\
+         'and write a geom=connectivity section')
+    parser.add_argument('-s', '--stride', type=int, default=1, \
+    help='Convert every s-th frame of a multi-frame file, starting from the first one')
+    parser.add_argument('-l', '--link1', action='store_true', \
+    help='Write all the selected frames to a single file as --Link1-- jobs')
+    parser.add_argument('-n', '--no-lattice', action='store_true', \
+    help='Do not write lattice vectors (Tv), i.e., make cluster inputs')
     return parser.parse_args()
 
-def vasp_2_com(file_name):
-    # Read geometry information and make Pandas dataframe
-    lines = open(file_name).readlines()
-    
-    title = lines[0]
-    
-    lattice_scailing_factor = float(lines[1].split()[0])
-    
-    lattice = [line.split() for line in lines[2:5]]
-    lattice = np.array(lattice, dtype = float)
-    elem_type = lines[5].split()
-    
-    elem_num = np.array(list(map(int, lines[6].split())))
-    elect_num = np.array([md.element(e).electrons for e in elem_type])
-    multiplicity = 1 if sum(elect_num * elem_num) % 2 == 0 else 2
-    
-    elem_list = np.array(list(itertools.chain.from_iterable([ [e] * n for e, n in zip(elem_type, elem_num)])))
-    
-    if lines[7].split()[0].lower() == 'selective':
-        geom_lines = []
-        for line in lines[9:]:
-            if len(line.split()) <= 2:
-                break
-                
-            geom_lines.append(line.split())
-    
-        geom_lines = np.array(geom_lines)
-        geom = np.array(geom_lines[:,:3], dtype=float)
-    
-        if lines[8].split()[0].lower() == 'cartesian':
-            geom *= lattice_scailing_factor
-        elif lines[8].split()[0].lower() == 'direct':
-            geom = np.dot(geom, lattice) * lattice_scailing_factor
-        else:
-            raise TypeError('Cannot read geometry type parameter - It should be either cartesian or direct.')
-            
-        flags = geom_lines[:,3:]
-        flags_for_gaussian = []
-        for flag in flags:
-            if np.unique(flag) == 'T':
-                flags_for_gaussian.append('0')
-            elif np.unique(flag) == 'F':
-                flags_for_gaussian.append('-1')
-            else:
-                raise TypeError('Supported selective dynamics flags are only T,T,T and F,F,F.')
-    
-        df_geom = pd.DataFrame(geom, columns = ['x', 'y', 'z'])
-        df_geom.insert(loc=0, column='flag', value=flags_for_gaussian)
-        df_geom.insert(loc=0, column='element', value=elem_list)
-        
-    else:
-        geom_lines = []
-        for line in lines[8:]:
-            if len(line.split()) <= 2:
-                break
-                
-            geom_lines.append(line.split())
-    
-        geom_lines = np.array(geom_lines)
-        geom = np.array(geom_lines[:,:3], dtype=float)
+def frame_input(frame, connectIdx=False, latticeIdx=True, title=None):
+    """
+    Gaussian input structure of a frame from read_vasp_frames
+    """
+    number, header, geom, flags = frame
+    structure = vasp_structure(header, geom, flags, latticeIdx, title)
+    if connectIdx:
+        structure = connectivity(structure)
+    return structure
+
+def vasp_2_com(file_name, connectIdx=False, stride=1, link1=False, latticeIdx=True):
+    name = os.path.splitext(inner_name(file_name))[0]
+    frames = read_vasp_frames(file_name, stride)
 
-        if lines[7].split()[0].lower() == 'cartesian':
-            geom *= lattice_scailing_factor
-        elif lines[7].split()[0].lower() == 'direct':
-            geom = np.dot(geom, lattice) * lattice_scailing_factor
-        else:
-            raise TypeError('Cannot read geometry type parameter - It should be either cartesian or direct.')
-    
-        df_geom = pd.DataFrame(geom, columns = ['x', 'y', 'z'])
-        df_geom.insert(loc=0, column='element', value=elem_list)
-    
-    df_geom[['x', 'y', 'z']] = df_geom[['x', 'y', 'z']].applymap(lambda x: '{0:.16f}'.format(x))
-  
-    lattice = pd.DataFrame(lattice, columns = ['x', 'y', 'z']).applymap(lambda x: '{0:.16f}'.format(x))
-    lattice.insert(loc=0, column='element', value=['Tv', 'Tv', 'Tv'])
+    # A single structure keeps the name of the input file
+    first = next(frames, None)
+    if first is None:
+        raise ValueError('No complete structure is found in ' + file_name)
+    second = next(frames, None)
+    frames = itertools.chain([first] if second is None else [first, second], frames)
+    multiframe = second is not None
 
-    # Write .com file
-    out_file = file_name.rsplit(".",1)[0] + ".com"
-    with open(out_file, 'w') as output:
-        output.write('# pbepbe/3-21g/auto\n\n')
-        output.write(f'{file_name.rsplit(".", 1)[0]}\n\n')
-        output.write(f'0 {multiplicity}\n')
-        output.write(df_geom.to_csv(index=False, header=False, sep='\t'))
-        output.write(lattice.to_csv(index=False, header=False, sep='\t'))
-        output.write('\n')
+    if not multiframe:
+        with open_output(name + ".com") as output:
+            write_input(output, frame_input(first, connectIdx, latticeIdx, name))
+        return
+
+    if link1:
+        with open_output(name + ".com") as output:
+            for idx, frame in enumerate(frames):
+                if idx:
+                    output.write('--Link1--\n')
+                write_input(output, frame_input(frame, connectIdx, latticeIdx, f'{name} frame {frame[0]}'))
+    else:
+        for frame in frames:
+            with open_output(f"{name}_{frame[0]}.com") as output:
+                write_input(output, frame_input(frame, connectIdx, latticeIdx, f'{name} frame {frame[0]}'))
 
 
 def main():
     args = parse_args()
     file_name = args.file_name
 
-    vasp_2_com(file_name)
+    vasp_2_com(file_name, args.connectivity, args.stride, args.link1, not args.no_lattice)
 
 if __name__ == "__main__":
     main()
-
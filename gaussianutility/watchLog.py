@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import time
+import struct
+import select
+import ctypes
+import ctypes.util
+import argparse
+from argparse import RawTextHelpFormatter
+from gaussianutility.utilities import expand_files
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description= "Monitor running Gaussian jobs by following their output files (.out or .log)\n"
+                     "Only the data appended since the last check is read, so hundreds of logs\n"
+                     "can be followed from one process; file changes are detected with inotify\n"
+                     "on Linux, and by polling otherwise\n"
+                     "A line is printed whenever the status of a job changes:\n"
+                     "  File_name, status, optimization step, latest SCF or ONIOM energy,\n"
+                     "  and convergence (Maximum Force, RMS Force, Maximum Displacement, RMS Displacement)\n"
+                     "Monitoring ends when all the jobs are terminated, or with Ctrl-C",
+        formatter_class=RawTextHelpFormatter)
+
+    parser.add_argument('file_name', nargs='+', help='Gaussian output file(s) (.out or .log) or glob pattern(s)')
+    parser.add_argument('-i', '--interval', type=float, default=2.0, \
+    help="Seconds between checks of the files (default: 2)")
+    parser.add_argument('-1', '--once', action='store_true', \
+    help="Print the current status of every job once and exit")
+    parser.add_argument('-f', '--follow', action='store_true', \
+    help="Keep monitoring after all the jobs are terminated")
+    args = parser.parse_args()
+    return args
+
+# Maximum bytes read from a file in one check, so a large log does not hold up the others
+read_size = 1 << 22
+
+# Convergence criteria of geometry optimization, in the order printed by Gaussian
+criteria = ('Maximum Force', 'RMS Force', 'Maximum Displacement', 'RMS Displacement')
+
+def new_state(file_name):
+    """
+    Monitoring state of a file: read position, unfinished last line, and parsed job status
+    """
+    return {'file': file_name, 'offset': 0, 'inode': None, 'partial': '',
+            'status': 'waiting', 'job': 0, 'step': 0, 'energy': '', 'energy_type': '',
+            'converged': {}, 'stationary': False}
+
+def _reset(state):
+    state.update(new_state(state['file']))
+
+def parse_lines(state, lines):
+    """
+    Update the job status with newly appended lines
+    """
+    for line in lines:
+        if "SCF Done:" in line:
+            state['energy'], state['energy_type'] = line.split()[4], 'SCF'
+        elif "ONIOM: extrapolated energy" in line:
+            state['energy'], state['energy_type'] = line.split()[-1], 'ONIOM'
+        elif "Step number" in line and "out of a maximum" in line:
+            state['step'] = int(line.split()[2])
+        elif line.startswith((' Maximum ', ' RMS ')):
+            tokens = line.split()
+            item = ' '.join(tokens[:-3])
+            if item in criteria and tokens[-1] in ('YES', 'NO'):
+                state['converged'][item] = tokens[-1]
+        elif "Stationary point found" in line:
+            state['stationary'] = True
+        elif "Normal termination" in line:
+            state['status'] = 'normal'
+        elif "Error termination" in line:
+            state['status'] = 'error'
+        elif line.startswith(' Entering Gaussian System') or line.startswith(' Link1:'):
+            # A new (linked) job; the optimization data restart
+            state['status'], state['job'] = 'running', state['job'] + 1
+            state['step'], state['converged'], state['stationary'] = 0, {}, False
+
+def poll(state, size=read_size):
+    """
+    Read what was appended to the file since the last call, at most size bytes.
+    A truncated or replaced file is read again from the start.
+    Return whether the status changed and whether unread data remain.
+    """
+    try:
+        stat = os.stat(state['file'])
+    except FileNotFoundError:
+        return False, False
+
+    if stat.st_ino != state['inode'] or stat.st_size < state['offset']:
+        _reset(state)
+        state['inode'] = stat.st_ino
+        if state['status'] == 'waiting':
+            state['status'] = 'running'
+
+    if stat.st_size == state['offset']:
+        return False, False
+
+    with open(state['file'], 'rb') as inputfile:
+        inputfile.seek(state['offset'])
+        data = inputfile.read(size)
+    state['offset'] += len(data)
+
+    lines = (state['partial'] + data.decode('utf-8', errors='replace')).split('\n')
+    state['partial'] = lines.pop()
+
+    before = summary(state)
+    parse_lines(state, lines)
+
+    return summary(state) != before, state['offset'] < stat.st_size
+
+def summary(state):
+    """
+    One line of the job status
+    """
+    text = "{}  {}".format(state['file'], state['status'])
+    if state['job'] > 1:
+        text += "  job {}".format(state['job'])
+    if state['step']:
+        text += "  step {}".format(state['step'])
+    if state['energy']:
+        text += "  E({}) {}".format(state['energy_type'], state['energy'])
+    if state['converged']:
+        text += "  converged: " + " ".join(state['converged'].get(item, '-') for item in criteria)
+    if state['stationary']:
+        text += "  stationary point found"
+    return text
+
+def finished(state):
+    return state['status'] in ('normal', 'error')
+
+class _Inotify:
+    # File changes from Linux inotify on the directories of the files
+    mask = 0x2 | 0x8 | 0x80 | 0x100 | 0x200  # MODIFY, CLOSE_WRITE, MOVED_TO, CREATE, DELETE
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify is not available")
+
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), self.mask)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), "Cannot watch " + directory)
+            self.directories[wd] = directory
+
+    def wait(self, timeout):
+        # Paths changed within timeout seconds
+        changed = set()
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return changed
+
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset < len(data):
+            wd, _, _, length = struct.unpack_from('iIII', data, offset)
+            name = data[offset + 16:offset + 16 + length].rstrip(b'\0')
+            offset += 16 + length
+            if wd in self.directories and name:
+                changed.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def _watcher(paths):
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        return _Inotify({os.path.dirname(path) for path in paths})
+    except (OSError, AttributeError, TypeError):
+        return None
+
+def watch_logs(file_names, interval=2.0, follow=False, output=sys.stdout):
+    """
+    Follow the files and print the status line of every job whose status changes.
+    Return the final states when all the jobs are terminated (unless follow is True).
+    """
+    states = {os.path.abspath(file_name): new_state(file_name) for file_name in file_names}
+    watcher = _watcher(states)
+    pending = set(states)
+    last_sweep = time.monotonic()  # last check of all the files
+
+    try:
+        while True:
+            backlog = set()
+            for path in pending:
+                changed, more = poll(states[path])
+                if changed:
+                    print(summary(states[path]), file=output, flush=True)
+                if more:
+                    backlog.add(path)
+
+            if not follow and not backlog and all(finished(state) for state in states.values()):
+                return states
+
+            if backlog:
+                # Continue with the unread data before waiting
+                pending = backlog
+            elif watcher is not None:
+                # inotify events, and a check of all the files once per interval as a safeguard
+                pending = watcher.wait(max(0, last_sweep + interval - time.monotonic())) & set(states)
+                if time.monotonic() - last_sweep >= interval:
+                    pending = set(states)
+                    last_sweep = time.monotonic()
+            else:
+                time.sleep(interval)
+                pending = set(states)
+    finally:
+        if watcher is not None:
+            watcher.close()
+
+def main():
+    args = parse_args()
+    file_names = expand_files(args.file_name)
+
+    if args.once:
+        for file_name in file_names:
+            state = new_state(file_name)
+            more = True
+            while more:
+                _, more = poll(state)
+            print(summary(state))
+        return
+
+    try:
+        watch_logs(file_names, args.interval, args.follow)
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+
+import numpy as np
+import pandas as pd
+from gaussianutility import profiling
+
+"""
+
+Formatting of geometry blocks shared by all the scripts writing structure files.
+Columns are converted to strings as whole NumPy arrays, and the rows are joined and
+written in large chunks instead of going through pandas text formatting.
+The output matches DataFrame.to_csv(sep='\t') / to_string, which the scripts used before.
+
+"""
+
+# Size of the file buffer and number of rows written at once
+buffer_size = 1 << 20
+chunk_rows = 1 << 16
+
+def open_output(file_name):
+    """
+    Open a text file for writing with a large buffer.
+    """
+    return open(file_name, 'w', buffering=buffer_size)
+
+
+def format_column(values, precision=None):
+    """
+    Convert a column to an array of strings (a str or an object array of str).
+    Floats are written with the given number of decimals, or in the shortest form that
+    reads back to the same value (as pandas does); None and NaN become empty strings.
+    """
+    values = np.asarray(values)
+
+    if values.dtype.kind in 'US':
+        return values.astype(str)
+
+    if values.dtype.kind == 'f':
+        if precision is not None:
+            strings = np.char.mod('%.{}f'.format(precision), values)
+        else:
+            strings = values.astype(str)
+        return np.where(np.isnan(values), '', strings)
+
+    if values.dtype.kind in 'iub':
+        return values.astype(str)
+
+    # Object columns, e.g., strings from readinput with None for lattice vectors
+    # Such columns are kept as Python strings, which are joined without conversion
+    missing = pd.isna(values)
+    if missing.any():
+        values = values.copy()
+        values[missing] = ''
+    if all(type(value) is str for value in values):
+        return values
+    if precision is None:
+        return values.astype(str)
+
+    strings = []
+    for value in values:
+        if isinstance(value, (float, np.floating)):
+            strings.append('%.{}f'.format(precision) % value)
+        else:
+            strings.append(str(value))
+    return np.array(strings, dtype=str)
+
+
+def table_chunks(columns, sep='\t', widths=None, align=None, prefix=''):
+    """
+    Yield the text of a table, given as a list of string columns, in chunks of rows.
+    sep is a separator for all columns or a list of separators between each pair of columns.
+    Columns can be padded to widths, aligned to the left ('<') or right ('>', default).
+    """
+    columns = [np.asarray(column) for column in columns]
+    if isinstance(sep, str):
+        join = lambda row: prefix + sep.join(row) + '\n'
+    else:
+        template = prefix + '{}' + ''.join(s.replace('{', '{{').replace('}', '}}') + '{}' for s in sep) + '\n'
+        join = lambda row: template.format(*row)
+
+    if widths is not None:
+        align = align or ['>'] * len(columns)
+        columns = [column.astype(str) for column in columns]
+        columns = [np.char.ljust(column, width) if side == '<' else np.char.rjust(column, width)
+                   for column, width, side in zip(columns, widths, align)]
+
+    n_rows = len(columns[0]) if columns else 0
+    for start in range(0, n_rows, chunk_rows):
+        rows = zip(*[column[start:start + chunk_rows].tolist() for column in columns])
+        yield ''.join([join(row) for row in rows])
+
+
+@profiling.profiled('format_table')
+def format_table(columns, sep='\t', widths=None, align=None, prefix=''):
+    text = ''.join(table_chunks(columns, sep, widths, align, prefix))
+    profiling.count(text)
+    return text
+
+
+@profiling.profiled('write_table')
+def write_table(output, columns, sep='\t', widths=None, align=None, prefix=''):
+    for chunk in table_chunks(columns, sep, widths, align, prefix):
+        output.write(chunk)
+        profiling.count(chunk)
+
+
+def geometry_columns(df_geom, precision=None):
+    """
+    All columns of a geometry dataframe (readinput, readoutput) as string arrays
+    """
+    return [format_column(df_geom[column].to_numpy(), precision) for column in df_geom.columns]
+
+
+def format_geometry(df_geom, precision=None):
+    """
+    Gaussian geometry block of a geometry dataframe, one tab-separated line per atom
+    """
+    return format_table(geometry_columns(df_geom, precision))
+
+
+def write_geometry(output, df_geom, precision=None):
+    write_table(output, geometry_columns(df_geom, precision))
+
+
+def write_xyz(output, atoms, coords, comment, precision=None):
+    """
+    Write an XYZ block: number of atoms, comment line, and right-aligned columns
+    """
+    columns = [format_column(atoms)] + [format_column(column, precision) for column in np.asarray(coords).T]
+    widths = [max(len(value) for value in column) if len(column) else 0 for column in columns]
+
+    output.write('{}\n'.format(len(atoms)))
+    output.write(comment + '\n')
+    write_table(output, columns, sep=' ', widths=widths)
+
+
+def write_poscar(output, title, lattice, species, counts, coords, flags=None, direct=True, precision=None):
+    """
+    Write a POSCAR: title, scaling factor, lattice, species and counts, optional selective dynamics
+    flags ('T'/'F' columns), and coordinates in direct or Cartesian form.
+    """
+    output.write(title + '\n')
+    output.write('1.0\n')
+    write_table(output, [format_column(column, precision) for column in np.asarray(lattice).T])
+    output.write('\t' + '\t'.join(species) + '\n')
+    output.write('\t' + '\t'.join(format_column(counts)) + '\n')
+
+    columns = [format_column(column, precision) for column in np.asarray(coords).T]
+    if flags is not None:
+        output.write('Selective dynamics\n')
+        columns += list(np.asarray(flags, dtype=str).T)
+
+    output.write('Direct\n' if direct else 'Cartesian\n')
+    write_table(output, columns)
@@ -1,64 +1,65 @@
 #!/usr/bin/env python3
 
-import numpy as np
+import os
+import itertools
 import argparse
 from argparse import RawTextHelpFormatter
-import mendeleev as md
+from gaussianutility.utilities import inner_name
+from gaussianutility.formats import read_xyz_frames, xyz_structure, write_input
+from gaussianutility.writers import open_output
 
 def parse_args():
     parser = argparse.ArgumentParser(
-        description= "Convert xyz file to Gaussian input file (.com)\n\n"
-                     "Return file_name.com: Gaussian input file",
+        description= "Convert xyz file to Gaussian input file (.com)\n"
+                     "Multi-frame files (concatenated XYZ or extended XYZ frames) are read frame by frame;\n"
+                     "one input is written per selected frame, or a single --Link1-- job with -l\n\n"
+                     "Return file_name.com: Gaussian input file\n"
+                     "       file_name_N.com: Gaussian input file of frame N (multi-frame files)",
         formatter_class=RawTextHelpFormatter)
 
     parser.add_argument("file_name", help='XYZ structure file (.xyz)')
+    parser.add_argument('-s', '--stride', type=int, default=1, \
+    help='Convert every s-th frame of a multi-frame file, starting from the first one')
+    parser.add_argument('-l', '--link1', action='store_true', \
+    help='Write all the selected frames to a single file as --Link1-- jobs')
     return parser.parse_args()
 
-def xyz_2_com(file_name):
-    # Read geometry from XYZ file
-    with open(file_name, 'r') as f:
-        lines = f.readlines()
+def xyz_2_com(file_name, stride=1, link1=False):
+    name = os.path.splitext(inner_name(file_name))[0]
+    frames = read_xyz_frames(file_name, stride)
 
-    # Atoms start at line 2
-    atoms_start = 2
-    atoms_lines = [line for line in lines[atoms_start:] if len(line.split()) >= 4]
+    # A single structure keeps the name of the input file
+    first = next(frames, None)
+    if first is None:
+        raise ValueError('No structure is found in ' + file_name)
+    second = next(frames, None)
+    frames = itertools.chain([first] if second is None else [first, second], frames)
 
-    # Check if this is an extended XYZ file by determining whether the first atom
-    # line contains more than four tokens (atom, x, y, z)
-    is_extended = len(atoms_lines[0].split()) > 4 
+    if second is None:
+        number, comment, atoms, coords = first
+        with open_output(name + ".com") as output:
+            write_input(output, xyz_structure(atoms, coords, name + ".com"))
+        return
 
-    # Decide multiplicity using only the element type from each atom line
-    elemt_list = [line.split()[0] for line in atoms_lines] 
-    elemt_type, elemt_count = np.unique(elemt_list, return_counts=True)
-    elemt_electrons = [md.element(elemt).electrons for elemt in elemt_type]
-    total_electrons = sum(np.array(elemt_electrons) * elemt_count)
-    multiplicity = 1 if total_electrons % 2 == 0 else 2
-
-    # Write Gaussian input file using only the first four tokens: element, x, y, z
-    name = ".".join(file_name.rsplit(".",1)[0:-1])
-    out_file = name + ".com"
-    with open(out_file, 'w') as output:
-        output.write('# hf/3-21g\n\n')
-        output.write(f'{out_file}\n\n')
-        output.write(f'0 {multiplicity}\n')
-        for line in atoms_lines:  # MODIFIED: iterate over atoms_lines
-            tokens = line.split()
-            if len(tokens) >= 4:
-                element = tokens[0]
-                x, y, z = tokens[1:4]
-                output.write(f' {element:2s}    {x:>15s} {y:>15s} {z:>15s}\n')
-        output.write('\n')
+    if link1:
+        with open_output(name + ".com") as output:
+            for idx, (number, comment, atoms, coords) in enumerate(frames):
+                if idx:
+                    output.write('--Link1--\n')
+                write_input(output, xyz_structure(atoms, coords, f'{name} frame {number}'))
+    else:
+        for number, comment, atoms, coords in frames:
+            with open_output(f"{name}_{number}.com") as output:
+                write_input(output, xyz_structure(atoms, coords, f'{name} frame {number}'))
 
 def main():
     args = parse_args()
     file_name = args.file_name
 
-    if not file_name.endswith(".xyz"):
+    if not inner_name(file_name).endswith(".xyz"):
         raise ValueError('The input structure must be a .xyz file')
-    
-    xyz_2_com(file_name)
+
+    xyz_2_com(file_name, args.stride, args.link1)
 
 if __name__ == "__main__":
     main()
-
-
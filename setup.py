@@ -13,16 +13,29 @@ setuptools.setup(
     long_description_content_type="text/markdown",
     entry_points={
         'console_scripts': [
-            'com2vasp=gaussianutility.com2vasp:main',
-            'com2xyz=gaussianutility.com2xyz:main',
-            'xyz2com=gaussianutility.xyz2com:main',
-            'freezeLayer=gaussianutility.freezeLayer:main',
-            'gibbsTemp=gaussianutility.gibbsTemp:main',
-            'out2com=gaussianutility.out2com:main',
-            'printE=gaussianutility.printE:main',
-            'sortInput=gaussianutility.sortInput:main',
-            'spectrum=gaussianutility.spectrum:main',
-            'vasp2com=gaussianutility.vasp2com:main'
+            'assignLayer=gaussianutility.daemon:assignLayer',
+            'cellTransform=gaussianutility.daemon:cellTransform',
+            'displaceMode=gaussianutility.daemon:displaceMode',
+            'com2vasp=gaussianutility.daemon:com2vasp',
+            'com2xyz=gaussianutility.daemon:com2xyz',
+            'dedupConformer=gaussianutility.daemon:dedupConformer',
+            'xyz2com=gaussianutility.daemon:xyz2com',
+            'freezeLayer=gaussianutility.daemon:freezeLayer',
+            'gaussianutility=gaussianutility.cli:main',
+            'geomInfo=gaussianutility.daemon:geomInfo',
+            'ingest=gaussianutility.daemon:ingest',
+            'isotopeFreq=gaussianutility.daemon:isotopeFreq',
+            'gibbsTemp=gaussianutility.daemon:gibbsTemp',
+            'optHistory=gaussianutility.daemon:optHistory',
+            'out2com=gaussianutility.daemon:out2com',
+            'printE=gaussianutility.daemon:printE',
+            'profileReport=gaussianutility.daemon:profileReport',
+            'scanPath=gaussianutility.daemon:scanPath',
+            'sortInput=gaussianutility.daemon:sortInput',
+            'spectrum=gaussianutility.daemon:spectrum',
+            'utilityDaemon=gaussianutility.daemon:main',
+            'vasp2com=gaussianutility.daemon:vasp2com',
+            'watchLog=gaussianutility.daemon:watchLog'
         ],
     },
     url="https://github.com/Sungil-Hong/gaussianutility",
@@ -37,5 +50,6 @@ setuptools.setup(
                       'periodictable>=1.6.1',
                       'argparse>=1.1',
                       'matplotlib>=3.5.1',
-                      'mendeleev>=0.9.0']
+                      'mendeleev>=0.9.0'],
+    extras_require={'zstd': ['zstandard']}
 )